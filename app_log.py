@@ -0,0 +1,103 @@
+# app_log.py - Registro asíncrono por niveles: los hilos críticos solo encolan, un hilo aparte escribe
+import sys
+import json
+import time
+import atexit
+import logging
+import threading
+from queue import SimpleQueue
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT = "ttr"
+
+
+class CategoryRateLimit(logging.Filter):
+    """
+    Cubo de fichas por categoría (nombre del logger): como mucho `rate` registros
+    por segundo con ráfagas de `burst`. Lo que exceda se descarta en el propio
+    hilo que registra (ni se formatea ni se encola) y se cuenta; el siguiente
+    registro que pase indica cuántos se omitieron. ERROR y superiores no se limitan.
+    """
+
+    def __init__(self, default_rate: float = 20.0, rates: dict = None, burst: float = None):
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self.burst = burst
+        self._buckets = {}  # categoría -> [fichas, última recarga, omitidos]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        category = record.name[len(ROOT) + 1:]
+        rate = self.rates.get(category, self.default_rate)
+        if rate is None:
+            return True  # Sin límite
+        burst = self.burst or max(1.0, rate)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(category)
+            if bucket is None:
+                bucket = self._buckets[category] = [burst, now, 0]
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1.0
+            skipped, bucket[2] = bucket[2], 0
+        if skipped:
+            record.msg = f"{record.getMessage()} (+{skipped} omitidos)"
+            record.args = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro (para recoger los logs de producción)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({
+            "t": round(record.created, 3),
+            "level": record.levelname,
+            "cat": record.name[len(ROOT) + 1:],
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }, ensure_ascii=False)
+
+
+_listener = None
+
+
+def setup(level="INFO", fmt: str = "text", default_rate: float = 20.0, rates: dict = None):
+    """
+    Configura el registro del proceso (idempotente): cola sin locks + hilo escritor.
+    fmt: "text" (el mensaje tal cual, como los print de siempre) o "json"
+    """
+    global _listener
+    if _listener:
+        return
+    root = logging.getLogger(ROOT)
+    root.setLevel(level)
+    root.propagate = False
+    log_queue = SimpleQueue()
+    producer = QueueHandler(log_queue)  # prepare(): el registro se encola ya formateado
+    producer.addFilter(CategoryRateLimit(default_rate, rates))
+    root.addHandler(producer)
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter("%(message)s"))
+    _listener = QueueListener(log_queue, writer)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+def shutdown():
+    """Vacía la cola y detiene el hilo escritor"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+def get(category: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT}.{category}")
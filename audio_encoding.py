@@ -0,0 +1,209 @@
+# audio_encoding.py - Codificación del audio que sube a Deepgram (linear16 / mu-law / Opus)
+#
+# Opus es opcional: `pip install opuslib` más la librería nativa libopus del
+# sistema (libopus0 / opus en brew / opus.dll junto al ejecutable). Sin ellas
+# make_encoder("opus") avisa y vuelve a linear16.
+import struct
+import itertools
+import numpy as np
+
+try:
+    import opuslib  # Opcional: requiere la librería nativa libopus
+except Exception:
+    opuslib = None
+
+
+class PcmEncoder:
+    """
+    Etapa de codificación entre AudioCapture y el envío a Deepgram.
+    Esta base deja el PCM int16 tal cual (linear16, camino de referencia para A/B);
+    las subclases cambian `encoding` (parámetro de la URL) y `_encode`.
+    """
+
+    encoding = "linear16"
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        self.raw_bytes = 0      # PCM recibido de la captura
+        self.wire_bytes = 0     # Bytes que salen por el socket
+
+    def new_stream(self):
+        """Flujo del contenedor para una conexión nueva (OggStream), None si no hay contenedor"""
+        return None
+
+    def encode(self, pcm) -> bytes:
+        out = self._encode(pcm)
+        self.raw_bytes += len(pcm)
+        self.wire_bytes += len(out)
+        return out
+
+    def flush(self) -> bytes:
+        """Fin de enunciado: entrega lo que quede retenido (tramas incompletas)"""
+        out = self._flush()
+        self.wire_bytes += len(out)
+        return out
+
+    def query(self) -> str:
+        return f"encoding={self.encoding}&sample_rate={self.sample_rate}"
+
+    def summary(self) -> str:
+        saved = 1 - self.wire_bytes / self.raw_bytes if self.raw_bytes else 0.0
+        return (f"{self.encoding}: {self.raw_bytes / 1024:.0f} KB PCM → {self.wire_bytes / 1024:.0f} KB "
+                f"enviados ({saved:.0%} ahorrado)")
+
+    def _encode(self, pcm) -> bytes:
+        return bytes(pcm)
+
+    def _flush(self) -> bytes:
+        return b""
+
+
+def _ulaw_table() -> np.ndarray:
+    """G.711 µ-law (la variante de 14 bits de g711.c) para los 65536 valores int16"""
+    x = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(x < 0, 0x7F, 0xFF)
+    mag = np.minimum(np.abs(x), 8159) + 0x21
+    seg = np.searchsorted(np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]), mag)
+    uval = np.where(seg < 8, (seg << 4) | ((mag >> (seg + 1)) & 0x0F), 0x7F)  # seg 8 = saturado
+    return (uval ^ mask).astype(np.uint8)
+
+
+class MuLawEncoder(PcmEncoder):
+    """µ-law de 8 bits: la mitad de bytes, una búsqueda en tabla vectorizada por bloque"""
+
+    encoding = "mulaw"
+    _TABLE = _ulaw_table()
+
+    def _encode(self, pcm) -> bytes:
+        return self._TABLE[np.frombuffer(pcm, dtype=np.uint16)].tobytes()
+
+
+def _ogg_crc_table():
+    table = []
+    for i in range(256):
+        r = i << 24
+        for _ in range(8):
+            r = ((r << 1) ^ 0x04C11DB7) if r & 0x80000000 else (r << 1)
+        table.append(r & 0xFFFFFFFF)
+    return table
+
+
+_OGG_CRC = _ogg_crc_table()
+
+
+def ogg_crc(data: bytes) -> int:
+    crc = 0
+    for b in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _OGG_CRC[((crc >> 24) & 0xFF) ^ b]
+    return crc
+
+
+def ogg_page(packet: bytes, granule: int, header_type: int, serial: int, seq: int) -> bytes:
+    lacing = bytes([255] * (len(packet) // 255) + [len(packet) % 255])
+    page = bytearray(b"OggS" + struct.pack("<BBqIIIB", 0, header_type, granule, serial, seq, 0,
+                                           len(lacing)) + lacing + packet)
+    struct.pack_into("<I", page, 22, ogg_crc(page))
+    return bytes(page)
+
+
+class OggStream:
+    """
+    Flujo lógico Ogg de una conexión: serial propio, cabeceras BOS y páginas
+    numeradas desde cero. El codificador pagina una sola vez; restamp() renumera
+    esas páginas (secuencia, granule, CRC) para el socket que las recibe, así
+    cada conexión, también la que recibe el reenvío tras conmutar, ve un flujo
+    válido cuyo tiempo empieza en 0 (como los offsets de Deepgram).
+    """
+
+    _serials = itertools.count(0x5454524F)
+
+    def __init__(self, head_packets: list, granule_start: int, granule_step: int):
+        self.serial = next(self._serials) & 0xFFFFFFFF
+        self._head = head_packets
+        self.seq = len(head_packets)
+        self.granule = granule_start
+        self.granule_step = granule_step    # Una página = un paquete de duración fija
+
+    def header(self) -> bytes:
+        return b"".join(ogg_page(packet, 0, 0x02 if i == 0 else 0x00, self.serial, i)
+                        for i, packet in enumerate(self._head))
+
+    def restamp(self, data: bytes) -> bytes:
+        out = bytearray()
+        pos = 0
+        while data.startswith(b"OggS", pos) and pos + 27 <= len(data):
+            segments = data[pos + 26]
+            end = pos + 27 + segments + sum(data[pos + 27:pos + 27 + segments])
+            page = bytearray(data[pos:end])
+            self.granule += self.granule_step
+            struct.pack_into("<qIII", page, 6, self.granule, self.serial, self.seq, 0)
+            struct.pack_into("<I", page, 22, ogg_crc(page))
+            self.seq += 1
+            out += page
+            pos = end
+        return bytes(out)
+
+
+class OpusEncoder(PcmEncoder):
+    """
+    Opus (voz, ~16-24 kbit/s) en contenedor Ogg: una página por paquete de 20 ms.
+    Cada conexión abre su propio flujo lógico (new_stream()): recibe antes las
+    cabeceras OpusHead/OpusTags y las páginas se renumeran al enviarlas.
+    """
+
+    encoding = "opus"
+    FRAME_MS = 20
+    PRE_SKIP = 312      # Lookahead del codificador a 48 kHz (el valor habitual de libopus)
+
+    def __init__(self, sample_rate: int = 16000, bitrate: int = 24000):
+        super().__init__(sample_rate)
+        if opuslib is None:
+            raise RuntimeError("Opus requiere 'opuslib' y libopus instalados")
+        self._enc = opuslib.Encoder(sample_rate, 1, opuslib.APPLICATION_VOIP)
+        self._enc.bitrate = bitrate
+        self.frame_samples = sample_rate * self.FRAME_MS // 1000
+        self._pending = bytearray()
+        # Muestras a 48 kHz por paquete: la posición de cada página la pone OggStream
+        self.granule_step = self.frame_samples * 48000 // sample_rate
+
+    def new_stream(self) -> OggStream:
+        head = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, self.PRE_SKIP, self.sample_rate, 0, 0)
+        vendor = b"ttr"
+        tags = b"OpusTags" + struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", 0)
+        return OggStream([head, tags], self.PRE_SKIP, self.granule_step)
+
+    def _encode(self, pcm) -> bytes:
+        self._pending += pcm
+        frame_bytes = self.frame_samples * 2
+        out = bytearray()
+        while len(self._pending) >= frame_bytes:
+            out += self._packet(bytes(self._pending[:frame_bytes]))
+            del self._pending[:frame_bytes]
+        return bytes(out)
+
+    def _flush(self) -> bytes:
+        if not self._pending:
+            return b""
+        frame = bytes(self._pending) + bytes(self.frame_samples * 2 - len(self._pending))
+        self._pending.clear()
+        return self._packet(frame)
+
+    def _packet(self, frame: bytes) -> bytes:
+        # Serial, secuencia y granule provisionales: los fija OggStream.restamp() por conexión
+        return ogg_page(self._enc.encode(frame, self.frame_samples), 0, 0x00, 0, 0)
+
+
+ENCODERS = {"linear16": PcmEncoder, "mulaw": MuLawEncoder, "opus": OpusEncoder}
+
+
+def make_encoder(name: str, sample_rate: int = 16000) -> PcmEncoder:
+    """Crea el codificador pedido; si no está disponible (Opus sin libopus) vuelve a linear16"""
+    cls = ENCODERS.get(name)
+    if cls is None:
+        print(f"⚠️ Codificación desconocida '{name}', usando linear16")
+        return PcmEncoder(sample_rate)
+    try:
+        return cls(sample_rate)
+    except RuntimeError as e:
+        print(f"⚠️ {e}; usando linear16")
+        return PcmEncoder(sample_rate)
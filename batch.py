@@ -0,0 +1,322 @@
+# batch.py - Modo por lotes: doblaje de reuniones grabadas más rápido que el tiempo real
+#
+# Uso:
+#   python batch.py reunion1.wav reunion2.wav [--lang en] [--out doblado] [--jobs 4]
+#
+# Cada archivo pasa por la misma segmentación VAD que la captura en vivo; la voz
+# va a Deepgram tan rápido como la consume (sin reloj de tiempo real) y cada FINAL
+# se traduce y se sintetiza en cuanto llega, a la vez que el resto. Por archivo:
+#   <nombre>.<destino>.wav   pista doblada (PCM 16 kHz), cada frase en su instante original
+#   <nombre>.<destino>.json  segmentos: tiempos en el original y en la pista, texto y traducción
+# Los archivos se procesan en paralelo (--jobs) en un mismo event loop y comparten
+# los backends de traducción, la caché de traducciones y la caché TTS.
+import os
+import sys
+import json
+import time
+import wave
+import bisect
+import asyncio
+import argparse
+import numpy as np
+import main
+from resampler import StreamingResampler
+
+TARGETS = {"es": "EN-US", "en": "ES"}   # Idioma hablado → destino de DeepL
+FEED_BLOCK_S = 1.0          # Audio del archivo que pasa por el VAD en cada iteración
+MAX_QUEUED_FRAMES = 250     # Contrapresión: como mucho ~5 s de voz esperando a Deepgram
+COVERED_EPSILON_S = 0.05
+
+# Mensajes más grandes que en vivo: aquí importa el rendimiento, no la latencia
+BATCH_COALESCE_MS = getattr(main.config, "BATCH_COALESCE_MS", 250)
+# Síntesis simultáneas en todo el proceso (el plan de ElevenLabs limita la concurrencia)
+BATCH_TTS_CONCURRENCY = getattr(main.config, "BATCH_TTS_CONCURRENCY", 4)
+# Espera máxima a los FINAL pendientes tras enviar todo el audio de un archivo
+BATCH_DRAIN_S = getattr(main.config, "BATCH_DRAIN_S", 15.0)
+
+
+def load_audio(path: str) -> bytes:
+    """WAV de 16 bits (mono o estéreo, a cualquier frecuencia) → PCM mono a SAMPLE_RATE"""
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"{path}: se requiere WAV de 16 bits")
+        channels, rate = w.getnchannels(), w.getframerate()
+        pcm = w.readframes(w.getnframes())
+    if channels > 1:
+        x = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels).mean(axis=1)
+        pcm = np.rint(x).astype(np.int16).tobytes()
+    if rate != main.SAMPLE_RATE:
+        pcm = StreamingResampler(rate, main.SAMPLE_RATE).process(pcm)
+    return pcm
+
+
+class Timeline:
+    """
+    Correspondencia entre los segundos del audio enviado a Deepgram (solo las
+    tramas que deja pasar el VAD) y los del archivo: un tramo por cada racha de
+    tramas contiguas. Los FINAL traen su posición en el primero.
+    """
+
+    def __init__(self):
+        self.stream_s = 0.0     # Audio enviado hasta ahora
+        self._stream = []       # Inicio de cada tramo (s de stream)
+        self._source = []       # ... y su posición en el archivo (s)
+        self._next_frame = None
+
+    def add_frame(self, frame_index: int):
+        if frame_index != self._next_frame:
+            self._stream.append(self.stream_s)
+            self._source.append(frame_index * main.BLOCK_MS / 1000)
+        self._next_frame = frame_index + 1
+        self.stream_s += main.BLOCK_MS / 1000
+
+    def source_time(self, stream_s: float, at_end: bool = False) -> float:
+        """at_end: la posición cierra un tramo (un fin justo en la frontera es del tramo anterior)"""
+        if not self._stream:
+            return stream_s
+        if at_end:
+            i = max(0, bisect.bisect_left(self._stream, stream_s - 1e-6) - 1)
+        else:
+            i = max(0, bisect.bisect_right(self._stream, stream_s + 1e-6) - 1)
+        return self._source[i] + stream_s - self._stream[i]
+
+
+class FileCapture(main.AudioCapture):
+    """AudioCapture alimentada desde memoria: misma VAD y máquina de estados, sin dispositivo"""
+
+    def __init__(self, audio_queue: asyncio.Queue, name: str):
+        super().__init__(None, audio_queue, name, use_worker=False)
+        self.timeline = Timeline()
+        self.frame_index = -1
+
+    def _process_frame(self, frame, is_speech: bool = None, echo: bool = False):
+        self.frame_index += 1
+        super()._process_frame(frame, is_speech, echo)
+
+    def _emit(self, frame):
+        if not super()._emit(frame):
+            return False
+        self.timeline.add_frame(self.frame_index)
+        return True
+
+    async def feed(self, pcm: bytes, max_speed: float = None):
+        """
+        Pasa el archivo por el VAD tan rápido como Deepgram consume: se espera
+        solo si la cola de audio acumula más de MAX_QUEUED_FRAMES tramas.
+        max_speed: límite opcional (× tiempo real) si el plan lo exige.
+        """
+        self.loop = asyncio.get_running_loop()
+        block = int(main.SAMPLE_RATE * FEED_BLOCK_S) * 2
+        t0 = time.perf_counter()
+        for offset in range(0, len(pcm), block):
+            while self.audio_queue.qsize() > MAX_QUEUED_FRAMES:
+                await asyncio.sleep(0.005)
+            data = pcm[offset:offset + block]
+            self.callback(data, len(data) // 2, None, None)
+            ahead = 0.0
+            if max_speed:
+                ahead = (offset + len(data)) / 2 / main.SAMPLE_RATE / max_speed - (time.perf_counter() - t0)
+            await asyncio.sleep(max(0.0, ahead))  # También deja correr las entregas a la cola
+        if self.is_speaking:
+            # El archivo termina con voz: cerrar el enunciado como lo haría el silencio
+            self._deliver(main.END_OF_UTTERANCE)
+            self.is_speaking = False
+        self._deliver(None)
+        await asyncio.sleep(0)
+
+
+async def dub_file(path: str, out_dir: str, lang: str, tts_limit: asyncio.Semaphore,
+                   max_speed: float = None) -> dict:
+    """Un archivo completo: VAD → Deepgram → traducción y síntesis concurrentes → pista doblada"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    target = TARGETS[lang]
+    t0 = time.perf_counter()
+    pcm = load_audio(path)
+    audio_s = len(pcm) / 2 / main.SAMPLE_RATE
+
+    audio_q = asyncio.Queue()   # Sin descartes: la contrapresión la hace feed()
+    text_q = asyncio.Queue()
+    capture = FileCapture(audio_q, f"LOTE {name}")
+    encoder = main.make_encoder(main.DEEPGRAM_ENCODING, 16000)
+    conn = main.deepgram_connection(lang, encoder)
+    timeline = capture.timeline
+    finals = {}                 # uid -> (inicio, fin) en s de stream
+    covered_s = 0.0
+    fed = False
+    drained = asyncio.Event()   # Todos los FINAL del audio enviado han llegado
+
+    def check_drained():
+        if fed and covered_s >= timeline.stream_s - COVERED_EPSILON_S:
+            drained.set()
+
+    def on_final(uid, start, end):
+        nonlocal covered_s
+        if uid is not None:
+            finals[uid] = (start, end)
+        covered_s = max(covered_s, end)
+        check_drained()
+
+    segments = []
+
+    async def dub(uid: int, text: str):
+        start, end = finals.get(uid, (0.0, 0.0))
+        translated = await main.translate_text_async(text, target)
+        audio = b""
+        if translated:
+            async with tts_limit:
+                try:
+                    audio = await main.elevenlabs_synthesize(translated)
+                except Exception as e:
+                    print(f"⚠️ [{name}] Síntesis fallida para '{translated}': {e}")
+        main.tracer.discard(uid)
+        segments.append({"start": timeline.source_time(start), "end": timeline.source_time(end, at_end=True),
+                         "text": text, "translation": translated, "pcm": audio})
+
+    async def consume():
+        tasks = []
+        while True:
+            item = await text_q.get()
+            if item is None:
+                break
+            tasks.append(asyncio.create_task(dub(*item)))
+        await asyncio.gather(*tasks)
+
+    await conn.start()
+    stt = asyncio.create_task(main.deepgram_stt(audio_q, lang, text_q, encoder=encoder,
+                                                coalescer=main.FrameCoalescer(BATCH_COALESCE_MS),
+                                                conn=conn, on_final=on_final))
+    consumer = asyncio.create_task(consume())
+    try:
+        await capture.feed(pcm, max_speed)
+        fed = True
+        check_drained()
+        try:
+            await asyncio.wait_for(drained.wait(), BATCH_DRAIN_S)
+        except asyncio.TimeoutError:
+            print(f"⚠️ [{name}] Deepgram no cubrió todo el audio ({covered_s:.1f}s de "
+                  f"{timeline.stream_s:.1f}s): se sigue con lo recibido")
+        stt_s = time.perf_counter() - t0
+    finally:
+        stt.cancel()
+        await conn.close()
+        text_q.put_nowait(None)
+    await consumer
+
+    dub_s = write_outputs(os.path.join(out_dir, f"{name}.{target.split('-')[0].lower()}"), segments, audio_s)
+    wall = time.perf_counter() - t0
+    report = {
+        "file": path,
+        "audio_s": audio_s,
+        "speech_s": capture.stats.sent_frames * main.BLOCK_MS / 1000,
+        "utterances": len(segments),
+        "translated": sum(1 for s in segments if s["translation"]),
+        "synthesized_s": dub_s,
+        "shifted": sum(1 for s in segments if s["shift_s"] > 0),
+        "stt_s": stt_s,
+        "wall_s": wall,
+        "realtime_factor": audio_s / wall if wall > 0 else 0.0,
+    }
+    print(f"✅ [{name}] {audio_s:.0f}s de audio en {wall:.1f}s (×{report['realtime_factor']:.1f} tiempo real), "
+          f"{report['utterances']} frases, {report['synthesized_s']:.1f}s sintetizados")
+    return report
+
+
+def write_outputs(base: str, segments: list, audio_s: float) -> float:
+    """
+    Pista doblada (WAV) + segmentos (JSON). Cada frase empieza en su instante de
+    origen o, si la anterior aún suena, justo detrás (shift_s: retraso aplicado).
+    Devuelve los segundos de audio sintetizado.
+    """
+    rate = main.TTS_SAMPLE_RATE
+    segments.sort(key=lambda s: s["start"])
+    cursor = 0
+    placed = []
+    for seg in segments:
+        pcm = np.frombuffer(seg.pop("pcm"), dtype=np.int16)
+        at = max(int(seg["start"] * rate), cursor)
+        seg["dub_start"] = at / rate
+        seg["dub_end"] = (at + len(pcm)) / rate
+        seg["shift_s"] = max(0.0, seg["dub_start"] - seg["start"])
+        if len(pcm):
+            placed.append((at, pcm))
+            cursor = at + len(pcm)
+    track = np.zeros(max(cursor, int(audio_s * rate)), dtype=np.int16)
+    for at, pcm in placed:
+        track[at:at + len(pcm)] = pcm
+    with wave.open(f"{base}.wav", "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(track.tobytes())
+    with open(f"{base}.json", "w", encoding="utf-8") as f:
+        json.dump({"sample_rate": rate, "segments": segments}, f, ensure_ascii=False, indent=2)
+    return sum(len(pcm) for _, pcm in placed) / rate
+
+
+async def run_batch(paths: list, out_dir: str, lang: str = "en", jobs: int = 4, max_speed: float = None) -> dict:
+    """Dobla los archivos con hasta `jobs` a la vez; devuelve el informe de rendimiento"""
+    os.makedirs(out_dir, exist_ok=True)
+    main.get_translator()  # Fuera de los hilos: una sola instancia compartida
+    job_limit = asyncio.Semaphore(max(1, jobs))
+    tts_limit = asyncio.Semaphore(BATCH_TTS_CONCURRENCY)
+
+    async def job(path):
+        async with job_limit:
+            try:
+                return await dub_file(path, out_dir, lang, tts_limit, max_speed)
+            except Exception as e:
+                print(f"❌ [{path}] {e}")
+                return {"file": path, "error": str(e)}
+
+    print(f"🚀 {len(paths)} archivos, hasta {jobs} a la vez ({lang} → {TARGETS[lang]})")
+    t0 = time.perf_counter()
+    try:
+        reports = await asyncio.gather(*(job(path) for path in paths))
+    finally:
+        main.shutdown_shared()
+    wall = time.perf_counter() - t0
+    audio_s = sum(r.get("audio_s", 0.0) for r in reports)
+    return {"files": reports, "audio_s": audio_s, "wall_s": wall,
+            "realtime_factor": audio_s / wall if wall > 0 else 0.0}
+
+
+def print_report(result: dict):
+    print("\n" + "=" * 60)
+    print(f"📈 LOTE ({len(result['files'])} archivos)")
+    print("=" * 60)
+    for r in result["files"]:
+        name = os.path.basename(r["file"])
+        if "error" in r:
+            print(f"   {name:<24} ❌ {r['error']}")
+            continue
+        print(f"   {name:<24} ×{r['realtime_factor']:5.1f} tiempo real ({r['audio_s']:.0f}s en {r['wall_s']:.1f}s; "
+              f"STT {r['stt_s']:.1f}s), {r['translated']}/{r['utterances']} frases, "
+              f"voz {r['speech_s']:.0f}s, {r['shifted']} desplazadas")
+    print(f"   {'TOTAL':<24} ×{result['realtime_factor']:5.1f} tiempo real "
+          f"({result['audio_s'] / 60:.1f} min de audio en {result['wall_s']:.1f}s)")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Dobla grabaciones (WAV) más rápido que el tiempo real")
+    p.add_argument("files", nargs="+", help="Archivos WAV de 16 bits")
+    p.add_argument("--lang", choices=sorted(TARGETS), default="en", help="Idioma hablado en los archivos")
+    p.add_argument("--out", default=getattr(main.config, "BATCH_OUTPUT_DIR", "doblado"),
+                   help="Directorio de salida (pistas WAV y segmentos JSON)")
+    p.add_argument("--jobs", type=int, default=getattr(main.config, "BATCH_JOBS", 4),
+                   help="Archivos procesados a la vez")
+    p.add_argument("--max-speed", type=float, default=getattr(main.config, "BATCH_MAX_SPEED", None),
+                   help="Límite de envío a Deepgram (× tiempo real; por defecto, sin límite)")
+    p.add_argument("--json", help="Guardar el informe en este archivo JSON")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        result = asyncio.run(run_batch(args.files, args.out, args.lang, args.jobs, args.max_speed))
+    except KeyboardInterrupt:
+        sys.exit(1)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
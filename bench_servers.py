@@ -0,0 +1,260 @@
+# bench_servers.py - Servidores locales que imitan Deepgram, DeepL y ElevenLabs (para benchmark.py)
+import json
+import time
+import base64
+import random
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import websockets
+
+# Frases que "transcribe" el Deepgram simulado (se recorren en orden)
+PHRASES = [
+    "hola a todos, ¿me escuchan bien?",
+    "sí, perfecto",
+    "pasemos a la siguiente diapositiva",
+    "los resultados del trimestre son mejores de lo esperado",
+    "¿alguna pregunta antes de continuar?",
+    "las ventas en Europa crecieron más de lo previsto, sobre todo en el segundo trimestre, "
+    "aunque en Asia bajaron un poco y habrá que revisar el presupuesto antes de la reunión de marzo",
+]
+
+
+class Delay:
+    """Latencia base + jitter uniforme (segundos); con probabilidad tail_p, tail_s extra (cola lenta)"""
+
+    def __init__(self, latency: float = 0.1, jitter: float = 0.0, seed: int = 0,
+                 tail_p: float = 0.0, tail_s: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tail_p = tail_p
+        self.tail_s = tail_s
+        self.rng = random.Random(seed)
+
+    def sample(self) -> float:
+        extra = self.tail_s if self.tail_p and self.rng.random() < self.tail_p else 0.0
+        return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)) + extra
+
+
+class MockDeepgram:
+    """
+    WebSocket tipo /v1/listen: cuenta el audio recibido (linear16, mulaw u Ogg
+    Opus según `encoding`), emite intermedios cada ~0.5 s de audio y un FINAL
+    al recibir Finalize (o tras 5 s sin Finalize). Como el real, cierra el
+    socket tras `idle_timeout` s sin ningún mensaje (audio o KeepAlive).
+    """
+
+    INTERIM_EVERY_S = 0.5
+    FORCE_FINAL_S = 5.0
+
+    def __init__(self, delay: Delay, bytes_per_second: int = 32000, idle_timeout: float = 10.0):
+        self.delay = delay
+        self.bytes_per_second = bytes_per_second
+        self.idle_timeout = idle_timeout
+        self.audio_bytes = 0
+        self.messages = 0
+        self.finals = 0
+        self.keepalives = 0
+        self.connections = 0
+        self.idle_closes = 0
+        self._phrase = 0
+
+    async def handler(self, ws):
+        query = parse_qs(urlparse(ws.request.path).query)
+        encoding = (query.get("encoding") or ["linear16"])[0]
+        bytes_per_second = self.bytes_per_second // 2 if encoding == "mulaw" else self.bytes_per_second
+        stream_s = 0.0          # Segundos de audio recibidos en esta conexión
+        segment_start = 0.0     # Inicio del segmento pendiente de FINAL
+        next_interim = self.INTERIM_EVERY_S
+        self.connections += 1
+        while True:
+            try:
+                msg = await asyncio.wait_for(ws.recv(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                self.idle_closes += 1
+                await ws.close(1011, "NET-0001: no audio received")
+                return
+            except websockets.ConnectionClosed:
+                return
+            self.messages += 1
+            if isinstance(msg, str):
+                kind = json.loads(msg).get("type")
+                self.keepalives += kind == "KeepAlive"
+                if kind == "Finalize" and stream_s > segment_start:
+                    await self._send_result(ws, segment_start, stream_s, final=True)
+                    segment_start = stream_s
+                continue
+            self.audio_bytes += len(msg)
+            if encoding == "opus":
+                stream_s = max(stream_s, _ogg_end_s(msg))
+            else:
+                stream_s += len(msg) / bytes_per_second
+            if stream_s - segment_start >= self.FORCE_FINAL_S:
+                await self._send_result(ws, segment_start, stream_s, final=True)
+                segment_start = stream_s
+                next_interim = stream_s + self.INTERIM_EVERY_S
+            elif stream_s >= next_interim:
+                next_interim = stream_s + self.INTERIM_EVERY_S
+                asyncio.ensure_future(self._send_result(ws, segment_start, stream_s, final=False))
+
+    async def _send_result(self, ws, start, end, final):
+        phrase = PHRASES[self._phrase % len(PHRASES)]
+        if final:
+            self._phrase += 1
+            self.finals += 1
+        else:
+            # Intermedio: prefijo de la frase proporcional al audio recibido
+            words = phrase.split()
+            phrase = " ".join(words[:max(1, int((end - start) / self.INTERIM_EVERY_S))])
+        await asyncio.sleep(self.delay.sample())
+        try:
+            await ws.send(json.dumps({
+                "type": "Results",
+                "start": start,
+                "duration": end - start,
+                "is_final": final,
+                "speech_final": final,
+                "channel": {"alternatives": [{"transcript": phrase, "confidence": 0.99}]},
+            }))
+        except websockets.ConnectionClosed:
+            pass
+
+
+def _ogg_end_s(data: bytes) -> float:
+    """Posición (s) al final de la última página Ogg Opus del mensaje (granule a 48 kHz)"""
+    pos, granule = 0, 0
+    while data.startswith(b"OggS", pos) and pos + 27 <= len(data):
+        n_segments = data[pos + 26]
+        granule = max(granule, int.from_bytes(data[pos + 6:pos + 14], "little", signed=True))
+        pos += 27 + n_segments + sum(data[pos + 27:pos + 27 + n_segments])
+    return max(0, granule - 312) / 48000
+
+
+class MockElevenLabs:
+    """
+    WebSocket tipo stream-input: acumula el texto y lo sintetiza con flush o al
+    superar el umbral de chunk_length_schedule (como el servicio real). Devuelve
+    PCM 16 kHz (tono) en chunks de CHUNK_MS, ~60 ms de audio por carácter, con
+    alineación. Cierra el socket tras `idle_timeout` s sin mensajes (el real, a los 20 s)
+    y, como el real, al recibir el texto vacío de fin de entrada (tras isFinal).
+    """
+
+    CHUNK_MS = 100
+    MS_PER_CHAR = 60
+
+    def __init__(self, delay: Delay, sample_rate: int = 16000, ms_per_char: float = 0.0,
+                 idle_timeout: float = 20.0):
+        self.delay = delay
+        self.idle_timeout = idle_timeout
+        self.connections = 0
+        self.idle_closes = 0
+        self.ms_per_char = ms_per_char   # Espera extra hasta el primer chunk por carácter a sintetizar
+        self.sample_rate = sample_rate
+        self.requests = 0
+        self.audio_bytes = 0
+        t = np.arange(sample_rate * self.CHUNK_MS // 1000) / sample_rate
+        chunk = (np.sin(2 * np.pi * 220 * t) * 3000).astype(np.int16).tobytes()
+        self._chunk_b64 = base64.b64encode(chunk).decode("ascii")
+        self._chunk_len = len(chunk)
+
+    async def handler(self, ws):
+        schedule = [50]
+        step = 0        # Umbral en uso: avanza con cada síntesis sin flush
+        buffer = ""
+        self.connections += 1
+        while True:
+            try:
+                msg = await asyncio.wait_for(ws.recv(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                self.idle_closes += 1
+                await ws.close(1000, "input_timeout_exceeded")
+                return
+            except websockets.ConnectionClosed:
+                return
+            data = json.loads(msg)
+            schedule = (data.get("generation_config") or {}).get("chunk_length_schedule") or schedule
+            eos = data.get("text") == ""    # Fin de la entrada: sintetizar lo pendiente y cerrar
+            buffer += data.get("text") or ""
+            text = buffer.strip()
+            flush = bool(data.get("flush")) or eos
+            if not text or not (flush or len(text) >= schedule[min(step, len(schedule) - 1)]):
+                if eos:
+                    await self._close_input(ws)
+                    return
+                continue  # Warmup / keepalive / por debajo del umbral
+            buffer = ""
+            step = 0 if flush else step + 1
+            self.requests += 1
+            await asyncio.sleep(self.delay.sample() + len(text) * self.ms_per_char / 1000)
+            n_chunks = max(1, len(text) * self.MS_PER_CHAR // self.CHUNK_MS)
+            for i in range(n_chunks):
+                # Alineación como la real: los caracteres que cubre cada chunk
+                chars = list(text[i * len(text) // n_chunks:(i + 1) * len(text) // n_chunks])
+                await ws.send(json.dumps({
+                    "audio": self._chunk_b64,
+                    "isFinal": None,
+                    "alignment": {"chars": chars},
+                }))
+                self.audio_bytes += self._chunk_len
+                await asyncio.sleep(0)
+            if eos:
+                await self._close_input(ws)
+                return
+
+    @staticmethod
+    async def _close_input(ws):
+        try:
+            await ws.send(json.dumps({"isFinal": True}))
+            await ws.close()
+        except websockets.ConnectionClosed:
+            pass
+
+
+class MockDeepL:
+    """Servidor HTTP con POST /v2/translate (cuerpo JSON o formulario)"""
+
+    def __init__(self, delay: Delay, port: int, ms_per_char: float = 0.0):
+        self.delay = delay
+        self.ms_per_char = ms_per_char   # Latencia extra por carácter traducido
+        self.requests = 0
+        self.characters = 0
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8")
+                if "json" in (self.headers.get("Content-Type") or ""):
+                    req = json.loads(body)
+                    texts, target = req.get("text", []), req.get("target_lang", "")
+                else:
+                    form = parse_qs(body)
+                    texts, target = form.get("text", []), (form.get("target_lang") or [""])[0]
+                mock.requests += 1
+                mock.characters += sum(len(t) for t in texts)
+                time.sleep(mock.delay.sample() + sum(len(t) for t in texts) * mock.ms_per_char / 1000)
+                out = json.dumps({"translations": [
+                    {"detected_source_language": "ES" if target.startswith("EN") else "EN",
+                     "text": f"[{target}] {t}", "billed_characters": len(t)} for t in texts
+                ]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            def log_message(self, *args):
+                pass  # Silencioso
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
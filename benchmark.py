@@ -0,0 +1,433 @@
+# benchmark.py - Benchmark offline: WAV → pipeline completo → servidores locales simulados
+#
+# Uso:
+#   python benchmark.py --es-wav voz_es.wav [--en-wav reunion_en.wav] [--speed 1.0]
+#   python benchmark.py --synthetic 30 --dg-latency 0.15 --jitter 0.05
+#   python benchmark.py --synthetic 120 --batch 4 --jobs 2   (modo por lotes, batch.py)
+#
+# Los WAV deben ser mono, 16 bits (si su frecuencia no es la del dispositivo
+# simulado se convierte al cargarlos). No hace falta ninguna
+# API key: Deepgram, DeepL y ElevenLabs se sustituyen por bench_servers.py.
+import os
+import sys
+import json
+import shutil
+import time
+import base64
+import wave
+import asyncio
+import argparse
+import tempfile
+import threading
+import numpy as np
+import websockets
+import deepl
+import main
+from bench_servers import Delay, MockDeepgram, MockDeepL, MockElevenLabs
+from tts_cache import TtsAudioCache
+from translation_backends import DeepLBackend
+import tts_decode
+import resampler
+import batch
+
+
+class WavInputStream:
+    """
+    Sustituto de sd.RawInputStream: entrega un WAV al callback a ritmo real
+    (× speed), convertido a la frecuencia con la que se abre el dispositivo
+    """
+
+    def __init__(self, path, callback, samplerate, blocksize, speed=1.0, **_):
+        self.path = path
+        self.callback = callback
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.speed = speed
+        self.seconds = 0.0
+        self.done = threading.Event()
+        self._running = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        if path is None:
+            self.done.set()
+            return
+        with wave.open(path, "rb") as w:
+            if w.getnchannels() != 1 or w.getsampwidth() != 2:
+                raise RuntimeError(f"{path}: se requiere WAV mono 16 bits")
+            self.pcm = w.readframes(w.getnframes())
+            if w.getframerate() != samplerate:
+                self.pcm = resampler.StreamingResampler(w.getframerate(), samplerate).process(self.pcm)
+        self.seconds = len(self.pcm) / 2 / samplerate
+
+    def start(self):
+        if self.path is not None:
+            self._running = True
+            self._thread.start()
+
+    def _run(self):
+        block_s = self.blocksize / self.samplerate / self.speed
+        block_bytes = self.blocksize * 2
+        next_t = time.perf_counter()
+        for offset in range(0, len(self.pcm), block_bytes):
+            if not self._running:
+                break
+            data = self.pcm[offset:offset + block_bytes]
+            self.callback(data, len(data) // 2, None, None)
+            next_t += block_s
+            delay = next_t - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self.done.set()
+
+    def stop(self):
+        self._running = False
+
+    def close(self):
+        pass
+
+
+class PcmSink:
+    """
+    Sustituto de sd.RawOutputStream en modo callback: un hilo hace de reloj del
+    dispositivo pidiendo un bloque cada blocksize/samplerate segundos.
+    """
+
+    def __init__(self, callback, device=None, samplerate=16000, blocksize=320, channels=1, **_):
+        self.callback = callback
+        self.device = device
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.block = bytearray(blocksize * 2 * channels)
+        self.bytes = 0      # Bytes de audio (bloques no silenciosos)
+        self.blocks = 0
+        self._running = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._running = True
+        self._thread.start()
+
+    def _run(self):
+        block_s = self.blocksize / self.samplerate
+        next_t = time.perf_counter()
+        while self._running:
+            self.callback(self.block, self.blocksize, None, None)
+            if any(self.block):
+                self.bytes += len(self.block)
+                self.blocks += 1
+            next_t += block_s
+            delay = next_t - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def stop(self):
+        self._running = False
+
+    def close(self):
+        pass
+
+
+def write_synthetic_wav(seconds: float, sample_rate: int, pause_s: float = 0.0) -> str:
+    """WAV de ráfagas tipo voz (armónicos con modulación) separadas por silencios
+    (y, con pause_s, una pausa larga cada 4 ráfagas: turnos en los que escucha el otro)"""
+    rng = np.random.default_rng(0)
+    out = []
+    total = 0
+    bursts = 0
+    while total < seconds * sample_rate:
+        bursts += 1
+        if pause_s and bursts % 4 == 0:
+            out.append(np.zeros(int(pause_s * sample_rate), dtype=np.int16))
+            total += int(pause_s * sample_rate)
+        n_voice = int(rng.uniform(1.0, 2.5) * sample_rate)
+        t = np.arange(n_voice) / sample_rate
+        f0 = rng.uniform(110, 220)
+        voice = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 8))
+        voice *= 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)  # Sílabas ~4 Hz
+        out.append((voice * 4000).astype(np.int16))
+        n_sil = int(rng.uniform(0.6, 1.2) * sample_rate)
+        out.append(np.zeros(n_sil, dtype=np.int16))
+        total += n_voice + n_sil
+    path = tempfile.mktemp(suffix=".wav")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(np.concatenate(out).tobytes())
+    return path
+
+
+async def run_benchmark(args) -> dict:
+    # 1. Servidores simulados
+    dg = MockDeepgram(Delay(args.dg_latency, args.jitter, seed=1), idle_timeout=args.dg_idle_timeout)
+    tts = MockElevenLabs(Delay(args.tts_latency, args.jitter, seed=2), ms_per_char=args.tts_ms_per_char,
+                         idle_timeout=args.tts_idle_timeout)
+    dl = MockDeepL(Delay(args.deepl_latency, args.jitter, seed=3, tail_p=args.deepl_tail_p, tail_s=args.deepl_tail_s),
+                   port=0, ms_per_char=args.deepl_ms_per_char)
+    dl.start()
+    # Backend alternativo local para la traducción cubierta (sin cola lenta)
+    alt = MockDeepL(Delay(args.deepl_latency, args.jitter, seed=4), port=0, ms_per_char=args.deepl_ms_per_char) \
+        if args.hedge else None
+    if alt:
+        alt.start()
+        alt_translator = deepl.Translator("benchmark-alt", server_url=f"http://127.0.0.1:{alt.server.server_address[1]}")
+        main.translation_backends.append(DeepLBackend("deepl-alt", lambda: alt_translator, main.TRANSLATE_CONCURRENCY))
+    dg_server = await websockets.serve(dg.handler, "127.0.0.1", 0)
+    tts_server = await websockets.serve(tts.handler, "127.0.0.1", 0)
+
+    main.DEEPGRAM_URL = f"ws://127.0.0.1:{dg_server.sockets[0].getsockname()[1]}/v1/listen"
+    main.ELEVENLABS_WS_BASE = f"ws://127.0.0.1:{tts_server.sockets[0].getsockname()[1]}"
+    main.DEEPGRAM_ENCODING = args.encoding
+    if args.coalesce_ms is not None:
+        main.DEEPGRAM_COALESCE_MS = args.coalesce_ms
+    if args.dg_keepalive is not None:
+        main.DEEPGRAM_KEEPALIVE_S = args.dg_keepalive
+    if args.tts_idle_close is not None:
+        main.TTS_IDLE_CLOSE_S = args.tts_idle_close or None
+    if args.clause_min_chars is not None:
+        main.clause_segmenter.min_chars = args.clause_min_chars
+    if args.device_rate:
+        # Dispositivos simulados con otra frecuencia nativa (p. ej. 48 kHz)
+        main.device_rate = lambda device, fallback: args.device_rate
+    main.translator = deepl.Translator("benchmark", server_url=f"http://127.0.0.1:{dl.server.server_address[1]}")
+    # Caché TTS en un directorio temporal: mide aciertos sin tocar la caché real
+    main.tts_cache = TtsAudioCache(tempfile.mkdtemp(prefix="tts_cache_")) if args.tts_cache else None
+
+    if args.batch:
+        return await run_batch_benchmark(args, dg, tts, dl, alt, (dg_server, tts_server))
+
+    # 2. Dispositivos falsos: cada entrada lee su WAV, cada salida es un sumidero
+    wavs = {"mic": args.es_wav, "meeting": args.en_wav}
+    inputs, sinks = [], []
+
+    def input_factory(device, callback, samplerate, blocksize, **_):
+        stream = WavInputStream(wavs[device], callback, samplerate, blocksize, args.speed)
+        inputs.append(stream)
+        return stream
+
+    def output_factory(**params):
+        sink = PcmSink(**params)
+        sinks.append(sink)
+        return sink
+
+    # 3. Ejecutar hasta agotar las entradas (+ cola para vaciar el pipeline)
+    t0 = time.perf_counter()
+    pipeline = asyncio.create_task(main.run_pipeline(
+        "mic", "speakers", "vb_input", "meeting",
+        input_factory=input_factory, output_factory=output_factory,
+    ))
+    while len(inputs) < 2 or not all(s.done.is_set() for s in inputs):
+        if pipeline.done():
+            break
+        await asyncio.sleep(0.1)
+    input_done = time.perf_counter()
+    await asyncio.sleep(args.tail)
+    pipeline.cancel()
+    try:
+        await pipeline
+    except asyncio.CancelledError:
+        pass
+    wall = time.perf_counter() - t0
+
+    dg_server.close()
+    tts_server.close()
+    dl.stop()
+    if alt:
+        alt.stop()
+
+    # 4. Informe
+    audio_in = sum(s.seconds for s in inputs)
+    out_s = sum(s.bytes / 2 / s.samplerate for s in sinks)
+    return {
+        "audio_in_s": audio_in,
+        "wall_s": wall,
+        "feed_s": input_done - t0,
+        "realtime_factor": audio_in / (input_done - t0) if input_done > t0 else 0.0,
+        "deepgram": {"encoding": args.encoding, "audio_bytes": dg.audio_bytes, "messages": dg.messages,
+                     "finals": dg.finals, "keepalives": dg.keepalives, "connections": dg.connections,
+                     "idle_closes": dg.idle_closes},
+        "deepl": {"requests": dl.requests, "characters": dl.characters,
+                  "alt_requests": alt.requests if alt else 0},
+        "translation": {"hedged": main.hedged_translator.summary(),
+                        "backends": [b.summary() for b in main.translation_backends]},
+        "elevenlabs": {"requests": tts.requests, "audio_bytes": tts.audio_bytes, "connections": tts.connections,
+                       "idle_closes": tts.idle_closes},
+        "output": {"pcm_s": out_s, "blocks": sum(s.blocks for s in sinks),
+                   "device_rates": sorted({s.samplerate for s in sinks})},
+        "tts_cache": main.tts_cache.stats() if main.tts_cache else None,
+        "latency": main.tracer.snapshot(),
+    }
+
+
+async def run_batch_benchmark(args, dg, tts, dl, alt, servers) -> dict:
+    """Modo por lotes: --batch copias del WAV de ES dobladas a la vez, sin reloj de tiempo real"""
+    work_dir = tempfile.mkdtemp(prefix="batch_")
+    paths = []
+    for i in range(args.batch):
+        paths.append(os.path.join(work_dir, f"reunion-{i + 1}.wav"))
+        shutil.copy(args.es_wav, paths[-1])
+    try:
+        result = await batch.run_batch(paths, os.path.join(work_dir, "doblado"), "es", args.jobs)
+    finally:
+        for server in servers:
+            server.close()
+        dl.stop()
+        if alt:
+            alt.stop()
+    result.update({
+        "output_dir": os.path.join(work_dir, "doblado"),
+        "deepgram": {"audio_bytes": dg.audio_bytes, "messages": dg.messages, "finals": dg.finals,
+                     "connections": dg.connections},
+        "deepl": {"requests": dl.requests, "characters": dl.characters},
+        "elevenlabs": {"requests": tts.requests, "audio_bytes": tts.audio_bytes, "connections": tts.connections},
+    })
+    return result
+
+
+def print_batch_report(r: dict):
+    batch.print_report(r)
+    print(f"Deepgram: {r['deepgram']['messages']} mensajes, {r['deepgram']['audio_bytes']} bytes, "
+          f"{r['deepgram']['finals']} finales, {r['deepgram']['connections']} conexiones")
+    print(f"DeepL: {r['deepl']['requests']} peticiones, {r['deepl']['characters']} caracteres")
+    print(f"ElevenLabs: {r['elevenlabs']['requests']} síntesis en {r['elevenlabs']['connections']} conexiones, "
+          f"{r['elevenlabs']['audio_bytes'] / 32000:.1f}s de PCM")
+    print(f"Pistas dobladas: {r['output_dir']}")
+
+
+def print_report(r: dict):
+    print("\n" + "=" * 60)
+    print("📊 BENCHMARK")
+    print("=" * 60)
+    print(f"Audio de entrada: {r['audio_in_s']:.1f}s en {r['feed_s']:.1f}s "
+          f"(×{r['realtime_factor']:.2f} tiempo real), total {r['wall_s']:.1f}s")
+    print(f"Deepgram ({r['deepgram']['encoding']}): {r['deepgram']['messages']} mensajes, "
+          f"{r['deepgram']['audio_bytes']} bytes, "
+          f"{r['deepgram']['finals']} finales, {r['deepgram']['keepalives']} KeepAlive; "
+          f"{r['deepgram']['connections']} conexiones, {r['deepgram']['idle_closes']} cerradas por inactividad")
+    print(f"DeepL: {r['deepl']['requests']} peticiones, {r['deepl']['characters']} caracteres"
+          + (f" (+{r['deepl']['alt_requests']} al alternativo)" if r['deepl']['alt_requests'] else ""))
+    print(f"Traducción cubierta: {r['translation']['hedged']}")
+    for line in r["translation"]["backends"]:
+        print(f"   {line}")
+    print(f"ElevenLabs: {r['elevenlabs']['requests']} síntesis, salida {r['output']['pcm_s']:.1f}s de PCM "
+          f"({r['output']['blocks']} bloques con audio, dispositivo a "
+          f"{'/'.join(str(x) for x in r['output']['device_rates'])} Hz); {r['elevenlabs']['connections']} conexiones, "
+          f"{r['elevenlabs']['idle_closes']} cerradas por el servidor por inactividad")
+    if r["tts_cache"]:
+        c = r["tts_cache"]
+        print(f"Caché TTS: {c['hits']} aciertos / {c['misses']} fallos ({c['hit_rate']:.0%}), "
+              f"{c['bytes_saved']} bytes de síntesis ahorrados")
+    print(f"Latencia ({r['latency']['completed']} enunciados):")
+    for name, st in r["latency"]["stages"].items():
+        print(f"   {name:<24} p50 {st['p50_ms']:7.0f}ms  p95 {st['p95_ms']:7.0f}ms  p99 {st['p99_ms']:7.0f}ms")
+
+
+def decode_benchmark(chunk_ms: int = 100, count: int = 50) -> dict:
+    """Decodificación de mensajes tipo ElevenLabs: camino anterior vs. rápido (tiempo y memoria)"""
+    rng = np.random.default_rng(0)
+    messages = []
+    for _ in range(count):
+        pcm = rng.integers(-3000, 3000, 16 * chunk_ms, dtype=np.int16).tobytes()
+        messages.append(json.dumps({"audio": base64.b64encode(pcm).decode("ascii"), "isFinal": None,
+                                    "alignment": {"chars": list("hola a todos")}}))
+    frames = [m.encode("utf-8") for m in messages]
+    return {
+        "chunk_ms": chunk_ms,
+        "legacy": tts_decode.measure(tts_decode.legacy_decode, messages),
+        "fast": tts_decode.measure(tts_decode.AudioFrameDecoder().decode, frames),
+        "json_parser": tts_decode.JSON_PARSER,
+    }
+
+
+def print_decode_report(r: dict):
+    print(f"\n🔬 Decodificación ElevenLabs (chunks de {r['chunk_ms']}ms, JSON {r['json_parser']}):")
+    for name in ("legacy", "fast"):
+        st = r[name]
+        print(f"   {name:<7} {st['us_per_chunk']:6.1f}µs/chunk, {st['alloc_bytes_per_chunk']:7.0f} B asignados/chunk")
+
+
+def resample_benchmark(chunk_ms: int = 20) -> dict:
+    """Coste por chunk del resampler en las conversiones habituales (dispositivo ↔ pipeline)"""
+    pairs = [(48000, 16000), (16000, 48000), (44100, 16000), (16000, 44100)]
+    return {f"{a}->{b}": resampler.measure(a, b, chunk_ms) for a, b in pairs}
+
+
+def print_resample_report(r: dict):
+    print("\n🔬 Conversión de frecuencia por chunk (polifásica con estado vs. interpolación lineal sin filtro):")
+    for pair, st in r.items():
+        print(f"   {pair:<13} {st['us_per_chunk']:6.1f}µs/chunk de {st['chunk_ms']}ms ({st['taps']} taps/fase), "
+              f"lineal {st['naive_us_per_chunk']:5.1f}µs; diferencia máx. troceado vs. entero "
+              f"{st['max_diff_vs_whole']}, {st['out_samples']}/{st['expected_samples']} muestras")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark offline del traductor con servidores simulados")
+    p.add_argument("--es-wav", help="WAV que entra por el micrófono (dirección ES→EN)")
+    p.add_argument("--en-wav", help="WAV que entra por la reunión (dirección EN→ES)")
+    p.add_argument("--synthetic", type=float, default=0.0,
+                   help="Segundos de audio sintético para ES si no se indica --es-wav")
+    p.add_argument("--pause", type=float, default=0.0,
+                   help="Pausa larga (s) cada 4 ráfagas del audio sintético (silencios entre turnos)")
+    p.add_argument("--speed", type=float, default=1.0, help="Velocidad de lectura (1.0 = tiempo real)")
+    p.add_argument("--dg-latency", type=float, default=0.15, help="Latencia simulada de Deepgram (s)")
+    p.add_argument("--deepl-latency", type=float, default=0.12, help="Latencia simulada de DeepL (s)")
+    p.add_argument("--tts-latency", type=float, default=0.25, help="Latencia simulada de ElevenLabs (s)")
+    p.add_argument("--deepl-ms-per-char", type=float, default=1.0,
+                   help="Latencia extra de DeepL por carácter (ms; las frases largas tardan más)")
+    p.add_argument("--tts-ms-per-char", type=float, default=1.0,
+                   help="Espera extra hasta el primer audio por carácter enviado a sintetizar (ms)")
+    p.add_argument("--deepl-tail-p", type=float, default=0.0,
+                   help="Probabilidad de una respuesta lenta de DeepL (cola de latencia)")
+    p.add_argument("--deepl-tail-s", type=float, default=1.0, help="Retraso extra de las respuestas lentas (s)")
+    p.add_argument("--hedge", action="store_true",
+                   help="Añadir un DeepL alternativo local y cubrir las peticiones lentas con él")
+    p.add_argument("--dg-idle-timeout", type=float, default=10.0,
+                   help="Deepgram simulado cierra el socket tras este tiempo sin mensajes (s)")
+    p.add_argument("--tts-idle-timeout", type=float, default=20.0,
+                   help="ElevenLabs simulado cierra el socket tras este tiempo sin mensajes (s)")
+    p.add_argument("--dg-keepalive", type=float, help="Silencio tras el que se envía KeepAlive a Deepgram (s)")
+    p.add_argument("--tts-idle-close", type=float,
+                   help="Cerrar el WS de ElevenLabs tras este tiempo sin uso (s; 0 = mantenerlo con keepalives)")
+    p.add_argument("--jitter", type=float, default=0.03, help="Jitter uniforme ± (s)")
+    p.add_argument("--tail", type=float, default=3.0, help="Espera tras agotar la entrada (s)")
+    p.add_argument("--encoding", default="linear16", choices=["linear16", "mulaw", "opus"],
+                   help="Codificación del audio hacia Deepgram (comparar A/B con linear16)")
+    p.add_argument("--coalesce-ms", type=int, help="Audio por mensaje a Deepgram (ms; 0 = una trama por mensaje)")
+    p.add_argument("--clause-min-chars", type=int,
+                   help="Cláusula mínima al dividir finales largos (0 = frases siempre enteras)")
+    p.add_argument("--no-tts-cache", dest="tts_cache", action="store_false",
+                   help="Desactivar la caché de audio sintetizado")
+    p.add_argument("--decode-bench", action="store_true",
+                   help="Solo medir la decodificación de audio de ElevenLabs (anterior vs. rápida)")
+    p.add_argument("--device-rate", type=int,
+                   help="Frecuencia nativa de los dispositivos simulados (Hz; p. ej. 48000)")
+    p.add_argument("--resample-bench", action="store_true",
+                   help="Solo medir el coste por chunk de la conversión de frecuencia")
+    p.add_argument("--batch", type=int, default=0,
+                   help="Modo por lotes: doblar N copias del WAV de ES a la vez y medir el factor de tiempo real")
+    p.add_argument("--jobs", type=int, default=4, help="Archivos simultáneos en modo por lotes")
+    p.add_argument("--json", help="Guardar el informe en este archivo JSON")
+    args = p.parse_args(argv)
+    if not args.es_wav and not args.en_wav and not (args.decode_bench or args.resample_bench):
+        args.es_wav = write_synthetic_wav(args.synthetic or 20.0, main.SAMPLE_RATE, args.pause)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.decode_bench:
+        print_decode_report(decode_benchmark())
+        sys.exit(0)
+    if args.resample_bench:
+        print_resample_report(resample_benchmark())
+        sys.exit(0)
+    try:
+        report = asyncio.run(run_benchmark(args))
+    except KeyboardInterrupt:
+        sys.exit(1)
+    if args.batch:
+        print_batch_report(report)
+    else:
+        print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
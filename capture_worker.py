@@ -0,0 +1,72 @@
+# capture_worker.py - VAD fuera del hilo de PortAudio (handoff sin locks + worker por lotes)
+import time
+import threading
+import numpy as np
+
+
+class CaptureStats:
+    """Contadores por dispositivo: duración del callback, desbordes y trabajo del VAD"""
+
+    def __init__(self):
+        self.callbacks = 0
+        self.callback_total_s = 0.0
+        self.callback_max_s = 0.0
+        self.overflows = 0          # Desbordes reportados por PortAudio (input_overflow)
+        self.handoff_drops = 0      # Bloques (parcialmente) descartados por handoff lleno
+        self.dropped_bytes = 0
+        self.vad_frames = 0         # Tramas evaluadas con webrtcvad
+        self.gated_frames = 0       # Tramas descartadas por el pre-filtro de energía
+        self.echo_frames = 0        # Tramas descartadas por la puerta de eco
+        self.sent_frames = 0        # Tramas de voz entregadas al STT
+
+    def record_callback(self, seconds: float):
+        self.callbacks += 1
+        self.callback_total_s += seconds
+        if seconds > self.callback_max_s:
+            self.callback_max_s = seconds
+
+    def summary(self) -> str:
+        avg_us = self.callback_total_s / self.callbacks * 1e6 if self.callbacks else 0.0
+        return (
+            f"callback prom {avg_us:.0f}µs / máx {self.callback_max_s * 1e6:.0f}µs, "
+            f"{self.overflows} desbordes, {self.handoff_drops} descartes de handoff, "
+            f"VAD {self.vad_frames} tramas ({self.gated_frames} filtradas por energía, "
+            f"{self.echo_frames} por eco)"
+        )
+
+
+def frame_rms(region, frame_samples: int) -> np.ndarray:
+    """RMS por trama (vectorizado) de una zona contigua de tramas int16"""
+    x = np.frombuffer(region, dtype=np.int16).reshape(-1, frame_samples).astype(np.float32)
+    return np.sqrt(np.mean(x * x, axis=1))
+
+
+class VadWorker(threading.Thread):
+    """
+    Hilo que drena el buffer circular del callback y procesa tramas por lotes.
+    Sin locks: sondea el buffer cada `poll_s` (medio bloque de audio basta).
+    """
+
+    def __init__(self, ring, handle_regions, name: str, poll_s: float = 0.01, max_batch: int = 16):
+        super().__init__(name=f"vad-{name}", daemon=True)
+        self.ring = ring
+        self.handle_regions = handle_regions  # (regions) -> None
+        self.poll_s = poll_s
+        self.max_batch = max_batch
+        self._running = True
+
+    def run(self):
+        while self._running:
+            regions = self.ring.peek_regions(self.max_batch)
+            if not regions:
+                time.sleep(self.poll_s)
+                continue
+            try:
+                self.handle_regions(regions)
+            finally:
+                self.ring.consume(sum(len(r) for r in regions) // self.ring.frame_bytes)
+
+    def stop(self):
+        self._running = False
+        if self.is_alive():
+            self.join(timeout=1.0)
@@ -0,0 +1,60 @@
+# clause_segmenter.py - Divide los finales largos en cláusulas para traducirlas y sintetizarlas por partes
+import re
+
+# Después de puntuación fuerte (. ! ? ; : …) o de coma
+_PUNCTUATION = re.compile(r"(?<=[.!?;:…,])\s+")
+# Último recurso en tramos sin puntuación: antes de una conjunción
+_CONJUNCTION = re.compile(r"\s+(?=(?:y|pero|porque|aunque|sino|and|but|because|although|so)\b)", re.IGNORECASE)
+
+
+class ClauseSegmenter:
+    """
+    Corta un final en cláusulas de al menos `min_chars` caracteres (las piezas
+    cortas se juntan con la siguiente; un resto corto se une a la anterior).
+    Solo se segmenta a partir de 2 × min_chars: las frases cortas van enteras.
+    Los tramos sin puntuación de más de `max_chars` se cortan antes de una conjunción.
+
+    min_chars ronda el primer umbral de chunk_length_schedule de ElevenLabs (50
+    caracteres en destino): una cláusula más corta no empieza a sintetizarse
+    hasta que llega la siguiente. min_chars=0 desactiva la segmentación.
+    """
+
+    def __init__(self, min_chars: int = 60, max_chars: int = 160):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.segmented = 0      # Finales divididos
+        self.segments = 0       # Cláusulas producidas por esos finales
+
+    def split(self, text: str) -> list:
+        text = text.strip()
+        if self.min_chars <= 0 or len(text) < 2 * self.min_chars:
+            return [text]
+        segments = []
+        current = ""
+        for piece in self._pieces(text):
+            current = f"{current} {piece}" if current else piece
+            if len(current) >= self.min_chars:
+                segments.append(current)
+                current = ""
+        if current:
+            if segments:
+                segments[-1] = f"{segments[-1]} {current}"
+            else:
+                segments.append(current)
+        if len(segments) > 1:
+            self.segmented += 1
+            self.segments += len(segments)
+        return segments
+
+    def summary(self) -> str:
+        avg = self.segments / self.segmented if self.segmented else 0.0
+        return f"{self.segmented} finales largos divididos ({avg:.1f} cláusulas de media)"
+
+    def _pieces(self, text: str) -> list:
+        pieces = []
+        for piece in _PUNCTUATION.split(text):
+            if len(piece) > self.max_chars:
+                pieces.extend(p for p in _CONJUNCTION.split(piece) if p)
+            elif piece:
+                pieces.append(piece)
+        return pieces
@@ -0,0 +1,70 @@
+# conn_activity.py - Actividad por socket: tiempo sin tráfico, keepalives y reconexiones
+import time
+
+
+class SocketActivity:
+    """
+    Contadores de un socket de larga duración (y de los que lo sustituyen).
+    Distingue el tráfico útil (audio, texto, respuestas) del que solo sirve para
+    mantenerlo abierto, para decidir cuándo enviar un keepalive, cuándo cerrar
+    un socket ocioso y cuánto cuesta mantenerlo.
+    """
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        now = time.monotonic()
+        self.last_activity = now    # Último tráfico útil (enviado o recibido)
+        self.last_traffic = now     # Último tráfico de cualquier tipo (keepalives incluidos)
+        self.payload_bytes = 0
+        self.keepalives = 0
+        self.keepalive_bytes = 0
+        self.wasted_keepalives = 0  # Keepalives de sockets que se cerraron sin volver a usarse
+        self._unused_keepalives = 0  # Keepalives desde el último tráfico útil
+        self.opens = 0              # Sockets abiertos (el primero incluido)
+        self.reconnects = 0         # Reaperturas tras un fallo
+        self.idle_closes = 0        # Cierres voluntarios por inactividad
+        self.on_demand_opens = 0    # Reaperturas tras un cierre por inactividad
+
+    def opened(self, on_demand: bool = False, after_failure: bool = False):
+        self.opens += 1
+        self.on_demand_opens += on_demand
+        self.reconnects += after_failure
+        self.last_activity = self.last_traffic = time.monotonic()
+        self._unused_keepalives = 0
+
+    def closed(self, idle: bool = False):
+        """El socket se cerró: sus keepalives desde el último uso no sirvieron de nada"""
+        self.idle_closes += idle
+        self.wasted_keepalives += self._unused_keepalives
+        self._unused_keepalives = 0
+
+    def sent(self, nbytes: int):
+        self.payload_bytes += nbytes
+        self.used()
+
+    def received(self):
+        self.used()
+
+    def used(self):
+        """Tráfico útil (o un socket de reserva promovido): los keepalives previos sirvieron"""
+        self.last_activity = self.last_traffic = time.monotonic()
+        self._unused_keepalives = 0
+
+    def keepalive(self, nbytes: int):
+        self.keepalives += 1
+        self.keepalive_bytes += nbytes
+        self._unused_keepalives += 1
+        self.last_traffic = time.monotonic()
+
+    def idle_for(self) -> float:
+        """Segundos sin tráfico útil"""
+        return time.monotonic() - self.last_activity
+
+    def quiet_for(self) -> float:
+        """Segundos sin ningún tráfico (lo que ve el servidor para su timeout)"""
+        return time.monotonic() - self.last_traffic
+
+    def summary(self) -> str:
+        return (f"{self.opens} aperturas ({self.reconnects} tras fallo, {self.on_demand_opens} bajo demanda), "
+                f"{self.idle_closes} cierres por inactividad, {self.keepalives} keepalives "
+                f"({self.keepalive_bytes} B, {self.wasted_keepalives + self._unused_keepalives} sin uso posterior)")
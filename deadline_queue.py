@@ -0,0 +1,116 @@
+# deadline_queue.py - Colas con presupuesto de antigüedad: descartan lo obsoleto en vez de acumular retraso
+import time
+import asyncio
+
+
+class DeadlineQueue(asyncio.Queue):
+    """
+    asyncio.Queue que marca cada elemento con su hora de llegada.
+
+    - get() descarta los elementos más viejos que `max_age` segundos.
+    - put()/put_nowait() nunca bloquean: si la cola está llena se descarta el
+      elemento más antiguo (la latencia queda acotada, no crece sin límite).
+    - merge(a, b) opcional: al sacar un elemento, los que ya esperan detrás se
+      fusionan con él (p. ej. varias frases atrasadas → una sola traducción);
+      si devuelve None no son fusionables y el siguiente sale por separado.
+    - keep(item): elementos que nunca se descartan ni fusionan (None, marcadores).
+    - on_drop(item): aviso por cada elemento descartado (merge gestiona los fusionados).
+    """
+
+    def __init__(self, maxsize: int = 0, max_age: float = None, name: str = "",
+                 merge=None, keep=None, on_drop=None):
+        super().__init__(maxsize)
+        self.max_age = max_age
+        self.name = name
+        self.merge = merge
+        self.keep = keep or (lambda item: item is None)
+        self.on_drop = on_drop
+        self.dropped_stale = 0
+        self.dropped_full = 0
+        self.merged = 0
+        self._last_t = 0.0
+
+    # Hooks de asyncio.Queue: internamente se guardan pares (hora, elemento)
+    def _put(self, item):
+        self._queue.append((time.monotonic(), item))
+
+    def _get(self):
+        t, item = self._queue.popleft()
+        self._last_t = t
+        return item
+
+    def put_nowait(self, item):
+        if self.full():
+            # Descartar el más antiguo que se pueda descartar
+            for i, (_, old) in enumerate(self._queue):
+                if not self.keep(old):
+                    del self._queue[i]
+                    self.task_done()
+                    self.dropped_full += 1
+                    self._dropped(old)
+                    break
+            else:
+                return  # Todo es imprescindible: se pierde el nuevo
+        super().put_nowait(item)
+
+    async def put(self, item):
+        self.put_nowait(item)
+
+    def get_nowait(self):
+        while True:
+            item = super().get_nowait()  # QueueEmpty si no queda nada vigente
+            if not self._is_stale(self._last_t, item):
+                return self._merge_waiting(item)
+
+    async def get(self):
+        while True:
+            try:
+                return await super().get()
+            except asyncio.QueueEmpty:
+                continue  # Todo lo pendiente era obsoleto: esperar al siguiente
+
+    def stats(self) -> str:
+        return (f"{self.name}: {self.dropped_stale} obsoletos, {self.dropped_full} por cola llena, "
+                f"{self.merged} fusionados")
+
+    # --- Internos ---
+    def _is_stale(self, t, item) -> bool:
+        if self.max_age is None or self.keep(item) or time.monotonic() - t <= self.max_age:
+            return False
+        self.dropped_stale += 1
+        self._dropped(item)
+        return True
+
+    def _merge_waiting(self, item):
+        if self.merge is None or self.keep(item):
+            return item
+        while self._queue:
+            t, nxt = self._queue[0]
+            if self.keep(nxt):
+                break
+            if self._is_stale(t, nxt):
+                super().get_nowait()
+                continue
+            merged = self.merge(item, nxt)
+            if merged is None:
+                break
+            super().get_nowait()
+            item = merged
+            self.merged += 1
+        return item
+
+    def _dropped(self, item):
+        if self.on_drop:
+            self.on_drop(item)
+
+
+def merge_utterances(a, b):
+    """
+    merge para colas de texto (uid, texto[, final]): une los textos y conserva
+    el uid del más antiguo. Solo elementos de la misma forma, y las cláusulas
+    (uid, texto, final) solo con las de su mismo enunciado: mezclarlas con otro
+    dejaría su flujo por cláusulas sin cerrar. None si no son fusionables.
+    """
+    if len(a) != len(b) or (len(a) > 2 and a[0] != b[0]):
+        return None
+    return (a[0], f"{a[1]} {b[1]}", *b[2:])
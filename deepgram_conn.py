@@ -0,0 +1,257 @@
+# deepgram_conn.py - Conexiones Deepgram con reserva caliente y reenvío de audio al conmutar
+import time
+import json
+import asyncio
+from collections import deque
+import websockets
+from websockets.exceptions import ConnectionClosed
+from conn_activity import SocketActivity
+
+
+class DeepgramConnectionManager:
+    """
+    Mantiene una conexión activa y otra de reserva ya autenticada (warm standby).
+
+    Todo el audio enviado se guarda en un buffer de los últimos `replay_seconds`.
+    Si la conexión activa cae, se promueve la reserva (milisegundos en vez de
+    2-5 s de reconexión) y se reenvía el audio posterior al último FINAL, de
+    modo que no se pierden palabras. Después se abre una nueva reserva en segundo plano.
+
+    Durante los silencios (la captura no envía nada) la conexión activa recibe
+    un KeepAlive tras `keepalive_s` sin tráfico, y la reserva cada `keepalive_s`:
+    así Deepgram no las cierra y el siguiente enunciado no paga una reconexión.
+    """
+
+    KEEPALIVE_S = 5  # Deepgram cierra sockets sin tráfico tras ~10 s
+
+    def __init__(self, uri: str, headers: dict, label: str, replay_seconds: float = 3.0,
+                 bytes_per_second: int = 32000, standby: bool = True, framing=None,
+                 keepalive_s: float = None):
+        self.uri = uri
+        self.headers = headers
+        # Contenedor (Ogg Opus): framing() crea el flujo de cada conexión, None = sin contenedor
+        self.framing = framing
+        self._streams = {}          # websocket -> OggStream
+        self.label = label
+        self.replay_seconds = replay_seconds
+        self.bytes_per_second = bytes_per_second
+        self.use_standby = standby
+        self.keepalive_s = keepalive_s or self.KEEPALIVE_S
+        self.activity = SocketActivity(f"{label} activa")
+        self.standby_activity = SocketActivity(f"{label} reserva")
+        self.active = None
+        self.standby = None
+        self._standby_task = None
+        self._keepalive_task = None
+        self._lock = asyncio.Lock()
+        self._replay = deque()      # (offset_s en la conexión activa, duración_s, chunk)
+        self._sent_s = 0.0          # Segundos de audio enviados por la conexión activa
+        self._final_end_s = 0.0     # Fin (s) del último FINAL recibido en la conexión activa
+        self.failovers = 0
+        self.last_failover_ms = None
+        self.replayed_bytes = 0
+
+    # --- Ciclo de vida ---
+    async def start(self):
+        """
+        Abre la conexión activa (si hace falta) y lanza la de reserva. Si la
+        activa cayó y hay reserva abierta, se conmuta (con reenvío) en vez de
+        reconectar en frío y perder el audio pendiente.
+        """
+        if self.active is not None and not self._is_open(self.active) and self._is_open(self.standby):
+            await self.failover(self.active)
+        if not self._is_open(self.active):
+            failed = self.active is not None
+            if failed:
+                self.activity.closed()
+                self._streams.pop(self.active, None)
+            self.active = await self._connect()
+            self.activity.opened(after_failure=failed)
+            self._reset_offsets()
+        if not self._keepalive_task:
+            self._keepalive_task = asyncio.ensure_future(self._keepalive())
+        self._ensure_standby()
+
+    async def close(self):
+        for task in (self._standby_task, self._keepalive_task):
+            if task:
+                task.cancel()
+        self._standby_task = self._keepalive_task = None
+        self.activity.closed()
+        self.standby_activity.closed()
+        for ws in (self.active, self.standby):
+            if ws:
+                try:
+                    await ws.close()
+                except Exception:
+                    pass
+        self.active = self.standby = None
+        self._streams.clear()
+
+    # --- Envío / recepción ---
+    async def send(self, chunk: bytes, duration: float = None):
+        """
+        Envía audio por la conexión activa; si falla, conmuta y reenvía.
+        duration: segundos de audio del chunk (si está comprimido no se deduce de su tamaño)
+        Con el lock de la conmutación: mientras se reenvía el audio pendiente por
+        la conexión nueva, los chunks nuevos esperan detrás (el orden se mantiene).
+        """
+        async with self._lock:
+            self._remember(chunk, duration)
+            ws = self.active
+            self.activity.sent(len(chunk))
+            try:
+                await ws.send(self._framed(ws, chunk))
+                return
+            except ConnectionClosed:
+                pass
+        if not await self.failover(ws) and not any(c is chunk for _, _, c in self._replay):
+            # Otro coroutine ya conmutó sin este chunk en su reenvío: enviarlo por la nueva
+            await self.send(chunk, duration)
+
+    async def send_control(self, message: dict):
+        """
+        Mensajes de control (Finalize, CloseStream...) por la conexión activa, tras el audio.
+        Una caída se suele descubrir aquí (Finalize tras un silencio): se conmuta
+        como en send() y el mensaje se repite por la conexión nueva, tras el reenvío.
+        """
+        data = json.dumps(message)
+        async with self._lock:
+            ws = self.active
+            self.activity.sent(len(data))
+            try:
+                await ws.send(data)
+                return
+            except ConnectionClosed:
+                pass
+        await self.failover(ws)
+        await self.send_control(message)
+
+    async def messages(self):
+        """Itera los mensajes de la conexión activa, sobreviviendo a conmutaciones"""
+        while True:
+            ws = self.active
+            if ws is None:
+                return  # close() llamado
+            try:
+                async for msg in ws:
+                    self.activity.received()
+                    yield msg
+            except ConnectionClosed:
+                pass
+            if self.active is None:
+                return
+            await self.failover(ws)
+
+    def mark_final(self, end_s: float):
+        """Registra el fin (en s de stream) del último FINAL: ese audio ya no se reenvía"""
+        if end_s > self._final_end_s:
+            self._final_end_s = end_s
+
+    # --- Conmutación ---
+    async def failover(self, failed_ws) -> bool:
+        """
+        Sustituye la conexión caída por la reserva (o una nueva) y reenvía audio.
+        Devuelve False si otro coroutine ya había conmutado esa conexión.
+        """
+        async with self._lock:
+            if self.active is not failed_ws:
+                return False  # Otro coroutine ya conmutó
+            t0 = time.perf_counter()
+            ws = self.standby if self._is_open(self.standby) else None
+            self.standby = None
+            self.activity.closed()
+            self._streams.pop(failed_ws, None)
+            if ws is None:
+                ws = await self._connect()  # Sin reserva: reconexión en frío
+            else:
+                self.standby_activity.used()  # Sus keepalives sirvieron
+            self.activity.opened(after_failure=True)
+            pending = [(dur, chunk) for off, dur, chunk in self._replay if off + dur > self._final_end_s]
+            self.active = ws
+            self._reset_offsets()
+            for dur, chunk in pending:
+                self._remember(chunk, dur)
+                await ws.send(self._framed(ws, chunk))
+                self.replayed_bytes += len(chunk)
+            self.failovers += 1
+            self.last_failover_ms = (time.perf_counter() - t0) * 1000
+            print(f"🔁 [{self.label}] Deepgram conmutado en {self.last_failover_ms:.0f}ms "
+                  f"({len(pending)} bloques reenviados)")
+        self._ensure_standby()
+        return True
+
+    # --- Internos ---
+    async def _connect(self):
+        ws = await websockets.connect(self.uri, additional_headers=self.headers, ping_interval=20)
+        stream = self.framing() if self.framing else None
+        if stream:
+            # Flujo lógico nuevo por conexión: sus páginas empiezan en la cabecera BOS
+            self._streams[ws] = stream
+            await ws.send(stream.header())
+        return ws
+
+    def _framed(self, ws, chunk: bytes) -> bytes:
+        """El chunk (páginas ya codificadas, también las del reenvío) renumerado para `ws`"""
+        stream = self._streams.get(ws)
+        return stream.restamp(chunk) if stream else chunk
+
+    @staticmethod
+    def _is_open(ws) -> bool:
+        return ws is not None and ws.close_code is None
+
+    def summary(self) -> str:
+        return (f"{self.failovers} conmutaciones; activa: {self.activity.summary()}; "
+                f"reserva: {self.standby_activity.summary()}")
+
+    def _ensure_standby(self):
+        if not self.use_standby or self._is_open(self.standby):
+            return
+        if self._standby_task and not self._standby_task.done():
+            return
+        self._standby_task = asyncio.ensure_future(self._open_standby())
+
+    async def _open_standby(self):
+        try:
+            self.standby = await self._connect()
+            self.standby_activity.opened()
+        except Exception as e:
+            print(f"⚠️ [{self.label}] No se pudo abrir conexión de reserva: {e}")
+
+    async def _keepalive(self):
+        """KeepAlive a la activa tras keepalive_s sin tráfico (silencio) y a la reserva cada keepalive_s"""
+        msg = json.dumps({"type": "KeepAlive"})
+        tick = min(1.0, self.keepalive_s / 2)
+        while True:
+            await asyncio.sleep(tick)
+            ws = self.active
+            if self._is_open(ws) and self.activity.quiet_for() >= self.keepalive_s:
+                try:
+                    await ws.send(msg)
+                    self.activity.keepalive(len(msg))
+                except ConnectionClosed:
+                    pass  # send()/messages() conmutan
+            ws = self.standby
+            if ws is None or self.standby_activity.quiet_for() < self.keepalive_s:
+                continue
+            try:
+                await ws.send(msg)
+                self.standby_activity.keepalive(len(msg))
+            except ConnectionClosed:
+                self._streams.pop(ws, None)
+                self.standby = None
+                self.standby_activity.closed()
+                self._ensure_standby()
+
+    def _remember(self, chunk: bytes, dur: float = None):
+        if dur is None:
+            dur = len(chunk) / self.bytes_per_second
+        self._replay.append((self._sent_s, dur, chunk))
+        self._sent_s += dur
+        while self._replay and self._replay[0][0] + self._replay[0][1] < self._sent_s - self.replay_seconds:
+            self._replay.popleft()
+
+    def _reset_offsets(self):
+        self._replay.clear()
+        self._sent_s = 0.0
+        self._final_end_s = 0.0
@@ -0,0 +1,95 @@
+# echo_gate.py - Puerta de eco por señal de referencia (lo que reproducimos vs. lo que capturamos)
+import threading
+import numpy as np
+
+
+class EchoReference:
+    """
+    Anillo con el PCM que realmente salió por el dispositivo (se escribe desde el
+    callback de reproducción, incluido el silencio, para mantener la línea de tiempo).
+    """
+
+    def __init__(self, sample_rate: int, seconds: float = 1.0):
+        self.size = int(sample_rate * seconds)
+        self._ring = np.zeros(self.size, dtype=np.int16)
+        self._written = 0           # Muestras totales escritas (contador monótono)
+        self._lock = threading.Lock()
+
+    def write(self, pcm):
+        x = np.frombuffer(pcm, dtype=np.int16)
+        n = len(x)
+        if n >= self.size:
+            x = x[-self.size:]
+            n = self.size
+        with self._lock:
+            start = self._written % self.size
+            first = min(n, self.size - start)
+            self._ring[start:start + first] = x[:first]
+            if n > first:
+                self._ring[:n - first] = x[first:]
+            self._written += n
+
+    def latest(self, n: int) -> np.ndarray:
+        """Copia de las últimas `n` muestras reproducidas (en orden temporal)"""
+        n = min(n, self.size)
+        with self._lock:
+            end = self._written % self.size
+            if end >= n:
+                return self._ring[end - n:end].copy()
+            return np.concatenate((self._ring[self.size - (n - end):], self._ring[:end]))
+
+
+class EchoGate:
+    """
+    Decide qué tramas capturadas son eco de nuestra propia síntesis.
+
+    Correlación cruzada normalizada (vía FFT, vectorizada) entre la trama y la
+    referencia reciente, buscando en todos los retardos hasta `max_delay_ms`.
+    Si no se ha reproducido nada audible en esa ventana, la trama pasa sin
+    calcular nada (el caso habitual). Pensada para el worker VAD: check_region()
+    evalúa un lote entero con una sola referencia, fuera del hilo de audio.
+    """
+
+    def __init__(self, reference: EchoReference, sample_rate: int, frame_samples: int,
+                 max_delay_ms: int = 600, threshold: float = 0.5, min_ref_rms: float = 100.0):
+        self.reference = reference
+        self.frame_samples = frame_samples
+        self.window = min(reference.size, sample_rate * max_delay_ms // 1000 + frame_samples)
+        self.threshold = threshold
+        self.min_ref_rms = min_ref_rms
+        self.nfft = 1 << int(np.ceil(np.log2(self.window + frame_samples)))
+        self.checked = 0
+        self.echo_frames = 0
+
+    def check_region(self, region) -> np.ndarray:
+        """
+        Marca de eco para cada trama de una zona contigua (lote del worker VAD).
+        La referencia, su espectro y su energía acumulada se calculan una vez por
+        lote; las tramas se correlacionan todas en un único producto de FFTs.
+        """
+        x = np.frombuffer(region, dtype=np.int16)
+        m = self.frame_samples
+        frames = x[:len(x) // m * m].reshape(-1, m).astype(np.float32)
+        flags = np.zeros(len(frames), dtype=bool)
+        ref = self.reference.latest(self.window).astype(np.float32)
+        ref_energy = np.square(ref)
+        if not len(frames) or np.sqrt(ref_energy.mean()) < self.min_ref_rms:
+            return flags  # Nada audible reproducido recientemente
+        x_norm = np.sqrt(np.einsum("ij,ij->i", frames, frames))
+        live = x_norm >= 1.0
+        if not live.any():
+            return flags
+        csum = np.concatenate(([0.0], np.cumsum(ref_energy, dtype=np.float64)))
+        win_norm = np.sqrt(np.maximum(csum[m:] - csum[:-m], 1e-9))
+        # Solo cuentan retardos donde la referencia era audible
+        audible = win_norm >= self.min_ref_rms * np.sqrt(m)
+        if not audible.any():
+            return flags
+        self.checked += int(live.sum())
+        # corr[j, k] = sum(ref[k:k+m] * trama_j) para todos los retardos k
+        spectra = np.fft.rfft(ref, self.nfft) * np.conj(np.fft.rfft(frames[live], self.nfft, axis=1))
+        corr = np.fft.irfft(spectra, self.nfft, axis=1)[:, :len(ref) - m + 1]
+        ncc = np.max(np.abs(corr[:, audible]) / win_norm[audible], axis=1) / x_norm[live]
+        flags[live] = ncc >= self.threshold
+        self.echo_frames += int(flags.sum())
+        return flags
@@ -0,0 +1,66 @@
+# frame_coalescer.py - Agrupa tramas de audio en menos mensajes WebSocket (presupuesto de latencia)
+import time
+
+
+class FrameCoalescer:
+    """
+    Acumula las tramas (ya codificadas) de 20 ms hasta reunir `max_ms` de audio,
+    `max_bytes` de carga, o hasta que la primera lleve `max_wait_ms` esperando;
+    entonces se envían en un único mensaje. max_ms=0 desactiva la agrupación.
+    """
+
+    def __init__(self, max_ms: int = 60, max_wait_ms: int = None, max_bytes: int = 16384):
+        self.max_s = max_ms / 1000
+        self.max_wait_s = (max_ms if max_wait_ms is None else max_wait_ms) / 1000
+        self.max_bytes = max_bytes
+        self._parts = []
+        self._bytes = 0
+        self._duration = 0.0
+        self.deadline = None        # time.monotonic() en que hay que enviar lo acumulado
+        self.messages = 0
+        self.frames = 0
+        self.payload_bytes = 0
+        self._started = time.monotonic()
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._parts)
+
+    def add(self, payload: bytes, duration: float):
+        if not self._parts:
+            self.deadline = time.monotonic() + self.max_wait_s
+        self._parts.append(payload)
+        self._bytes += len(payload)
+        self._duration += duration
+
+    def full(self) -> bool:
+        return self._duration >= self.max_s or self._bytes >= self.max_bytes
+
+    def take(self):
+        """(carga, duración en s) del mensaje a enviar, y reinicia el lote"""
+        if not self._parts:
+            return b"", 0.0
+        payload = self._parts[0] if len(self._parts) == 1 else b"".join(self._parts)
+        duration = self._duration
+        self.messages += 1
+        self.frames += len(self._parts)
+        self.payload_bytes += len(payload)
+        self._parts = []
+        self._bytes = 0
+        self._duration = 0.0
+        self.deadline = None
+        return payload, duration
+
+    def stats(self) -> dict:
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return {
+            "messages": self.messages,
+            "messages_per_s": self.messages / elapsed,
+            "avg_payload_bytes": self.payload_bytes / self.messages if self.messages else 0.0,
+            "frames_per_message": self.frames / self.messages if self.messages else 0.0,
+        }
+
+    def summary(self) -> str:
+        st = self.stats()
+        return (f"{st['messages']} mensajes ({st['messages_per_s']:.1f}/s), carga media "
+                f"{st['avg_payload_bytes']:.0f} B, {st['frames_per_message']:.1f} tramas/mensaje")
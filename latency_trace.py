@@ -0,0 +1,171 @@
+# latency_trace.py - Trazas de latencia por enunciado (captura → STT → traducción → TTS → reproducción)
+import json
+import time
+import asyncio
+import itertools
+import threading
+from collections import OrderedDict, deque
+
+# Etapas en orden; cada histograma mide el tiempo desde la marca anterior presente
+STAGES = ["vad_onset", "speech_end", "stt_final", "translated", "tts_sent", "first_audio", "played"]
+
+
+class _Segment:
+    __slots__ = ("onset", "end", "finals")
+
+    def __init__(self, onset):
+        self.onset = onset
+        self.end = None
+        self.finals = 0
+
+
+class LatencyTracer:
+    """
+    Asigna un ID a cada enunciado y guarda marcas de tiempo monotónicas por etapa.
+
+    El VAD abre/cierra segmentos de voz (begin/end, llamados desde el hilo de
+    audio). Cada FINAL de Deepgram obtiene un ID con take(), heredando el inicio
+    de voz del segmento más antiguo pendiente; desde ahí el ID viaja con el texto
+    por las colas y cada etapa llama a mark(). Al reproducirse, finish() vuelca
+    las diferencias entre etapas en histogramas (p50/p95/p99).
+    """
+
+    STALE_SEGMENT_S = 3.0   # Segmentos cerrados sin FINAL (ruido) se olvidan tras esto
+    MAX_SAMPLES = 1000      # Muestras por histograma
+    MAX_OPEN = 500          # Enunciados en vuelo como máximo
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._segments = {}                 # key -> deque[_Segment]
+        self._open = OrderedDict()          # uid -> {etapa: t}
+        self.histograms = {}                # "etapa_previa→etapa" / "total" -> deque de segundos
+        self.completed = 0
+
+    # --- Segmentos de voz (hilo de audio) ---
+    def begin(self, key: str):
+        with self._lock:
+            self._segments.setdefault(key, deque()).append(_Segment(time.monotonic()))
+
+    def end(self, key: str):
+        with self._lock:
+            segments = self._segments.get(key)
+            if segments and segments[-1].end is None:
+                segments[-1].end = time.monotonic()
+
+    # --- Enunciados ---
+    def take(self, key: str) -> int:
+        """Nuevo ID para un FINAL de STT, enlazado con el segmento de voz que lo originó"""
+        now = time.monotonic()
+        uid = next(self._ids)
+        marks = {}
+        with self._lock:
+            segments = self._segments.get(key)
+            while segments and segments[0].end is not None and segments[0].finals == 0 \
+                    and now - segments[0].end > self.STALE_SEGMENT_S:
+                segments.popleft()
+            if segments:
+                seg = segments[0]
+                seg.finals += 1
+                marks["vad_onset"] = seg.onset
+                if seg.end is not None:
+                    marks["speech_end"] = seg.end
+                    segments.popleft()  # Segmento cerrado: este FINAL es el del Finalize
+        marks["stt_final"] = now
+        self._open[uid] = marks
+        while len(self._open) > self.MAX_OPEN:
+            self._open.popitem(last=False)
+        return uid
+
+    def mark(self, uid: int, stage: str):
+        marks = self._open.get(uid)
+        if marks is not None and stage not in marks:
+            marks[stage] = time.monotonic()
+
+    def discard(self, uid: int):
+        """El enunciado no llegará a reproducirse (duplicado, eco, error de traducción)"""
+        self._open.pop(uid, None)
+
+    def finish(self, uid: int):
+        marks = self._open.pop(uid, None)
+        if not marks:
+            return
+        prev = None
+        for stage in STAGES:
+            t = marks.get(stage)
+            if t is None:
+                continue
+            if prev is not None:
+                self._record(f"{prev[0]}→{stage}", t - prev[1])
+            prev = (stage, t)
+        first = next(marks[s] for s in STAGES if s in marks)
+        self._record("total", prev[1] - first)
+        self.completed += 1
+
+    # --- Exportación ---
+    def snapshot(self) -> dict:
+        out = {"completed": self.completed, "stages": {}}
+        for name, samples in list(self.histograms.items()):
+            ordered = sorted(samples)
+            out["stages"][name] = {
+                "count": len(ordered),
+                "p50_ms": _percentile(ordered, 0.50) * 1000,
+                "p95_ms": _percentile(ordered, 0.95) * 1000,
+                "p99_ms": _percentile(ordered, 0.99) * 1000,
+            }
+        return out
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        lines = [f"📊 Latencia por etapa ({snap['completed']} enunciados):"]
+        for name, st in snap["stages"].items():
+            lines.append(f"   {name:<24} p50 {st['p50_ms']:7.0f}ms  p95 {st['p95_ms']:7.0f}ms  "
+                         f"p99 {st['p99_ms']:7.0f}ms  (n={st['count']})")
+        return "\n".join(lines)
+
+    async def export_file(self, path: str, interval: float = 10.0):
+        """Escribe el snapshot JSON en `path` cada `interval` segundos"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            data = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+            await loop.run_in_executor(None, _write_text, path, data)
+
+    async def serve_http(self, port: int, host: str = "127.0.0.1"):
+        """Endpoint HTTP mínimo: cualquier GET devuelve el snapshot JSON"""
+        async def handle(reader, writer):
+            try:
+                await reader.readuntil(b"\r\n\r\n")
+                body = json.dumps(self.snapshot(), ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=utf-8\r\n"
+                    + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+            except Exception:
+                pass
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        print(f"📈 Métricas de latencia en http://{host}:{port}/")
+        async with server:
+            await server.serve_forever()
+
+    def _record(self, name: str, seconds: float):
+        samples = self.histograms.get(name)
+        if samples is None:
+            samples = self.histograms[name] = deque(maxlen=self.MAX_SAMPLES)
+        samples.append(seconds)
+
+
+def _percentile(ordered, q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _write_text(path: str, data: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(data)
@@ -3,7 +3,7 @@ import os
 import sys
 import asyncio
 import json
-import base64
+import time
 import sounddevice as sd
 import numpy as np
 import websockets
@@ -11,6 +11,26 @@ import deepl
 import webrtcvad
 from collections import deque
 import config
+import app_log
+from translation_cache import TranslationCache
+from speculative import SpeculativeTranslator
+from ring_buffer import FrameRingBuffer
+from capture_worker import CaptureStats, VadWorker, frame_rms
+from deepgram_conn import DeepgramConnectionManager
+from latency_trace import LatencyTracer
+from playback import PlaybackStream
+from deadline_queue import DeadlineQueue, merge_utterances
+from echo_gate import EchoReference, EchoGate
+from translation_pipeline import OrderedPipeline
+from tts_cache import TtsAudioCache
+from audio_encoding import PcmEncoder, make_encoder
+from frame_coalescer import FrameCoalescer
+from tts_decode import AudioFrameDecoder
+from clause_segmenter import ClauseSegmenter
+from translation_backends import DeepLBackend, HedgedTranslator
+from conn_activity import SocketActivity
+from resampler import StreamingResampler
+from websockets.exceptions import ConnectionClosedOK
 
 # Configurar salida UTF-8 para emojis en Windows
 if sys.platform == 'win32':
@@ -24,6 +44,20 @@ SAMPLE_RATE = config.SAMPLE_RATE
 CHANNELS = config.CHANNELS
 BLOCK_MS = 20  # 20ms para menor latencia (WebRTC VAD óptimo)
 BLOCK_SAMPLES = SAMPLE_RATE * BLOCK_MS // 1000
+TTS_SAMPLE_RATE = 16000  # Formato pcm_16000 de ElevenLabs
+
+# Abrir los dispositivos a su frecuencia nativa (default_samplerate) y convertir
+# en el propio proceso a la de VAD/Deepgram (SAMPLE_RATE) y ElevenLabs (16 kHz),
+# en vez de dejar que el driver o el mezclador del sistema remuestreen
+DEVICE_NATIVE_RATE = getattr(config, "DEVICE_NATIVE_RATE", True)
+
+# Marcador en la cola de audio: fin de enunciado detectado localmente por el VAD.
+# deepgram_stt responde enviando Finalize sin esperar al endpointing del servidor.
+END_OF_UTTERANCE = object()
+
+# Silencio tras la voz antes de cerrar el enunciado (se adapta a las pausas del hablante)
+HANGOVER_MIN_FRAMES = getattr(config, "VAD_HANGOVER_MIN_MS", 240) // BLOCK_MS
+HANGOVER_MAX_FRAMES = getattr(config, "VAD_HANGOVER_MAX_MS", 600) // BLOCK_MS
 
 # Nombres de dispositivos
 MIC_NAME = config.MICROPHONE_NAME
@@ -37,66 +71,244 @@ DEEPL_KEY = config.DEEPL_API_KEY
 ELEVEN_KEY = config.ELEVENLABS_API_KEY
 ELEVEN_VOICE_ID = config.ELEVENLABS_VOICE_ID
 
+# Registro: los hilos de audio y el event loop solo encolan; un hilo escribe en consola.
+# LOG_LEVEL="WARNING" deja la producción en silencio; límites en registros/s por categoría.
+app_log.setup(
+    level=getattr(config, "LOG_LEVEL", "INFO"),
+    fmt=getattr(config, "LOG_FORMAT", "text"),
+    default_rate=getattr(config, "LOG_RATE_PER_S", 20),
+    rates=getattr(config, "LOG_RATE_LIMITS", {"stt.interim": 2, "tts.chunks": 1, "capture.drops": 1}),
+)
+log_capture = app_log.get("capture")
+log_drops = app_log.get("capture.drops")
+log_stt = app_log.get("stt")
+log_interim = app_log.get("stt.interim")
+log_translate = app_log.get("translate")
+log_tts = app_log.get("tts")
+log_chunks = app_log.get("tts.chunks")
+
+# Endpoints (reemplazables por servidores locales, ver benchmark.py)
+DEEPGRAM_URL = getattr(config, "DEEPGRAM_URL", "wss://api.deepgram.com/v1/listen")
+# Audio hacia Deepgram: "linear16" (PCM, referencia), "mulaw" (mitad de bytes) u "opus"
+# (opcional: pip install opuslib + libopus nativa; sin ellas se usa linear16)
+DEEPGRAM_ENCODING = getattr(config, "DEEPGRAM_ENCODING", "linear16")
+# Tramas agrupadas por mensaje: hasta este audio (ms) o esta espera; 0 = una trama por mensaje
+DEEPGRAM_COALESCE_MS = getattr(config, "DEEPGRAM_COALESCE_MS", 60)
+# Silencio (s) tras el que se envía KeepAlive para que Deepgram no cierre el socket (~10 s)
+DEEPGRAM_KEEPALIVE_S = getattr(config, "DEEPGRAM_KEEPALIVE_S", 5)
+DEEPL_SERVER_URL = getattr(config, "DEEPL_SERVER_URL", None)  # None = endpoint oficial de DeepL
+ELEVENLABS_WS_BASE = getattr(config, "ELEVENLABS_WS_BASE", "wss://api.elevenlabs.io")
+
+# Trazas de latencia por enunciado (ID + marcas de tiempo por etapa)
+tracer = LatencyTracer()
+
+# Presupuestos de antigüedad de las colas (s): lo más viejo se descarta en vez de acumular retraso
+AUDIO_MAX_AGE = getattr(config, "AUDIO_QUEUE_MAX_AGE_S", 2.0)
+TEXT_MAX_AGE = getattr(config, "TEXT_QUEUE_MAX_AGE_S", 6.0)
+MERGE_BACKLOG = getattr(config, "MERGE_QUEUED_TEXT", True)
+
 ### ========== UTILIDADES ==========
+_device_index = None  # (dispositivos, nombres de host API): PortAudio se consulta una sola vez
+
+def device_index(refresh: bool = False):
+    """Lista de dispositivos y host APIs, enumerada una vez y reutilizada"""
+    global _device_index
+    if _device_index is None or refresh:
+        _device_index = (list(sd.query_devices()), [api['name'] for api in sd.query_hostapis()])
+    return _device_index
+
 def find_device(name_hint: str, kind: str):
     """Encuentra dispositivo por nombre. kind: 'input' o 'output'"""
-    devices = sd.query_devices()
+    devices, hostapis = device_index()
     for idx, dev in enumerate(devices):
         if name_hint.lower() in dev['name'].lower():
             # Verificar que sea del tipo correcto
-            if kind == 'input' and dev['max_input_channels'] > 0:
+            channels = dev['max_input_channels'] if kind == 'input' else dev['max_output_channels']
+            if channels > 0:
                 # Preferir MME o DirectSound sobre WDM-KS
-                hostapi = sd.query_hostapis()[dev['hostapi']]['name']
-                if 'WDM-KS' not in hostapi:
-                    print(f"✅ Dispositivo {kind}: [{idx}] {dev['name']} ({hostapi})")
-                    return idx
-            elif kind == 'output' and dev['max_output_channels'] > 0:
-                hostapi = sd.query_hostapis()[dev['hostapi']]['name']
+                hostapi = hostapis[dev['hostapi']]
                 if 'WDM-KS' not in hostapi:
                     print(f"✅ Dispositivo {kind}: [{idx}] {dev['name']} ({hostapi})")
                     return idx
     
     raise RuntimeError(f"❌ No se encontró dispositivo {kind} con nombre: {name_hint}")
 
+def device_rate(device, fallback: int) -> int:
+    """Frecuencia nativa del dispositivo si DEVICE_NATIVE_RATE; si no (o si no se conoce), `fallback`"""
+    if not DEVICE_NATIVE_RATE or not isinstance(device, int):
+        return fallback
+    devices, _ = device_index()
+    try:
+        return int(devices[device]['default_samplerate']) or fallback
+    except (IndexError, KeyError, TypeError, ValueError):
+        return fallback
+
+def _is_audio_marker(item) -> bool:
+    """Elementos de la cola de audio que nunca se descartan"""
+    return item is None or item is END_OF_UTTERANCE
+
+def _merge_utterances(a, b):
+    """Fusiona dos (uid, texto[, final]) atrasados en uno; la traza sigue al más antiguo"""
+    merged = merge_utterances(a, b)
+    if merged is not None and b[0] != a[0]:  # Cláusulas del mismo enunciado: una sola traza
+        tracer.discard(b[0])
+    return merged
+
+def _drop_utterance(item):
+    tracer.discard(item[0])
+
+def audio_queue(name: str) -> DeadlineQueue:
+    queue = DeadlineQueue(maxsize=500, max_age=AUDIO_MAX_AGE, name=name, keep=_is_audio_marker)
+
+    def dropped(_chunk):
+        log_drops.warning(f"⚠️ [{name}] Audio descartado: {queue.dropped_full} por cola llena, "
+                          f"{queue.dropped_stale} obsoletos")
+
+    queue.on_drop = dropped
+    return queue
+
+def text_queue(name: str) -> DeadlineQueue:
+    return DeadlineQueue(maxsize=50, max_age=TEXT_MAX_AGE, name=name,
+                         merge=_merge_utterances if MERGE_BACKLOG else None, on_drop=_drop_utterance)
+
 ### ========== TRADUCCIÓN ASÍNCRONA ==========
-translator = deepl.Translator(DEEPL_KEY)
+translator = None  # Se crea en el pre-calentamiento (o en la primera traducción)
+
+def get_translator() -> deepl.Translator:
+    global translator
+    if translator is None:
+        translator = deepl.Translator(DEEPL_KEY, server_url=DEEPL_SERVER_URL)
+    return translator
+
+# Caché de frases repetidas ("yes", "next slide"...): evita ida y vuelta a DeepL
+translation_cache = TranslationCache(
+    max_entries=getattr(config, "TRANSLATION_CACHE_SIZE", 512),
+    path=getattr(config, "TRANSLATION_CACHE_FILE", None),  # None = solo memoria
+)
+
+# Backends de traducción: DeepL principal + alternativos opcionales (otra cuenta
+# u otro endpoint, TRANSLATION_FALLBACKS). Cada uno con un pool acotado por
+# dirección, su circuito y sus latencias. Si el principal no responde dentro del
+# percentil TRANSLATE_HEDGE_PERCENTILE de su latencia, la petición se cubre con
+# el siguiente: gana la primera respuesta.
+TRANSLATE_CONCURRENCY = getattr(config, "TRANSLATE_CONCURRENCY", 4)
+translation_backends = [DeepLBackend("deepl", get_translator, TRANSLATE_CONCURRENCY)] + [
+    DeepLBackend.from_config(spec, TRANSLATE_CONCURRENCY) for spec in getattr(config, "TRANSLATION_FALLBACKS", [])
+]
+hedged_translator = HedgedTranslator(
+    translation_backends,
+    percentile=getattr(config, "TRANSLATE_HEDGE_PERCENTILE", 0.9),
+    min_delay_s=getattr(config, "TRANSLATE_HEDGE_MIN_S", 0.05),
+    max_delay_s=getattr(config, "TRANSLATE_HEDGE_MAX_S", 1.0),
+)
+
+# Finales largos: se traducen por cláusulas a la vez y cada una va al TTS en
+# cuanto está lista (el flush solo con la última). 0 = frases siempre enteras.
+clause_segmenter = ClauseSegmenter(
+    min_chars=getattr(config, "CLAUSE_SEGMENT_MIN_CHARS", 60),
+    max_chars=getattr(config, "CLAUSE_SEGMENT_MAX_CHARS", 160),
+)
 
-async def translate_text_async(text: str, target: str):
-    """Traduce texto de forma asíncrona (no bloquea event loop). target: 'EN-US' o 'ES'"""
+async def translate_text_async(text: str, target: str, store: bool = True):
+    """
+    Traduce texto de forma asíncrona (no bloquea event loop). target: 'EN-US' o 'ES'
+    store=False (traducciones especulativas): consulta la caché sin contar en sus
+    estadísticas y no guarda el resultado.
+    """
     if not text.strip():
         return ""
+    cached = translation_cache.get(text, target, count=store)
+    if cached is not None:
+        return cached
     try:
-        loop = asyncio.get_event_loop()
-        # Ejecutar en thread pool para no bloquear
-        result = await loop.run_in_executor(
-            None,
-            lambda: translator.translate_text(text, target_lang=target)
-        )
-        return result.text
+        # En los pools de los backends (no bloquea), cubierta si el principal se retrasa
+        result = await hedged_translator.translate(text, target)
+        if store:
+            translation_cache.put(text, target, result)
+        return result
     except Exception as e:
-        print(f"❌ Error traduciendo: {e}")
+        log_translate.error(f"❌ Error traduciendo: {e}")
         return ""
 
-### ========== SPEECH-TO-TEXT (Deepgram nova-3 con emisión incremental) ==========
-async def deepgram_stt(audio_queue: asyncio.Queue, lang: str, text_queue: asyncio.Queue):
+async def translate_clauses(uid: int, segments: list, target: str, flags: str):
     """
-    Streaming STT con Deepgram (nova-3) + endpointing corto + emisión incremental.
-    lang: 'es' o 'en'
+    Traduce todas las cláusulas a la vez y las entrega en orden según terminan:
+    (uid, traducción, False) y la última (uid, traducción, True). Si la última
+    falla se entrega (uid, "", True) para que el TTS cierre el enunciado.
     """
+    tasks = [asyncio.create_task(translate_text_async(segment, target)) for segment in segments]
+    sent = 0
+    try:
+        for i, (segment, task) in enumerate(zip(segments, tasks)):
+            final = i == len(tasks) - 1
+            translated = await task
+            if translated:
+                log_translate.info(f"✅ {flags} [{i + 1}/{len(tasks)}] '{segment}' → '{translated}'")
+                tracer.mark(uid, "translated")
+                sent += 1
+                yield (uid, translated, final)
+            else:
+                log_translate.warning(f"⚠️ No se pudo traducir la cláusula: '{segment}'")
+                if final and sent:
+                    yield (uid, "", True)
+        if not sent:
+            tracer.discard(uid)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+### ========== SPEECH-TO-TEXT (Deepgram nova-3 con emisión incremental) ==========
+def deepgram_connection(lang: str, encoder: PcmEncoder) -> DeepgramConnectionManager:
+    """Conexión (sin abrir) con la URL y cabeceras de deepgram_stt; start() la abre"""
     # Usar en-US para inglés y es para español
     language = "en-US" if lang.startswith("en") else "es"
     
     # Configuración básica compatible con todos los planes
     uri = (
-        "wss://api.deepgram.com/v1/listen"
+        f"{DEEPGRAM_URL}"
         f"?language={language}"
-        f"&encoding=linear16"
-        f"&sample_rate=16000"
+        f"&{encoder.query()}"
         f"&punctuate=true"
         f"&interim_results=true"
     )
     headers = {"Authorization": f"Token {DG_KEY}"}
     
+    # Conexión activa + reserva caliente: una caída se resuelve en milisegundos
+    # reenviando el audio aún no finalizado por la nueva conexión
+    return DeepgramConnectionManager(
+        uri, headers, language,
+        replay_seconds=getattr(config, "DEEPGRAM_REPLAY_SECONDS", 3.0),
+        bytes_per_second=16000 * 2,
+        standby=getattr(config, "DEEPGRAM_STANDBY", True),
+        framing=encoder.new_stream,
+        keepalive_s=DEEPGRAM_KEEPALIVE_S,
+    )
+
+async def deepgram_stt(audio_queue: asyncio.Queue, lang: str, text_queue: asyncio.Queue,
+                       speculator: SpeculativeTranslator = None, trace_key: str = None,
+                       encoder: PcmEncoder = None, coalescer: FrameCoalescer = None,
+                       conn: DeepgramConnectionManager = None, speech_hint: asyncio.Event = None,
+                       on_final=None):
+    """
+    Streaming STT con Deepgram (nova-3) + endpointing corto + emisión incremental.
+    lang: 'es' o 'en'
+    speculator: si se indica, traduce en segundo plano los intermedios estables
+    trace_key: clave de trazas del AudioCapture que alimenta la cola (por defecto lang)
+    encoder: etapa de codificación del audio de subida (por defecto PCM linear16)
+    coalescer: agrupación de tramas en mensajes (por defecto DEEPGRAM_COALESCE_MS)
+    conn: conexión ya abierta en el pre-calentamiento (debe usar el mismo encoder)
+    speech_hint: se activa con cada transcripción (hay voz): el TTS de esta dirección
+    reabre su WebSocket mientras se termina la frase y se traduce
+    on_final(uid, inicio, fin): posición (s del audio enviado) de cada FINAL, antes
+    de emitirlo; uid None si no se emite (vacío o repetido). Lo usa el modo por lotes.
+    Emite (uid, texto) en text_queue.
+    """
+    trace_key = trace_key or lang
+    encoder = encoder or PcmEncoder(16000)
+    coalescer = coalescer or FrameCoalescer(DEEPGRAM_COALESCE_MS)
+    conn = conn or deepgram_connection(lang, encoder)
+    language = conn.label
+    
     reconnects = 0
     while True:
         try:
@@ -105,97 +317,289 @@ async def deepgram_stt(audio_queue: asyncio.Queue, lang: str, text_queue: asynci
             else:
                 print(f"🎤 [{language}] Conectando a Deepgram...")
             
-            async with websockets.connect(uri, additional_headers=headers, ping_interval=20) as ws:
-                print(f"✅ [{language}] Deepgram conectado (nova-3)")
-                reconnects = 0
-                
-                # --- Emisor de audio ---
-                async def send_audio():
-                    while True:
+            await conn.start()
+            print(f"✅ [{language}] Deepgram conectado (nova-3)")
+            reconnects = 0
+            
+            # --- Emisor de audio ---
+            async def send_batch():
+                payload, duration = coalescer.take()
+                if payload:
+                    await conn.send(payload, duration)
+            
+            async def send_audio():
+                pending_s = 0.0  # Audio retenido por el codificador aún sin enviar
+                while True:
+                    if coalescer.pending:
+                        # Lote abierto: tomar lo ya encolado o esperar como mucho hasta su plazo
+                        wait = coalescer.deadline - time.monotonic()
+                        if wait <= 0:
+                            await send_batch()
+                            continue
+                        try:
+                            chunk = audio_queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            try:
+                                chunk = await asyncio.wait_for(audio_queue.get(), wait)
+                            except asyncio.TimeoutError:
+                                await send_batch()
+                                continue
+                    else:
                         chunk = await audio_queue.get()
-                        if chunk is None:
-                            break
-                        await ws.send(chunk)
-                        # Sin sleep artificial - dejamos que WS module backpressure
-                    # Si cortamos manualmente, finalizamos
+                    if chunk is None:
+                        break
+                    if chunk is END_OF_UTTERANCE:
+                        tail = encoder.flush()
+                        if tail:
+                            coalescer.add(tail, pending_s)
+                            pending_s = 0.0
+                        await send_batch()
+                        # Fin de voz local: pedir el FINAL sin esperar al endpointing
+                        await conn.send_control({"type": "Finalize"})
+                        continue
+                    pending_s += len(chunk) / (16000 * 2)
+                    payload = encoder.encode(chunk)
+                    if payload:
+                        coalescer.add(payload, pending_s)
+                        pending_s = 0.0
+                        if coalescer.full():
+                            await send_batch()
+                # Si cortamos manualmente, finalizamos
+                try:
+                    await send_batch()
+                    await conn.send_control({"type": "Finalize"})
+                except:
+                    pass
+                
+            # --- Receptor de textos (HÍBRIDO: finales + incrementales con puntuación) ---
+            async def receive_text():
+                last_emitted_text = ""   # último texto emitido completo
+                last_emit_t = asyncio.get_event_loop().time()
+                EMIT_TIMEOUT = 1.5  # Emitir cada 1.5s para evitar timeout de ElevenLabs
+                
+                async for msg in conn.messages():
                     try:
-                        await ws.send(json.dumps({"type": "Finalize"}))
+                        data = json.loads(msg)
                     except:
-                        pass
-                
-                # --- Receptor de textos (HÍBRIDO: finales + incrementales con puntuación) ---
-                async def receive_text():
-                    last_emitted_text = ""   # último texto emitido completo
-                    last_emit_t = asyncio.get_event_loop().time()
-                    EMIT_TIMEOUT = 1.5  # Emitir cada 1.5s para evitar timeout de ElevenLabs
+                        continue
                     
-                    async for msg in ws:
-                        try:
-                            data = json.loads(msg)
-                        except:
-                            continue
-                        
-                        # Mensajes "Results" con transcripción
-                        ch = data.get("channel")
-                        if not isinstance(ch, dict):
-                            continue
-                        alts = ch.get("alternatives", [])
-                        if not alts:
-                            continue
-                        
-                        transcript = alts[0].get("transcript", "") or ""
-                        is_final = data.get("is_final") or data.get("speech_final")
-                        
-                        now = asyncio.get_event_loop().time()
-                        
-                        # SOLO emitir cuando es FINAL (evita repeticiones)
-                        if is_final:
-                            text = transcript.strip()
-                            if text:
-                                # Verificar si es realmente nuevo contenido
-                                # (no está contenido en el último texto ni es idéntico)
-                                is_duplicate = (
-                                    text == last_emitted_text or
-                                    text in last_emitted_text or
-                                    last_emitted_text in text and len(text) - len(last_emitted_text) < 3
-                                )
-                                
-                                if not is_duplicate:
-                                    print(f"📝 [{language}] ✅ FINAL: {text}")
-                                    await text_queue.put(text)
-                                    last_emitted_text = text
-                                else:
-                                    print(f"⏭️ [{language}] Fragmento ignorado (ya emitido): '{text}'")
-                        else:
-                            # Mostrar progreso pero NO emitir (solo FINALES)
-                            if transcript:
-                                print(f"� [{language}] Escuchando: {transcript}", end="\r")
+                    # Mensajes "Results" con transcripción
+                    ch = data.get("channel")
+                    if not isinstance(ch, dict):
+                        continue
+                    alts = ch.get("alternatives", [])
+                    if not alts:
+                        continue
                     
-                await asyncio.gather(send_audio(), receive_text())
+                    transcript = alts[0].get("transcript", "") or ""
+                    is_final = data.get("is_final") or data.get("speech_final")
+                    if transcript and speech_hint:
+                        speech_hint.set()
+                    
+                    now = asyncio.get_event_loop().time()
+                    
+                    # SOLO emitir cuando es FINAL (evita repeticiones)
+                    if is_final:
+                        # Audio hasta aquí ya transcrito: no reenviarlo si se conmuta
+                        start = data.get("start") or 0
+                        end = start + (data.get("duration") or 0)
+                        conn.mark_final(end)
+                        text = transcript.strip()
+                        uid = None
+                        if text:
+                            # Verificar si es realmente nuevo contenido
+                            # (no está contenido en el último texto ni es idéntico)
+                            is_duplicate = (
+                                text == last_emitted_text or
+                                text in last_emitted_text or
+                                last_emitted_text in text and len(text) - len(last_emitted_text) < 3
+                            )
+                            
+                            if not is_duplicate:
+                                log_stt.info(f"📝 [{language}] ✅ FINAL: {text}")
+                                if speculator:
+                                    speculator.finalize(text)
+                                uid = tracer.take(trace_key)
+                                if on_final:
+                                    on_final(uid, start, end)
+                                await text_queue.put((uid, text))
+                                last_emitted_text = text
+                            else:
+                                log_stt.debug(f"⏭️ [{language}] Fragmento ignorado (ya emitido): '{text}'")
+                                if speculator:
+                                    speculator.reset()
+                        if on_final and uid is None:
+                            on_final(None, start, end)
+                    else:
+                        # Mostrar progreso pero NO emitir (solo FINALES)
+                        if transcript:
+                            log_interim.debug(f"👂 [{language}] Escuchando: {transcript}")
+                            if speculator:
+                                speculator.observe_interim(transcript)
                 
+            sender = asyncio.create_task(send_audio())
+            receiver = asyncio.create_task(receive_text())
+            try:
+                await asyncio.gather(sender, receiver)
+            finally:
+                # Si una mitad falla, no dejar la otra consumiendo la cola
+                sender.cancel()
+                receiver.cancel()
+            
         except Exception as e:
             reconnects += 1
-            print(f"⚠️ [{language}] Deepgram desconectado: {e}. Reconectando...")
+            log_stt.warning(f"⚠️ [{language}] Deepgram desconectado: {e}. Reconectando...")
             continue
 
 ### ========== TEXT-TO-SPEECH (ElevenLabs WebSocket STREAMING - LATENCIA MÍNIMA) ==========
-async def elevenlabs_tts_stream(text_queue: asyncio.Queue, output_device: int, lang_label: str):
-    """
-    TTS por WebSocket streaming (PCM 16 kHz) para latencia mínima.
-    Mantiene la conexión abierta y reproduce a medida que llegan los trozos.
-    """
+# Caché de audio sintetizado: las frases repetidas suenan desde disco sin tocar el WS
+TTS_CACHE_DIR = getattr(config, "TTS_CACHE_DIR", "tts_cache")  # None = desactivada
+tts_cache = TtsAudioCache(
+    TTS_CACHE_DIR, getattr(config, "TTS_CACHE_MAX_MB", 200) * 1024 * 1024
+) if TTS_CACHE_DIR else None
+TTS_CACHE_GAP_S = 1.0   # Sin alineación: silencio del WS que da por terminada una síntesis
+TTS_CACHE_WAIT_S = 5.0  # Espera máxima a que el WS termine antes de sonar un acierto
+
+# Ciclo de vida del WS: tras TTS_IDLE_CLOSE_S sin tráfico útil se cierra (en vez de
+# mantenerlo con keepalives) y se reabre bajo demanda en cuanto el STT de esa
+# dirección oye voz, antes de que llegue la traducción. None = no cerrar nunca.
+TTS_IDLE_CLOSE_S = getattr(config, "TTS_IDLE_CLOSE_S", 10.0)
+TTS_KEEPALIVE_S = 15    # Si sigue abierto: un " " tras este silencio (ElevenLabs corta a los 20 s)
+
+ELEVEN_MODEL_ID = "eleven_turbo_v2_5"
+ELEVEN_OUTPUT_FORMAT = "pcm_16000"  # PCM 16kHz
+
+def eleven_voice_settings() -> dict:
+    return {
+        "stability": config.VOICE_STABILITY,
+        "similarity_boost": config.VOICE_SIMILARITY,
+        "use_speaker_boost": False
+    }
+
+async def elevenlabs_connect():
+    """Abre el WebSocket stream-input y envía la configuración inicial"""
     ws_url = (
-        f"wss://api.elevenlabs.io/v1/text-to-speech/{ELEVEN_VOICE_ID}/stream-input"
-        "?model_id=eleven_turbo_v2_5&output_format=pcm_16000"  # PCM 16kHz
+        f"{ELEVENLABS_WS_BASE}/v1/text-to-speech/{ELEVEN_VOICE_ID}/stream-input"
+        f"?model_id={ELEVEN_MODEL_ID}&output_format={ELEVEN_OUTPUT_FORMAT}"
     )
     # Usar additional_headers (compatible con versión antigua de websockets)
     headers = {"xi-api-key": ELEVEN_KEY}
+    ws = await websockets.connect(ws_url, additional_headers=headers, ping_interval=20)
+    # Warmup inicial con configuración (según docs de ElevenLabs)
+    init = {
+        "text": " ",
+        "voice_settings": eleven_voice_settings(),
+        "generation_config": {
+            "chunk_length_schedule": [50, 120, 160, 250]  # Baja latencia
+        },
+        "xi_api_key": ELEVEN_KEY
+    }
+    await ws.send(json.dumps(init))
+    return ws
+
+async def elevenlabs_synthesize(text: str) -> bytes:
+    """
+    Síntesis completa de un texto por un WebSocket propio (modo por lotes: sin
+    dispositivo ni jitter buffer). Devuelve el PCM 16 kHz entero; usa la caché TTS.
+    """
+    text = text.strip()
+    key = None
+    if tts_cache:
+        key = tts_cache.key(ELEVEN_VOICE_ID, f"{ELEVEN_MODEL_ID}/{ELEVEN_OUTPUT_FORMAT}",
+                            eleven_voice_settings(), text)
+        pcm = tts_cache.get(key)
+        if pcm is not None:
+            return pcm
+    decoder = AudioFrameDecoder()
+    chunks = []
+    ws = await elevenlabs_connect()
+    try:
+        await ws.send(json.dumps({"text": text + " ", "flush": True}))
+        await ws.send(json.dumps({"text": ""}))  # Fin de la entrada: el servidor cierra al terminar
+        while True:
+            try:
+                raw = await ws.recv(decode=False)
+            except ConnectionClosedOK:
+                break
+            pcm, data = decoder.decode(raw)
+            if "audio" not in data and "error" in data:
+                raise RuntimeError(f"Error de ElevenLabs: {data.get('error')}")
+            if pcm:
+                chunks.append(pcm)
+            if data.get("isFinal"):
+                break
+    finally:
+        await ws.close()
+    pcm = b"".join(chunks)
+    if key and pcm:
+        tts_cache.put(key, pcm)
+    return pcm
+
+async def elevenlabs_tts_stream(text_queue: asyncio.Queue, output_device: int, lang_label: str,
+                                output_factory=None, echo_reference: EchoReference = None, ws=None,
+                                demand: asyncio.Event = None):
+    """
+    TTS por WebSocket streaming (PCM 16 kHz) para latencia mínima.
+    Mantiene la conexión abierta y reproduce a medida que llegan los trozos: el
+    audio va a un jitter buffer que consume el callback del dispositivo, así el
+    event loop nunca bloquea en el hardware de audio.
+    text_queue entrega (uid, texto) o, para las cláusulas de un final largo,
+    (uid, texto, final): se envían sin flush y solo la última lo lleva.
+    output_factory: sustituto de sd.RawOutputStream (p. ej. sumidero PCM del benchmark)
+    echo_reference: si se indica, recibe todo el PCM reproducido (puerta de eco)
+    ws: conexión ya abierta por elevenlabs_connect() en el pre-calentamiento
+    demand: aviso de voz en el STT de origen (speech_hint): reabre el WS cerrado por inactividad
+    """
+    voice_settings = eleven_voice_settings()
+    prewarmed = ws
+    decoder = AudioFrameDecoder()
+    activity = SocketActivity(lang_label)
+    idle_closed = False     # WS cerrado por inactividad: se reabre con el próximo texto o aviso
+    pending_items = deque()  # Textos recibidos mientras estaba cerrado
+    IDLE = object()
+    
+    async def wait_for_demand():
+        """WS cerrado por inactividad: esperar al siguiente texto o al aviso de voz"""
+        getter = asyncio.ensure_future(text_queue.get())
+        hint = asyncio.ensure_future(demand.wait()) if demand else None
+        try:
+            await asyncio.wait([t for t in (getter, hint) if t], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if hint:
+                hint.cancel()
+            if getter.done() and not getter.cancelled():
+                pending_items.append(getter.result())
+            else:
+                getter.cancel()
     
     # Buffer para deduplicación de texto (evitar enviar repetidos)
     last_sent_text = ""  # Último texto enviado
+    open_uid = None      # Enunciado por cláusulas con texto aún sin flush en el WS
+    
+    # Enunciados enviados que aún esperan su primer chunk de audio (trazas).
+    # Aproximación: el primer chunk recibido tras un envío se atribuye a ese envío.
+    awaiting_audio = deque()
+    
+    # Síntesis por WS que se están grabando para la caché, en orden de envío.
+    # Cada una termina cuando la alineación cubre su texto (o, sin alineación,
+    # tras TTS_CACHE_GAP_S sin audio si era la única en vuelo).
+    cache = tts_cache
+    recording = deque()
+    ws_idle = asyncio.Event()   # Nada pendiente en el WS: un acierto puede sonar ya
+    ws_idle.set()
+    last_audio = 0.0
+    
+    def finish_recording(store: bool):
+        rec = recording.popleft()
+        if store and rec["chunks"] and rec["key"]:
+            cache.put(rec["key"], b"".join(rec["chunks"]))
+        if not recording:
+            ws_idle.set()
     
     # Intentar diferentes configuraciones de latencia (de más a menos óptima)
     stream = None
+    loop = asyncio.get_running_loop()
+    out_rate = device_rate(output_device, TTS_SAMPLE_RATE)
     audio_configs = [
         {"name": "WASAPI exclusivo", "latency": "low", "exclusive": True},
         {"name": "WASAPI compartido", "latency": "low", "exclusive": False},
@@ -216,18 +620,24 @@ async def elevenlabs_tts_stream(text_queue: asyncio.Queue, output_device: int, l
             
             # Intentar abrir el stream
             stream_params = {
-                "samplerate": 16000,  # Coincidir con formato de ElevenLabs
+                "samplerate": TTS_SAMPLE_RATE,  # Formato de ElevenLabs (se convierte si el dispositivo difiere)
+                "device_rate": out_rate,
                 "channels": 1,
                 "dtype": "int16",
                 "device": output_device,
-                "blocksize": BLOCK_SAMPLES
+                "blocksize": out_rate * BLOCK_MS // 1000
             }
             if audio_config["latency"]:
                 stream_params["latency"] = audio_config["latency"]
             if extra:
                 stream_params["extra_settings"] = extra
             
-            stream = sd.RawOutputStream(**stream_params)
+            stream = PlaybackStream(
+                output_factory or sd.RawOutputStream, loop,
+                prebuffer_ms=getattr(config, "PLAYBACK_PREBUFFER_MS", 60),
+                tap=echo_reference.write if echo_reference else None,
+                **stream_params
+            )
             stream.start()
             print(f"🔊 [{lang_label}] TTS WebSocket iniciado ({audio_config['name']})")
             break  # Éxito!
@@ -240,199 +650,448 @@ async def elevenlabs_tts_stream(text_queue: asyncio.Queue, output_device: int, l
         raise RuntimeError(f"No se pudo iniciar TTS stream para {lang_label}")
     
     reconnects = 0
-    while True:
-        try:
-            if reconnects:
-                await asyncio.sleep(min(2 + reconnects * 0.5, 5))
+    try:
+        while True:
+            try:
+                if reconnects:
+                    await asyncio.sleep(min(2 + reconnects * 0.5, 5))
+                elif idle_closed:
+                    await wait_for_demand()
+                    if pending_items and pending_items[0] is None:
+                        break  # Parada mientras estaba cerrado: no hace falta reabrir
             
-            async with websockets.connect(ws_url, additional_headers=headers, ping_interval=20) as ws:
-                print(f"✅ [{lang_label}] ElevenLabs WS conectado")
-                reconnects = 0
+                ws = prewarmed if prewarmed is not None and prewarmed.close_code is None else await elevenlabs_connect()
+                prewarmed = None
+                activity.opened(on_demand=idle_closed, after_failure=bool(reconnects))
+                async with ws:
+                    if idle_closed:
+                        log_tts.info(f"🔌 [{lang_label}] ElevenLabs WS reabierto bajo demanda")
+                    else:
+                        print(f"✅ [{lang_label}] ElevenLabs WS conectado")
+                    reconnects = 0
+                    idle_closed = False
+                    if demand:
+                        demand.clear()
                 
-                # Warmup inicial con configuración (según docs de ElevenLabs)
-                init = {
-                    "text": " ",
-                    "voice_settings": {
-                        "stability": config.VOICE_STABILITY,
-                        "similarity_boost": config.VOICE_SIMILARITY,
-                        "use_speaker_boost": False
-                    },
-                    "generation_config": {
-                        "chunk_length_schedule": [50, 120, 160, 250]  # Baja latencia
-                    },
-                    "xi_api_key": ELEVEN_KEY
-                }
-                await ws.send(json.dumps(init))
+                    # Conexión nueva: lo que quedara a medias no es atribuible
+                    while recording:
+                        finish_recording(store=False)
+                    open_uid = None
                 
-                async def sender():
-                    nonlocal last_sent_text
-                    while True:
-                        text = await text_queue.get()
-                        if text is None:
-                            # Solo salir del loop, NO cerrar WS (keepalive lo mantiene vivo)
-                            break
-                        
-                        # Deduplicación inteligente: detectar duplicados y fragmentos
+                    async def send_clause(uid: int, text: str, final: bool):
+                        """Cláusula de un final largo: ElevenLabs la acumula y empieza a sintetizar al
+                        superar el umbral de chunk_length_schedule; el flush va solo con la última"""
+                        nonlocal open_uid
                         text_clean = text.strip()
+                        first = uid != open_uid
+                        open_uid = None if final else uid
                         if text_clean:
-                            # Solo bloquear duplicados EXACTOS (menos agresivo)
-                            is_duplicate = text_clean.lower() == last_sent_text.lower()
+                            log_tts.info(f"🗣️ [{lang_label}] ⚡ Enviando cláusula{' (fin)' if final else ''}: {text}")
+                        # Terminado en espacio: así no se pega con la siguiente cláusula
+                        msg = json.dumps({"text": f"{text_clean} ", "flush": final})
+                        await ws.send(msg)
+                        activity.sent(len(msg))
+                        if not text_clean:
+                            return
+                        tracer.mark(uid, "tts_sent")
+                        if first:
+                            awaiting_audio.append(uid)
+                        if cache:
+                            # Sin clave: cuenta en la alineación pero no se guarda en la caché
+                            recording.append({"key": None, "chars": len(text_clean),
+                                              "chunks": [], "sent": time.monotonic()})
+                            ws_idle.clear()
+                
+                    async def next_item():
+                        """Siguiente texto, o IDLE tras TTS_IDLE_CLOSE_S sin tráfico útil"""
+                        if pending_items:
+                            return pending_items.popleft()
+                        if not TTS_IDLE_CLOSE_S:
+                            return await text_queue.get()
+                        hold = 0.0  # Cierre aplazado: hay voz en camino o un enunciado a medias
+                        while True:
+                            idle = time.monotonic() - max(activity.last_activity, hold)
+                            if idle < TTS_IDLE_CLOSE_S:
+                                try:
+                                    return await asyncio.wait_for(text_queue.get(), TTS_IDLE_CLOSE_S - idle)
+                                except asyncio.TimeoutError:
+                                    continue
+                            if open_uid is None and not (demand and demand.is_set()):
+                                return IDLE
+                            if demand:
+                                demand.clear()
+                            hold = time.monotonic()
+                
+                    async def sender():
+                        nonlocal last_sent_text, idle_closed
+                        while True:
+                            item = await next_item()
+                            if item is IDLE:
+                                log_tts.info(f"💤 [{lang_label}] WS sin uso en {activity.idle_for():.0f}s: "
+                                             f"cerrado hasta la próxima frase")
+                                idle_closed = True
+                                activity.closed(idle=True)
+                                await ws.close()
+                                return
+                            if item is None:
+                                # Solo salir del loop, NO cerrar WS (keepalive lo mantiene vivo)
+                                break
+                            if len(item) > 2:
+                                await send_clause(*item)
+                                continue
+                            uid, text = item
+                        
+                            # Deduplicación inteligente: detectar duplicados y fragmentos
+                            text_clean = text.strip()
+                            if text_clean:
+                                # Solo bloquear duplicados EXACTOS (menos agresivo)
+                                is_duplicate = text_clean.lower() == last_sent_text.lower()
                             
-                            if not is_duplicate:
-                                last_sent_text = text_clean
-                                print(f"🗣️ [{lang_label}] ⚡ Enviando: {text}")
-                                # Enviar con flush: true para generar inmediatamente
-                                await ws.send(json.dumps({
-                                    "text": text,
-                                    "flush": True  # Forzar generación inmediata
-                                }))
+                                if not is_duplicate:
+                                    last_sent_text = text_clean
+                                    key = None
+                                    if cache:
+                                        key = cache.key(ELEVEN_VOICE_ID, f"{ELEVEN_MODEL_ID}/{ELEVEN_OUTPUT_FORMAT}",
+                                                        voice_settings, text_clean)
+                                        pcm = cache.get(key)
+                                        if pcm is not None:
+                                            # Respetar el orden: esperar al audio que aún llega por el WS
+                                            try:
+                                                await asyncio.wait_for(ws_idle.wait(), TTS_CACHE_WAIT_S)
+                                            except asyncio.TimeoutError:
+                                                pass
+                                            log_tts.info(f"💾 [{lang_label}] ⚡ Desde caché: {text}")
+                                            tracer.mark(uid, "tts_sent")
+                                            tracer.mark(uid, "first_audio")
+                                            stream.write(pcm, on_played=_played_callback(uid))
+                                            continue
+                                    log_tts.info(f"🗣️ [{lang_label}] ⚡ Enviando: {text}")
+                                    # Enviar con flush: true para generar inmediatamente
+                                    msg = json.dumps({
+                                        "text": text,
+                                        "flush": True  # Forzar generación inmediata
+                                    })
+                                    await ws.send(msg)
+                                    activity.sent(len(msg))
+                                    tracer.mark(uid, "tts_sent")
+                                    awaiting_audio.append(uid)
+                                    if key:
+                                        recording.append({"key": key, "chars": len(text_clean),
+                                                          "chunks": [], "sent": time.monotonic()})
+                                        ws_idle.clear()
+                                else:
+                                    log_tts.debug(f"⏭️ [{lang_label}] ⏸️ Duplicado exacto omitido: '{text_clean}'")
+                                    tracer.discard(uid)
                             else:
-                                print(f"⏭️ [{lang_label}] ⏸️ Duplicado exacto omitido: '{text_clean}'")
+                                tracer.discard(uid)
                 
-                async def keepalive():
-                    """Mantiene la conexión activa enviando espacios cada 15s"""
-                    try:
-                        while True:
-                            await asyncio.sleep(15)  # Cada 15 segundos
-                            # Enviar espacio para mantener conexión (según docs)
-                            await ws.send(json.dumps({"text": " "}))
-                            print(f"💓 [{lang_label}] Keepalive enviado")
-                    except asyncio.CancelledError:
-                        pass
+                    async def keepalive():
+                        """Mantiene la conexión si lleva TTS_KEEPALIVE_S sin tráfico y no se ha cerrado por inactividad"""
+                        msg = json.dumps({"text": " "})
+                        while ws.close_code is None:
+                            await asyncio.sleep(1)
+                            if activity.quiet_for() >= TTS_KEEPALIVE_S and ws.close_code is None:
+                                # Enviar espacio para mantener conexión (según docs)
+                                await ws.send(msg)
+                                activity.keepalive(len(msg))
+                                log_tts.debug(f"💓 [{lang_label}] Keepalive enviado")
                 
-                async def receiver():
-                    first_chunk = True
-                    chunk_count = 0
-                    async for raw in ws:
-                        try:
-                            data = json.loads(raw)
-                        except Exception as e:
-                            print(f"⚠️ [{lang_label}] Error parseando respuesta: {e}")
-                            continue
+                    async def cache_watch():
+                        """Cierra grabaciones sin alineación (silencio) o que nunca recibieron audio"""
+                        while ws.close_code is None:
+                            await asyncio.sleep(0.2)
+                            if not recording:
+                                continue
+                            rec = recording[0]
+                            if rec["chunks"]:
+                                if time.monotonic() - last_audio >= TTS_CACHE_GAP_S:
+                                    # Con varias en vuelo no se sabe dónde acaba cada una
+                                    single = len(recording) == 1
+                                    while recording:
+                                        finish_recording(store=single)
+                            elif time.monotonic() - rec["sent"] >= TTS_CACHE_WAIT_S:
+                                finish_recording(store=False)
+                
+                    async def receiver():
+                        nonlocal last_audio
+                        first_chunk = True
+                        chunk_count = 0
+                        while True:
+                            try:
+                                # Bytes crudos del frame: sin decodificar a str ni parsear el base64 como JSON
+                                raw = await ws.recv(decode=False)
+                            except ConnectionClosedOK:
+                                break
+                            activity.received()
+                            try:
+                                pcm, data = decoder.decode(raw)
+                            except Exception as e:
+                                log_tts.warning(f"⚠️ [{lang_label}] Error parseando respuesta: {e}")
+                                continue
                         
-                        # Debug: ver qué llega
-                        if "audio" not in data and "error" in data:
-                            print(f"❌ [{lang_label}] Error de ElevenLabs: {data.get('error')}")
+                            # Debug: ver qué llega
+                            if "audio" not in data and "error" in data:
+                                log_tts.error(f"❌ [{lang_label}] Error de ElevenLabs: {data.get('error')}")
                         
-                        audio_b64 = data.get("audio")
-                        if audio_b64:
-                            chunk_count += 1
-                            pcm = base64.b64decode(audio_b64)
-                            if first_chunk:
-                                print(f"🔊 [{lang_label}] ⚡ PRIMERA SÍLABA reproducida!")
-                                first_chunk = False
-                            stream.write(pcm)
-                            # Debug: mostrar progreso cada 5 chunks
-                            if chunk_count % 5 == 0:
-                                print(f"🎵 [{lang_label}] Reproduciendo chunk {chunk_count}...")
+                            if pcm:
+                                chunk_count += 1
+                                uid = awaiting_audio.popleft() if awaiting_audio else None
+                                if uid is not None:
+                                    tracer.mark(uid, "first_audio")
+                                if first_chunk:
+                                    log_tts.info(f"🔊 [{lang_label}] ⚡ PRIMERA SÍLABA reproducida!")
+                                    first_chunk = False
+                                # No bloquea: encola en el jitter buffer
+                                stream.write(pcm, on_played=_played_callback(uid) if uid is not None else None)
+                                if recording:
+                                    last_audio = time.monotonic()
+                                    rec = recording[0]
+                                    rec["chunks"].append(pcm)
+                                    alignment = data.get("alignment")
+                                    if alignment:
+                                        rec["chars"] -= len(alignment.get("chars") or ())
+                                        if rec["chars"] <= 0:
+                                            finish_recording(store=True)
+                                # Debug: mostrar progreso cada 5 chunks
+                                if chunk_count % 5 == 0:
+                                    log_chunks.debug(f"🎵 [{lang_label}] Reproduciendo chunk {chunk_count}...")
                         
-                        # Verificar si es el último chunk
-                        if data.get("isFinal"):
-                            print(f"✅ [{lang_label}] Síntesis completada ({chunk_count} chunks)")
-                            first_chunk = True  # Resetear para próximo mensaje
-                            chunk_count = 0
+                            # Verificar si es el último chunk
+                            if data.get("isFinal"):
+                                single = len(recording) == 1
+                                while recording:
+                                    finish_recording(store=single)
+                                log_tts.info(f"✅ [{lang_label}] Síntesis completada ({chunk_count} chunks)")
+                                first_chunk = True  # Resetear para próximo mensaje
+                                chunk_count = 0
                 
-                await asyncio.gather(sender(), receiver(), keepalive())
+                    tasks = [asyncio.create_task(coro) for coro in
+                             (sender(), receiver(), keepalive(), *((cache_watch(),) if cache else ()))]
+                    try:
+                        send_task, recv_task = tasks[:2]
+                        await asyncio.wait((send_task, recv_task), return_when=asyncio.FIRST_COMPLETED)
+                        if recv_task.done() and not send_task.done():
+                            recv_task.result()
+                            # Cerrado por el servidor (p. ej. su límite de inactividad): reabrir bajo demanda
+                            log_tts.info(f"💤 [{lang_label}] ElevenLabs cerró el WS; se reabrirá con la próxima frase")
+                            activity.closed()
+                            idle_closed = True
+                        else:
+                            await asyncio.gather(send_task, recv_task)
+                    finally:
+                        # Ninguna tarea sobrevive a su conexión (un emisor huérfano consumiría la cola)
+                        for task in tasks:
+                            task.cancel()
                 
-        except Exception as e:
-            reconnects += 1
-            print(f"⚠️ [{lang_label}] TTS WS desconectado: {e}. Reconectando...")
-            if reconnects > 10:
-                print(f"❌ [{lang_label}] Demasiados fallos de reconexión. Abortando.")
-                break
-            continue
-        finally:
-            # Si salimos del bucle, detener
-            if reconnects > 10:
-                break
+            except Exception as e:
+                activity.closed()
+                reconnects += 1
+                log_tts.warning(f"⚠️ [{lang_label}] TTS WS desconectado: {e}. Reconectando...")
+                if reconnects > 10:
+                    print(f"❌ [{lang_label}] Demasiados fallos de reconexión. Abortando.")
+                    break
+                continue
+            finally:
+                # Si salimos del bucle, detener
+                if reconnects > 10:
+                    break
     
-    stream.stop()
-    stream.close()
-    print(f"⏹️ [{lang_label}] TTS detenido")
+    finally:
+        stream.stop()
+        stream.close()
+        print(f"⏹️ [{lang_label}] TTS detenido ({stream.summary()}; {decoder.summary()})")
+        print(f"📊 [{lang_label}] WS ElevenLabs: {activity.summary()}")
+
+def _played_callback(uid: int):
+    """Marca de traza cuando el dispositivo empieza a reproducir el primer chunk"""
+    def played():
+        tracer.mark(uid, "played")
+        tracer.finish(uid)
+    return played
 
 ### ========== CAPTURA DE AUDIO CON VAD ==========
 class AudioCapture:
-    """Captura audio de un dispositivo y usa VAD para detectar voz"""
+    """
+    Captura audio de un dispositivo y usa VAD para detectar voz.
+    use_worker=True: el callback solo copia al buffer circular y un hilo aparte
+    hace VAD por lotes (con pre-filtro de energía) y entrega a la cola.
+    """
     
-    def __init__(self, device_idx: int, audio_queue: asyncio.Queue, name: str):
+    def __init__(self, device_idx: int, audio_queue: asyncio.Queue, name: str, use_worker: bool = None,
+                 input_factory=None):
         self.device_idx = device_idx
+        self.input_factory = input_factory or sd.RawInputStream  # Sustituible (WAV en benchmark.py)
         self.audio_queue = audio_queue
         self.name = name
         self.vad = webrtcvad.Vad(config.VAD_AGGRESSIVENESS)
-        self.buffer = bytearray()
+        if use_worker is None:
+            use_worker = getattr(config, "CAPTURE_VAD_WORKER", False)
+        self.use_worker = use_worker
+        # Tramas de 20ms sin copias (en modo worker, ~1s de margen para el hilo VAD)
+        self.ring = FrameRingBuffer(BLOCK_SAMPLES * 2 * CHANNELS, 50 if use_worker else 64)
+        self.energy_gate = getattr(config, "VAD_ENERGY_GATE", 60)  # RMS int16; 0 = desactivado
+        self.stats = CaptureStats()
+        self.worker = None
+        self._pending = []  # Tramas de voz del lote actual (modo worker)
         self.stream = None
+        self.resampler = None  # Frecuencia nativa del dispositivo → SAMPLE_RATE
         self.is_speaking = False
         self.silence_frames = 0
+        self.hangover_frames = HANGOVER_MAX_FRAMES  # Empieza conservador (~600ms)
+        self.pauses = deque(maxlen=20)  # Pausas internas recientes del hablante (tramas)
         self.sent_chunks = 0
         self.loop = None  # Event loop para put_nowait
-        self.discarded_chunks = 0  # Contador de bloques descartados
+        self.trace_key = None  # Clave de trazas de latencia (la del STT que consume la cola)
+        self.echo_gate = None  # EchoGate (solo modo worker): descarta tramas que son eco de nuestra síntesis
     
-    def _safe_put_audio(self, chunk):
-        """Intenta agregar audio a la cola; si está llena, descarta audio antiguo"""
-        def put_with_discard():
-            try:
-                # Intentar agregar sin bloquear
+    def _safe_put_audio(self, *chunks):
+        """
+        Agrega audio a la cola desde el hilo de captura. La DeadlineQueue nunca
+        bloquea: si está llena descarta lo más antiguo y lo avisa por on_drop.
+        """
+        def put_all():
+            for chunk in chunks:
                 self.audio_queue.put_nowait(chunk)
-            except asyncio.QueueFull:
-                # Cola llena: descartar un bloque antiguo y agregar el nuevo
-                try:
-                    self.audio_queue.get_nowait()  # Descartar el más antiguo
-                    self.audio_queue.put_nowait(chunk)  # Agregar el nuevo
-                    self.discarded_chunks += 1
-                    if self.discarded_chunks % 50 == 0:  # Log cada 50 descartes
-                        print(f"⚠️ [{self.name}] Cola llena: {self.discarded_chunks} bloques descartados")
-                except:
-                    pass  # Si falla, simplemente ignorar este bloque
         
-        self.loop.call_soon_threadsafe(put_with_discard)
+        self.loop.call_soon_threadsafe(put_all)
+    
+    def _emit(self, frame):
+        """Entrega una trama de voz: directa (modo callback) o acumulada en el lote (modo worker)"""
+        # Copia solo para las tramas que salen del hilo de audio
+        if not self._deliver(bytes(frame)):
+            return False
+        self.sent_chunks += 1
+        self.stats.sent_frames += 1
+        return True
+    
+    def _deliver(self, item):
+        if not (self.loop and self.loop.is_running()):
+            return False
+        if self.use_worker:
+            self._pending.append(item)
+        else:
+            self._safe_put_audio(item)
+        return True
+    
+    def _adapt_hangover(self, pause_frames: int):
+        """Ajusta el silencio de cierre al ~p90 de las pausas entre palabras del hablante"""
+        self.pauses.append(pause_frames)
+        ordered = sorted(self.pauses)
+        p90 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+        # Margen de 100ms sobre la pausa típica, dentro de [mín, máx]
+        self.hangover_frames = max(HANGOVER_MIN_FRAMES, min(HANGOVER_MAX_FRAMES, p90 + 100 // BLOCK_MS))
+    
+    def callback_handoff(self, indata, frames, time_info, status):
+        """Callback mínimo (modo worker): solo copia al buffer circular"""
+        t0 = time.perf_counter()
+        if status and status.input_overflow:
+            self.stats.overflows += 1
+        data = memoryview(indata).cast("B")
+        if self.resampler:
+            data = memoryview(self.resampler.process(data))
+        written = self.ring.write(data)
+        if written < len(data):
+            # El worker no da abasto: se pierde el final del bloque
+            self.stats.handoff_drops += 1
+            self.stats.dropped_bytes += len(data) - written
+        self.stats.record_callback(time.perf_counter() - t0)
+    
+    def _handle_regions(self, regions):
+        """Worker: VAD por lotes sobre zonas contiguas del buffer circular"""
+        frame_bytes = self.ring.frame_bytes
+        for region in regions:
+            rms = frame_rms(region, frame_bytes // 2) if self.energy_gate else None
+            # Puerta de eco por lote: una referencia y una FFT para toda la zona
+            echo = self.echo_gate.check_region(region) if self.echo_gate else None
+            for i in range(len(region) // frame_bytes):
+                frame = region[i * frame_bytes:(i + 1) * frame_bytes]
+                if echo is not None and echo[i]:
+                    # Eco de nuestra propia síntesis: nunca sale hacia Deepgram
+                    self.stats.echo_frames += 1
+                    self._process_frame(frame, is_speech=False, echo=True)
+                elif rms is not None and rms[i] < self.energy_gate:
+                    self.stats.gated_frames += 1
+                    self._process_frame(frame, is_speech=False)
+                else:
+                    self._process_frame(frame)
+        if self._pending:
+            # Una sola llamada thread-safe por lote en vez de una por trama
+            self._safe_put_audio(*self._pending)
+            self._pending = []
         
     def callback(self, indata, frames, time_info, status):
         """Callback llamado por sounddevice cuando hay audio"""
+        t0 = time.perf_counter()
         if status:
-            print(f"⚠️ [{self.name}] Estado: {status}")
-        
-        # Convertir a bytes
-        audio_bytes = bytes(indata)
-        self.buffer.extend(audio_bytes)
+            if status.input_overflow:
+                self.stats.overflows += 1
+            log_capture.warning(f"⚠️ [{self.name}] Estado: {status}")
         
-        # Procesar en bloques de 20ms
-        while len(self.buffer) >= BLOCK_SAMPLES * 2:
-            chunk = bytes(self.buffer[:BLOCK_SAMPLES * 2])
-            self.buffer = self.buffer[BLOCK_SAMPLES * 2:]
+        # Copiar al buffer circular y procesar en tramas de 20ms (memoryview, sin
+        # asignar). El bloque entrante puede no ser múltiplo de 20ms o ser mayor
+        # que el espacio libre: se escribe por partes drenando entre medias.
+        data = memoryview(indata).cast("B")
+        if self.resampler:
+            data = memoryview(self.resampler.process(data))
+        offset = 0
+        while offset < len(data):
+            offset += self.ring.write(data[offset:])
+            frame = self.ring.read_frame()
+            while frame is not None:
+                self._process_frame(frame)
+                frame = self.ring.read_frame()
+        self.stats.record_callback(time.perf_counter() - t0)
+    
+    def _process_frame(self, frame, is_speech: bool = None, echo: bool = False):
+        """
+        VAD + máquina de estados para una trama de 20ms (memoryview del buffer circular).
+        echo=True: la puerta de eco (worker) la marcó; cuenta como silencio pero no se envía.
+        """
+        try:
+            if is_speech is None:
+                is_speech = self.vad.is_speech(frame, SAMPLE_RATE)
+                self.stats.vad_frames += 1
             
-            # Detectar voz con VAD
-            try:
-                is_speech = self.vad.is_speech(chunk, SAMPLE_RATE)
-                
-                if is_speech:
-                    if not self.is_speaking:
-                        print(f"🎙️ [{self.name}] Detectada voz")
-                        self.is_speaking = True
-                        self.sent_chunks = 0
-                    self.silence_frames = 0
-                    # Enviar audio a la cola usando el loop correcto
-                    if self.loop and self.loop.is_running():
-                        self._safe_put_audio(chunk)
-                        self.sent_chunks += 1
-                        if self.sent_chunks % 100 == 0:  # Log cada 100 bloques (~2s con 20ms)
-                            print(f"🎵 [{self.name}] Enviados {self.sent_chunks} bloques de audio a la cola")
-                else:
-                    if self.is_speaking:
-                        self.silence_frames += 1
-                        # Enviar algunos frames de silencio después de hablar
-                        if self.silence_frames < 30:  # ~600ms de silencio
-                            if self.loop and self.loop.is_running():
-                                self._safe_put_audio(chunk)
-                                self.sent_chunks += 1
-                        else:
-                            print(f"🔇 [{self.name}] Fin de voz ({self.sent_chunks} bloques enviados)")
-                            self.is_speaking = False
-                            self.silence_frames = 0
-            except Exception as e:
-                print(f"❌ [{self.name}] Error VAD: {e}")
+            if is_speech:
+                if not self.is_speaking:
+                    log_capture.info(f"🎙️ [{self.name}] Detectada voz")
+                    self.is_speaking = True
+                    self.sent_chunks = 0
+                    if self.trace_key:
+                        tracer.begin(self.trace_key)
+                elif self.silence_frames:
+                    # La voz siguió tras una pausa: aprender su duración
+                    self._adapt_hangover(self.silence_frames)
+                self.silence_frames = 0
+                # Enviar audio a la cola usando el loop correcto
+                if self._emit(frame) and self.sent_chunks % 100 == 0:  # Log cada 100 bloques (~2s con 20ms)
+                    log_capture.debug(f"🎵 [{self.name}] Enviados {self.sent_chunks} bloques de audio a la cola")
+            else:
+                if self.is_speaking:
+                    self.silence_frames += 1
+                    # Enviar algunos frames de silencio después de hablar (el eco
+                    # cuenta para el cierre pero tampoco sale en la cola de silencio)
+                    if self.silence_frames < self.hangover_frames:
+                        if not echo:
+                            self._emit(frame)
+                    else:
+                        log_capture.info(f"🔇 [{self.name}] Fin de voz ({self.sent_chunks} bloques enviados, "
+                                         f"cierre tras {self.hangover_frames * BLOCK_MS}ms)")
+                        # Avisar al STT para que pida Finalize ya
+                        self._deliver(END_OF_UTTERANCE)
+                        if self.trace_key:
+                            tracer.end(self.trace_key)
+                        self.is_speaking = False
+                        self.silence_frames = 0
+        except Exception as e:
+            log_capture.error(f"❌ [{self.name}] Error VAD: {e}")
     
     def start(self):
         """Inicia la captura de audio con latencia baja"""
+        # El resampler es mono: con varios canales se abre a SAMPLE_RATE como siempre
+        rate = device_rate(self.device_idx, SAMPLE_RATE) if CHANNELS == 1 else SAMPLE_RATE
+        if rate != SAMPLE_RATE:
+            self.resampler = StreamingResampler(rate, SAMPLE_RATE)
         # Intentar diferentes configuraciones de latencia (de más a menos óptima)
         audio_configs = [
             {"name": "WASAPI exclusivo", "latency": "low", "exclusive": True},
@@ -454,21 +1113,27 @@ class AudioCapture:
                 
                 # Intentar abrir el stream
                 stream_params = {
-                    "samplerate": SAMPLE_RATE,
+                    "samplerate": rate,
                     "channels": CHANNELS,
                     "dtype": 'int16',
                     "device": self.device_idx,
-                    "blocksize": BLOCK_SAMPLES,
-                    "callback": self.callback
+                    "blocksize": rate * BLOCK_MS // 1000,
+                    "callback": self.callback_handoff if self.use_worker else self.callback
                 }
                 if audio_config["latency"]:
                     stream_params["latency"] = audio_config["latency"]
                 if extra:
                     stream_params["extra_settings"] = extra
                 
-                self.stream = sd.RawInputStream(**stream_params)
+                if self.use_worker and not self.worker:
+                    self.worker = VadWorker(self.ring, self._handle_regions, self.name)
+                    self.worker.start()
+                self.stream = self.input_factory(**stream_params)
                 self.stream.start()
-                print(f"🎤 [{self.name}] Captura iniciada ({audio_config['name']})")
+                mode = "VAD en hilo aparte" if self.use_worker else "VAD en callback"
+                if self.resampler:
+                    mode += f", {rate}→{SAMPLE_RATE} Hz"
+                print(f"🎤 [{self.name}] Captura iniciada ({audio_config['name']}, {mode})")
                 return  # Éxito!
             except Exception as e:
                 if audio_config == audio_configs[-1]:  # Último intento
@@ -481,6 +1146,12 @@ class AudioCapture:
             self.stream.stop()
             self.stream.close()
             print(f"⏹️ [{self.name}] Captura detenida")
+        if self.worker:
+            self.worker.stop()
+            self.worker = None
+        print(f"📊 [{self.name}] {self.stats.summary()}")
+        if self.resampler:
+            print(f"📊 [{self.name}] Conversión de frecuencia {self.resampler.summary()}")
 
 ### ========== PIPELINE PRINCIPAL ==========
 async def main():
@@ -490,8 +1161,9 @@ async def main():
     print("🌍 TRADUCTOR EN TIEMPO REAL CON IA - OPTIMIZADO")
     print("="*60 + "\n")
     
-    # 1. Encontrar dispositivos
+    # 1. Encontrar dispositivos (PortAudio se enumera una sola vez)
     print("🔍 Buscando dispositivos de audio...\n")
+    t0 = time.perf_counter()
     try:
         mic_idx = find_device(MIC_NAME, 'input')
         speakers_idx = find_device(SPEAKERS_NAME, 'output')
@@ -501,6 +1173,7 @@ async def main():
         print(f"\n❌ Error: {e}")
         print("\n💡 Tip: Ejecuta 'python list_devices.py' para ver tus dispositivos")
         return
+    print(f"⏱️ Dispositivos: {(time.perf_counter() - t0) * 1000:.0f}ms")
     
     print("\n" + "="*60)
     print("📋 CONFIGURACIÓN DEL FLUJO:")
@@ -509,95 +1182,207 @@ async def main():
     print("🎧 Reunión (EN) → VB-Cable → Deepgram → DeepL → ElevenLabs → Tus auriculares (ES)")
     print("="*60 + "\n")
     
+    await run_pipeline(mic_idx, speakers_idx, vb_input_idx, vb_output_idx)
+
+### ========== PRE-CALENTAMIENTO ==========
+PREWARM_TIMEOUT_S = getattr(config, "PREWARM_TIMEOUT_S", 10.0)
+
+async def _timed_step(name: str, coro, timings: dict):
+    """Ejecuta un paso de arranque con tiempo límite; un fallo no bloquea (se reintenta al usarlo)"""
+    t0 = time.perf_counter()
+    try:
+        return await asyncio.wait_for(coro, PREWARM_TIMEOUT_S)
+    except Exception as e:
+        print(f"⚠️ Pre-calentamiento '{name}' falló: {e or type(e).__name__}")
+        return None
+    finally:
+        timings[name] = (time.perf_counter() - t0) * 1000
+
+async def _warm_translate(backend, target: str):
+    """Una traducción mínima: abre la conexión HTTPS keep-alive del backend (sin contar en sus latencias)"""
+    await backend.submit("Hola", target, record=False)
+
+async def prewarm(deepgram_conns, elevenlabs_sockets: int, tag: str = "") -> list:
+    """
+    Abre a la vez las conexiones de Deepgram y `elevenlabs_sockets` WebSockets de
+    ElevenLabs y calienta los backends de traducción; imprime el tiempo de cada paso. Devuelve los
+    WebSockets de ElevenLabs (None donde falló: se conectarán al usarse).
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    get_translator()  # Fuera de los hilos: una sola instancia compartida
+    steps = [_timed_step(f"Deepgram {conn.label}", conn.start(), timings) for conn in deepgram_conns]
+    steps += [_timed_step(f"ElevenLabs #{i + 1}", elevenlabs_connect(), timings)
+              for i in range(elevenlabs_sockets)]
+    if getattr(config, "PREWARM_TRANSLATE", True):
+        steps += [_timed_step(f"{backend.name} {target}", _warm_translate(backend, target), timings)
+                  for backend in translation_backends for target in ("EN-US", "ES")]
+    results = await asyncio.gather(*steps)
+    detail = ", ".join(f"{name} {ms:.0f}ms" for name, ms in timings.items())
+    print(f"⏱️ {tag}Pre-calentamiento {(time.perf_counter() - t0) * 1000:.0f}ms ({detail})")
+    return list(results[len(deepgram_conns):len(deepgram_conns) + elevenlabs_sockets])
+
+async def run_pipeline(mic_idx, speakers_idx, vb_input_idx, vb_output_idx,
+                       input_factory=None, output_factory=None, session=None):
+    """
+    Lanza las dos direcciones de traducción sobre los dispositivos indicados.
+    input_factory/output_factory sustituyen a sd.RawInputStream/sd.RawOutputStream
+    (benchmark.py los usa para leer WAV y escribir en un sumidero PCM).
+    session: sesión de sessions.py (varias por proceso). Da nombre a colas, trazas
+    y registros, recibe capturas y traductores para medir su rendimiento, y deja
+    los recursos compartidos del proceso (cachés, trazas) a cargo del gestor.
+    """
+    tag = f"{session.name}·" if session else ""
+    
     # 2. Crear colas de comunicación
+    # Colas con presupuesto de antigüedad: ante una ralentización se descarta
+    # (o se fusiona) lo atrasado en vez de hablar frases de hace diez segundos
     # TU VOZ: Español → Inglés
-    mic_audio_q = asyncio.Queue(maxsize=500)
-    es_text_q = asyncio.Queue(maxsize=50)
-    en_tts_text_q = asyncio.Queue(maxsize=50)
+    mic_audio_q = audio_queue(f"{tag}audio TU VOZ")
+    es_text_q = text_queue(f"{tag}texto ES")
+    en_tts_text_q = text_queue(f"{tag}TTS EN")
     
     # VOZ DE OTROS: Inglés → Español
-    meeting_audio_q = asyncio.Queue(maxsize=500)
-    en_text_q = asyncio.Queue(maxsize=50)
-    es_tts_text_q = asyncio.Queue(maxsize=50)
+    meeting_audio_q = audio_queue(f"{tag}audio REUNIÓN")
+    en_text_q = text_queue(f"{tag}texto EN")
+    es_tts_text_q = text_queue(f"{tag}TTS ES")
+    
+    # Traducción especulativa de intermedios (opcional)
+    es_speculator = en_speculator = None
+    if getattr(config, "SPECULATIVE_TRANSLATION", False):
+        min_words = getattr(config, "SPECULATIVE_MIN_WORDS", 3)
+        min_interval_s = getattr(config, "SPECULATIVE_MIN_INTERVAL_S", 0.3)
+        speculative_translate = lambda text, target: translate_text_async(text, target, store=False)
+        es_speculator = SpeculativeTranslator(speculative_translate, "EN-US", min_words, translation_cache,
+                                              min_interval_s)
+        en_speculator = SpeculativeTranslator(speculative_translate, "ES", min_words, translation_cache,
+                                              min_interval_s)
+        print("⚡ Traducción especulativa activada")
     
-    # Timestamps para cancelación de eco
-    last_en_synthesis = {'time': 0}
-    last_es_synthesis = {'time': 0}
+    # Codificación del audio de subida (una instancia por dirección: Opus guarda estado)
+    es_encoder = make_encoder(DEEPGRAM_ENCODING, 16000)
+    en_encoder = make_encoder(DEEPGRAM_ENCODING, 16000)
+    es_coalescer = FrameCoalescer(DEEPGRAM_COALESCE_MS)
+    en_coalescer = FrameCoalescer(DEEPGRAM_COALESCE_MS)
     
     # 3. Iniciar captura de audio
-    mic_capture = AudioCapture(mic_idx, mic_audio_q, "TU VOZ")
-    meeting_capture = AudioCapture(vb_output_idx, meeting_audio_q, "REUNIÓN")
+    mic_capture = AudioCapture(mic_idx, mic_audio_q, f"{tag}TU VOZ", input_factory=input_factory)
+    # Puerta de eco: el audio de la reunión se compara con el inglés que acabamos
+    # de reproducir hacia ella; el eco nunca llega a Deepgram. Su correlación por
+    # FFT no cabe en el callback de audio: la captura de la reunión usa el worker VAD.
+    echo_gate_on = getattr(config, "ECHO_GATE", True)
+    if echo_gate_on and SAMPLE_RATE != TTS_SAMPLE_RATE:
+        print("⚠️ Puerta de eco desactivada: requiere captura a 16 kHz (como la salida TTS)")
+        echo_gate_on = False
+    meeting_capture = AudioCapture(vb_output_idx, meeting_audio_q, f"{tag}REUNIÓN",
+                                   use_worker=True if echo_gate_on else None, input_factory=input_factory)
     
     # Asignar el event loop actual a las capturas
     loop = asyncio.get_event_loop()
     mic_capture.loop = loop
     meeting_capture.loop = loop
     
-    mic_capture.start()
-    meeting_capture.start()
+    # Trazas: cada captura abre segmentos de voz con la clave de su STT
+    mic_capture.trace_key = f"{tag}es"
+    meeting_capture.trace_key = f"{tag}en"
     
-    # 4. Traductor ES→EN (tu voz)
-    async def translate_es_to_en():
-        print("🔄 Traductor ES→EN iniciado")
-        while True:
-            text_es = await es_text_q.get()
-            if text_es is None:
-                await en_tts_text_q.put(None)
-                break
-            
-            print(f"🔄 Traduciendo ES→EN: '{text_es}'")
+    echo_reference = None
+    if echo_gate_on:
+        echo_reference = EchoReference(TTS_SAMPLE_RATE, seconds=1.0)
+        meeting_capture.echo_gate = EchoGate(
+            echo_reference, SAMPLE_RATE, BLOCK_SAMPLES,
+            max_delay_ms=getattr(config, "ECHO_MAX_DELAY_MS", 600),
+            threshold=getattr(config, "ECHO_THRESHOLD", 0.5),
+        )
+    
+    # 4. Traductor ES→EN (tu voz): una frase por llamada; OrderedPipeline mantiene
+    # varias en vuelo y las entrega al TTS en orden. Los finales largos salen por
+    # cláusulas (uid, texto, final) a medida que se traducen.
+    async def translate_es_to_en(item):
+        uid, text_es = item
+        log_translate.debug(f"🔄 Traduciendo ES→EN: '{text_es}'")
+        text_en = await es_speculator.take(text_es) if es_speculator else None
+        if text_en:
+            log_translate.info("⚡ Traducción especulativa reutilizada (ES→EN)")
+        else:
+            segments = clause_segmenter.split(text_es)
+            if len(segments) > 1:
+                async for out in translate_clauses(uid, segments, "EN-US", "🇪🇸→🇬🇧"):
+                    yield out
+                return
             text_en = await translate_text_async(text_es, "EN-US")
-            if text_en:
-                print(f"✅ 🇪🇸→🇬🇧 '{text_es}' → '{text_en}'")
-                # Marcar timestamp de síntesis en inglés
-                last_en_synthesis['time'] = asyncio.get_event_loop().time()
-                await en_tts_text_q.put(text_en)
-            else:
-                print(f"⚠️ No se pudo traducir: '{text_es}'")
+        if text_en:
+            log_translate.info(f"✅ 🇪🇸→🇬🇧 '{text_es}' → '{text_en}'")
+            tracer.mark(uid, "translated")
+            yield (uid, text_en)
+            return
+        log_translate.warning(f"⚠️ No se pudo traducir: '{text_es}'")
+        tracer.discard(uid)
     
-    # 5. Traductor EN→ES (voz de otros)
-    async def translate_en_to_es():
-        print("🔄 Traductor EN→ES iniciado")
-        while True:
-            text_en = await en_text_q.get()
-            if text_en is None:
-                await es_tts_text_q.put(None)
-                break
-            
-            # Verificar si este audio es eco del sistema
-            current_time = asyncio.get_event_loop().time()
-            time_since_synthesis = current_time - last_en_synthesis['time']
-            
-            if time_since_synthesis < 8.0:
-                print(f"🔇 Ignorando eco del sistema (EN): '{text_en}' ({time_since_synthesis:.1f}s desde síntesis)")
-                continue
-            
-            print(f"🔄 Traduciendo EN→ES: '{text_en}'")
+    # 5. Traductor EN→ES (voz de otros). El eco del sistema ya se filtra en la captura.
+    async def translate_en_to_es(item):
+        uid, text_en = item
+        log_translate.debug(f"🔄 Traduciendo EN→ES: '{text_en}'")
+        text_es = await en_speculator.take(text_en) if en_speculator else None
+        if text_es:
+            log_translate.info("⚡ Traducción especulativa reutilizada (EN→ES)")
+        else:
+            segments = clause_segmenter.split(text_en)
+            if len(segments) > 1:
+                async for out in translate_clauses(uid, segments, "ES", "🇬🇧→🇪🇸"):
+                    yield out
+                return
             text_es = await translate_text_async(text_en, "ES")
-            if text_es:
-                print(f"✅ 🇬🇧→🇪🇸 '{text_en}' → '{text_es}'")
-                # Marcar timestamp de síntesis en español
-                last_es_synthesis['time'] = current_time
-                await es_tts_text_q.put(text_es)
-            else:
-                print(f"⚠️ No se pudo traducir: '{text_en}'")
+        if text_es:
+            log_translate.info(f"✅ 🇬🇧→🇪🇸 '{text_en}' → '{text_es}'")
+            tracer.mark(uid, "translated")
+            yield (uid, text_es)
+            return
+        log_translate.warning(f"⚠️ No se pudo traducir: '{text_en}'")
+        tracer.discard(uid)
+    
+    es_en_pipeline = OrderedPipeline(translate_es_to_en, TRANSLATE_CONCURRENCY, f"{tag}ES→EN")
+    en_es_pipeline = OrderedPipeline(translate_en_to_es, TRANSLATE_CONCURRENCY, f"{tag}EN→ES")
+    if session:
+        session.attach((mic_capture, meeting_capture), (es_en_pipeline, en_es_pipeline))
+    print(f"🔄 Traductores ES→EN y EN→ES iniciados (hasta {TRANSLATE_CONCURRENCY} en vuelo por dirección)")
+    
+    # 6. Pre-calentamiento en paralelo: Deepgram ×2, ElevenLabs ×2 y DeepL.
+    # Puerta de arranque: la captura solo empieza cuando todo está listo, así el
+    # primer enunciado no paga TLS ni handshakes.
+    es_conn = deepgram_connection("es", es_encoder)
+    en_conn = deepgram_connection("en", en_encoder)
+    en_tts_ws, es_tts_ws = await prewarm((es_conn, en_conn), 2, tag)
+    # Voz en el STT de una dirección → el TTS de esa dirección reabre su WS si lo cerró por inactividad
+    en_tts_demand = asyncio.Event()
+    es_tts_demand = asyncio.Event()
+    
+    mic_capture.start()
+    meeting_capture.start()
     
-    # 6. Lanzar todas las tareas
+    # 7. Lanzar todas las tareas
     print("🚀 Iniciando pipeline...\n")
     
     tasks = [
         # STT con nova-3 y emisión incremental
-        asyncio.create_task(deepgram_stt(mic_audio_q, "es", es_text_q)),
-        asyncio.create_task(deepgram_stt(meeting_audio_q, "en", en_text_q)),
+        asyncio.create_task(deepgram_stt(mic_audio_q, "es", es_text_q, es_speculator, mic_capture.trace_key,
+                                         es_encoder, es_coalescer, es_conn, en_tts_demand)),
+        asyncio.create_task(deepgram_stt(meeting_audio_q, "en", en_text_q, en_speculator,
+                                         meeting_capture.trace_key, en_encoder, en_coalescer, en_conn,
+                                         es_tts_demand)),
         
-        # Traducción asíncrona
-        asyncio.create_task(translate_es_to_en()),
-        asyncio.create_task(translate_en_to_es()),
+        # Traducción asíncrona, concurrente y en orden
+        asyncio.create_task(es_en_pipeline.run(es_text_q, en_tts_text_q)),
+        asyncio.create_task(en_es_pipeline.run(en_text_q, es_tts_text_q)),
         
         # TTS streaming WebSocket
-        asyncio.create_task(elevenlabs_tts_stream(en_tts_text_q, vb_input_idx, "EN→REUNIÓN")),
-        asyncio.create_task(elevenlabs_tts_stream(es_tts_text_q, speakers_idx, "ES→TÚ")),
+        asyncio.create_task(elevenlabs_tts_stream(en_tts_text_q, vb_input_idx, f"{tag}EN→REUNIÓN",
+                                                  output_factory, echo_reference, en_tts_ws, en_tts_demand)),
+        asyncio.create_task(elevenlabs_tts_stream(es_tts_text_q, speakers_idx, f"{tag}ES→TÚ", output_factory,
+                                                  ws=es_tts_ws, demand=es_tts_demand)),
     ]
+    if not session:
+        tasks.extend(latency_export_tasks())
     
     print("✅ Sistema activo. Habla por tu micrófono!\n")
     print("💡 Presiona Ctrl+C para detener\n")
@@ -610,7 +1395,59 @@ async def main():
     finally:
         mic_capture.stop()
         meeting_capture.stop()
-        print("✅ Sistema detenido")
+        for q in (mic_audio_q, es_text_q, en_tts_text_q, meeting_audio_q, en_text_q, es_tts_text_q):
+            print(f"📊 Cola {q.stats()}")
+        for pipeline in (es_en_pipeline, en_es_pipeline):
+            print(f"📊 Traducción {pipeline.summary()}")
+        for label, encoder, coalescer in (("ES", es_encoder, es_coalescer), ("EN", en_encoder, en_coalescer)):
+            print(f"📊 Subida a Deepgram {tag}{label}: {encoder.summary()}; {coalescer.summary()}")
+        for label, conn in (("ES", es_conn), ("EN", en_conn)):
+            print(f"📊 Conexión Deepgram {tag}{label}: {conn.summary()}")
+        for label, speculator in (("ES→EN", es_speculator), ("EN→ES", en_speculator)):
+            if speculator:
+                st = speculator.stats()
+                print(f"📊 Especulación {tag}{label}: {st['launched']} lanzadas, "
+                      f"{st['reused']} reutilizadas, {st['discarded']} descartadas, "
+                      f"{st['skipped']} prefijos sin enviar")
+        if not session:
+            shutdown_shared()
+            print("✅ Sistema detenido")
+
+def latency_export_tasks(shard: int = None) -> list:
+    """
+    Exportar histogramas de latencia (archivo JSON y/o endpoint HTTP local), una vez por proceso.
+    shard (sessions.py): cada proceso usa su propio archivo (<nombre>.<shard>.json)
+    y su propio puerto (LATENCY_HTTP_PORT + shard), sin pisarse entre ellos.
+    """
+    tasks = []
+    latency_file = getattr(config, "LATENCY_EXPORT_FILE", None)
+    if latency_file:
+        if shard is not None:
+            root, ext = os.path.splitext(latency_file)
+            latency_file = f"{root}.{shard}{ext}"
+        tasks.append(asyncio.create_task(tracer.export_file(latency_file)))
+    latency_port = getattr(config, "LATENCY_HTTP_PORT", None)
+    if latency_port:
+        tasks.append(asyncio.create_task(tracer.serve_http(latency_port + (shard or 0))))
+    return tasks
+
+def shutdown_shared():
+    """Estadísticas y cierre de lo que comparten todas las sesiones del proceso"""
+    stats = translation_cache.stats()
+    print(f"📊 Caché de traducción: {stats['hits']} aciertos / {stats['misses']} fallos "
+          f"({stats['hit_rate']:.0%}, {stats['entries']} entradas)")
+    translation_cache.close()
+    print(f"📊 Segmentación por cláusulas: {clause_segmenter.summary()}")
+    print(f"📊 Traducción cubierta: {hedged_translator.summary()}")
+    for backend in translation_backends:
+        print(f"📊 Backend {backend.summary()}")
+    hedged_translator.shutdown()
+    if tts_cache:
+        stats = tts_cache.stats()
+        print(f"📊 Caché TTS: {stats['hits']} aciertos / {stats['misses']} fallos "
+              f"({stats['hit_rate']:.0%}), {stats['bytes_saved'] / 1024:.0f} KB de síntesis ahorrados, "
+              f"{stats['entries']} entradas ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+    print(tracer.summary())
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,171 @@
+# playback.py - Reproducción TTS por callback con jitter buffer (el event loop nunca bloquea)
+import time
+import threading
+from collections import deque
+from resampler import StreamingResampler
+
+
+class JitterBuffer:
+    """
+    FIFO de PCM entre el event loop (push) y el callback de audio (read_into).
+
+    Tras vaciarse espera a acumular `prebuffer_bytes` antes de volver a sonar
+    (o a que dejen de llegar datos: el final de una frase no se queda atascado).
+    Si el callback encuentra el buffer vacío rellena con silencio; si llegan más
+    datos poco después, fue un corte a mitad de frase y se cuenta un underrun.
+    """
+
+    UNDERRUN_WINDOW_S = 0.3  # Datos que llegan antes de esto tras vaciarse = underrun
+
+    def __init__(self, bytes_per_second: int, prebuffer_ms: int = 60, max_seconds: float = 60.0):
+        self.bytes_per_second = bytes_per_second
+        self.prebuffer_bytes = bytes_per_second * prebuffer_ms // 1000
+        self.prebuffer_s = prebuffer_ms / 1000
+        self.max_bytes = int(bytes_per_second * max_seconds)
+        self._chunks = deque()
+        self._offset = 0            # Bytes ya leídos del primer chunk
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._playing = False
+        self._last_push = 0.0
+        self._dry_since = None      # Momento en que se vació reproduciendo
+        self.pushed_bytes = 0
+        self.played_bytes = 0       # Bytes de audio real entregados al dispositivo
+        self.underruns = 0
+        self.dropped_bytes = 0
+        self.max_depth = 0
+
+    def push(self, pcm: bytes) -> int:
+        """Encola PCM; devuelve la posición (bytes) de su inicio en el flujo"""
+        with self._lock:
+            pos = self.pushed_bytes
+            self._chunks.append(pcm)
+            self._depth += len(pcm)
+            self.pushed_bytes += len(pcm)
+            self._last_push = time.monotonic()
+            if self._dry_since is not None:
+                if self._last_push - self._dry_since < self.UNDERRUN_WINDOW_S:
+                    self.underruns += 1
+                self._dry_since = None
+            # Desborde: descartar lo más antiguo (nunca bloquear al productor)
+            while self._depth > self.max_bytes and len(self._chunks) > 1:
+                old = self._chunks.popleft()
+                self._depth -= len(old) - self._offset
+                self.dropped_bytes += len(old) - self._offset
+                self.played_bytes += len(old) - self._offset  # Las posiciones siguen avanzando
+                self._offset = 0
+            if self._depth > self.max_depth:
+                self.max_depth = self._depth
+            return pos
+
+    def read_into(self, out) -> int:
+        """Copia hasta len(out) bytes en `out`; rellena el resto con silencio"""
+        n = len(out)
+        written = 0
+        with self._lock:
+            if not self._playing:
+                if self._depth >= self.prebuffer_bytes or (
+                        self._depth and time.monotonic() - self._last_push >= self.prebuffer_s):
+                    self._playing = True
+            if self._playing:
+                while written < n and self._chunks:
+                    chunk = self._chunks[0]
+                    take = min(n - written, len(chunk) - self._offset)
+                    out[written:written + take] = chunk[self._offset:self._offset + take]
+                    written += take
+                    self._offset += take
+                    if self._offset == len(chunk):
+                        self._chunks.popleft()
+                        self._offset = 0
+                self._depth -= written
+                self.played_bytes += written
+                if not self._chunks:
+                    self._dry_since = time.monotonic()
+                    self._playing = False
+        if written < n:
+            out[written:n] = bytes(n - written)
+        return written
+
+    def clear(self):
+        with self._lock:
+            self.played_bytes += self._depth  # Las posiciones siguen avanzando
+            self._chunks.clear()
+            self._offset = 0
+            self._depth = 0
+            self._playing = False
+
+    @property
+    def depth_ms(self) -> float:
+        return self._depth * 1000 / self.bytes_per_second
+
+    def stats(self) -> dict:
+        return {
+            "depth_ms": self.depth_ms,
+            "max_depth_ms": self.max_depth * 1000 / self.bytes_per_second,
+            "played_s": self.played_bytes / self.bytes_per_second,
+            "underruns": self.underruns,
+            "dropped_s": self.dropped_bytes / self.bytes_per_second,
+        }
+
+
+class PlaybackStream:
+    """
+    Salida de audio por callback alimentada desde un JitterBuffer.
+    write() solo encola (no bloquea); `on_played` se invoca en el event loop
+    cuando el dispositivo empieza a reproducir ese chunk. `tap(pcm)` recibe cada
+    bloque entregado al dispositivo (p. ej. referencia para la puerta de eco).
+
+    device_rate: frecuencia a la que se abre el dispositivo si difiere de la del
+    PCM recibido (`samplerate`, mono). write() convierte en el event loop y el
+    buffer guarda audio a device_rate; el tap sigue recibiendo `samplerate`
+    (se convierte de vuelta en el callback) y la referencia de eco no cambia.
+    """
+
+    def __init__(self, stream_factory, loop, samplerate: int, channels: int = 1,
+                 prebuffer_ms: int = 60, tap=None, device_rate: int = None, **stream_params):
+        self.loop = loop
+        self.tap = tap
+        self.resampler = self.tap_resampler = None
+        if device_rate and device_rate != samplerate and channels == 1:
+            self.resampler = StreamingResampler(samplerate, device_rate)
+            if tap:
+                self.tap_resampler = StreamingResampler(device_rate, samplerate)
+        else:
+            device_rate = samplerate
+        self.buffer = JitterBuffer(device_rate * 2 * channels, prebuffer_ms)
+        self._markers = deque()  # (posición, función) pendientes de sonar
+        self.stream = stream_factory(samplerate=device_rate, channels=channels,
+                                     callback=self._callback, **stream_params)
+
+    def start(self):
+        self.stream.start()
+
+    def stop(self):
+        self.stream.stop()
+
+    def close(self):
+        self.stream.close()
+
+    def write(self, pcm: bytes, on_played=None):
+        if self.resampler:
+            pcm = self.resampler.process(pcm)
+        pos = self.buffer.push(pcm)
+        if on_played:
+            self._markers.append((pos, on_played))
+
+    def _callback(self, outdata, frames, time_info, status):
+        out = memoryview(outdata).cast("B")
+        self.buffer.read_into(out)
+        if self.tap:
+            self.tap(self.tap_resampler.process(out) if self.tap_resampler else out)
+        while self._markers and self._markers[0][0] < self.buffer.played_bytes:
+            _, fn = self._markers.popleft()
+            self.loop.call_soon_threadsafe(fn)
+
+    def summary(self) -> str:
+        st = self.buffer.stats()
+        text = (f"reproducidos {st['played_s']:.1f}s, profundidad máx {st['max_depth_ms']:.0f}ms, "
+                f"{st['underruns']} underruns, {st['dropped_s']:.1f}s descartados")
+        if self.resampler:
+            text += f", conversión {self.resampler.summary()}"
+        return text
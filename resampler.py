@@ -0,0 +1,130 @@
+# resampler.py - Conversión de frecuencia por bloques (polifásica, NumPy) con estado entre chunks
+import time
+from math import gcd
+import numpy as np
+
+
+def design_filter(up: int, down: int, zeros: int = 10, beta: float = 5.0) -> np.ndarray:
+    """
+    FIR paso bajo (sinc con ventana de Kaiser) a la frecuencia sobremuestreada
+    in_rate × up, con corte en la menor de las dos Nyquist. Mismo diseño que
+    scipy.signal.resample_poly: `zeros` cruces por cero a cada lado.
+    """
+    cutoff = 1.0 / max(up, down)            # Relativo a la Nyquist sobremuestreada
+    half = zeros * max(up, down)
+    n = np.arange(-half, half + 1, dtype=np.float64)
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), beta)
+    return h * up                           # Ganancia `up`: compensa los ceros insertados
+
+
+class StreamingResampler:
+    """
+    Resampler int16 mono para audio en tiempo real. La razón out/in se reduce a
+    up/down y el filtro se descompone en `up` fases de `taps` coeficientes: cada
+    muestra de salida es un producto escalar de una fase con las últimas `taps`
+    muestras de entrada, sin sobremuestrear de verdad.
+
+    Entre llamadas se guardan las últimas taps-1 muestras de entrada y la
+    posición de la siguiente salida, así que trocear la señal no cambia el
+    resultado (ni clics en las fronteras ni deriva con razones no enteras como
+    44100 → 16000). Las salidas de una misma fase están equiespaciadas en la
+    entrada: cada fase se calcula con una vista con saltos y un solo
+    producto matriz-vector (sin copias ni bucles por muestra). Con razones de
+    muchas fases (44100 ↔ 16000) se reúnen las ventanas de todas las salidas
+    del chunk y se hace un único producto fila a fila.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, zeros: int = 10):
+        g = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // g
+        self.down = in_rate // g
+        h = design_filter(self.up, self.down, zeros)
+        self.taps = -(-len(h) // self.up)
+        # Retardo del filtro (muestras de salida) para compensar al alinear señales
+        self.delay = (len(h) // 2) // self.down
+        h = np.concatenate([h, np.zeros(self.taps * self.up - len(h))])
+        # phases[p, i]: coeficiente para la entrada x[n - (taps-1) + i] de la fase p
+        self.phases = np.ascontiguousarray(h.reshape(self.taps, self.up).T[:, ::-1], dtype=np.float32)
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._in_pos = 0        # Muestras de entrada consumidas
+        self._out_pos = 0       # Índice de la siguiente muestra de salida
+        self.chunks = 0
+        self.process_s = 0.0
+
+    def process(self, pcm) -> bytes:
+        """PCM int16 a in_rate (bytes o memoryview) → PCM int16 a out_rate"""
+        t0 = time.perf_counter()
+        x = np.frombuffer(pcm, dtype=np.int16)
+        buf = np.concatenate([self._history, x.astype(np.float32)])
+        last_in = self._in_pos + len(x)     # Primera entrada aún no recibida
+        # Salidas m con entrada base n = m·down // up ya disponible (n < last_in)
+        end = -(-last_in * self.up // self.down)
+        count = end - self._out_pos
+        y = np.empty(max(count, 0), dtype=np.float32)
+        if count > 0 and self.up > count // 4:
+            # Muchas fases para pocas salidas (44100 ↔ 16000): una fila por salida
+            windows = np.lib.stride_tricks.sliding_window_view(buf, self.taps)
+            u = np.arange(self._out_pos, end, dtype=np.int64) * self.down
+            y = np.einsum("ij,ij->i", windows[u // self.up - self._in_pos], self.phases[u % self.up])
+            self._out_pos = end
+        elif count > 0:
+            windows = np.lib.stride_tricks.sliding_window_view(buf, self.taps)
+            for j in range(min(self.up, count)):
+                m = self._out_pos + j
+                u = m * self.down
+                start = u // self.up - self._in_pos   # windows[start] termina en x[n]
+                rows = windows[start::self.down][:len(range(j, count, self.up))]
+                y[j::self.up] = rows @ self.phases[u % self.up]
+            self._out_pos = end
+        self._in_pos = last_in
+        self._history = buf[len(buf) - (self.taps - 1):].copy()
+        out = np.clip(np.rint(y), -32768, 32767).astype(np.int16).tobytes()
+        self.chunks += 1
+        self.process_s += time.perf_counter() - t0
+        return out
+
+    def reset(self):
+        """Olvida el estado (p. ej. tras un corte largo): la siguiente entrada empieza limpia"""
+        self._history[:] = 0
+        self._in_pos = 0
+        self._out_pos = 0
+
+    def summary(self) -> str:
+        avg_us = self.process_s / self.chunks * 1e6 if self.chunks else 0.0
+        return (f"{self.in_rate}→{self.out_rate} Hz ({self.up}/{self.down}, {self.taps} taps/fase): "
+                f"{avg_us:.0f}µs/chunk en {self.chunks} chunks")
+
+
+def naive_resample(pcm, in_rate: int, out_rate: int) -> bytes:
+    """Referencia: interpolación lineal por chunk, sin filtro ni estado (alias y clics en las fronteras)"""
+    x = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    n_out = len(x) * out_rate // in_rate
+    y = np.interp(np.arange(n_out) * (in_rate / out_rate), np.arange(len(x)), x)
+    return np.clip(np.rint(y), -32768, 32767).astype(np.int16).tobytes()
+
+
+def measure(in_rate: int, out_rate: int, chunk_ms: int = 20, seconds: float = 5.0) -> dict:
+    """Coste por chunk y error frente a procesar la señal entera de una vez (estado entre chunks)"""
+    t = np.arange(int(in_rate * seconds)) / in_rate
+    signal = (8000 * np.sin(2 * np.pi * 440 * t) + 3000 * np.sin(2 * np.pi * 3100 * t)).astype(np.int16)
+    chunk = in_rate * chunk_ms // 1000
+    pieces = [signal[i:i + chunk].tobytes() for i in range(0, len(signal), chunk)]
+    streaming = StreamingResampler(in_rate, out_rate)
+    out = b"".join(streaming.process(p) for p in pieces)
+    whole = StreamingResampler(in_rate, out_rate).process(signal.tobytes())
+    diff = np.abs(np.frombuffer(out, np.int16).astype(np.int32) - np.frombuffer(whole, np.int16))
+    t0 = time.perf_counter()
+    for p in pieces:
+        naive_resample(p, in_rate, out_rate)
+    naive_us = (time.perf_counter() - t0) / len(pieces) * 1e6
+    return {
+        "us_per_chunk": streaming.process_s / streaming.chunks * 1e6,
+        "naive_us_per_chunk": naive_us,
+        "taps": streaming.taps,
+        "chunk_ms": chunk_ms,
+        "max_diff_vs_whole": int(diff.max()) if len(diff) else 0,
+        "out_samples": len(out) // 2,
+        "expected_samples": len(signal) * out_rate // in_rate,
+    }
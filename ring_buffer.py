@@ -0,0 +1,77 @@
+# ring_buffer.py - Buffer circular preasignado para enmarcar audio sin copias extra
+class FrameRingBuffer:
+    """
+    Buffer circular de tamaño fijo que entrega tramas como memoryview.
+
+    La capacidad es múltiplo del tamaño de trama y la lectura avanza de trama en
+    trama, por lo que ninguna trama cruza el final del buffer: cada trama es un
+    memoryview contiguo, sin asignaciones. Las escrituras aceptan bloques de
+    cualquier tamaño (PortAudio no siempre entrega múltiplos de 20 ms).
+
+    Un memoryview devuelto por read_frame() es válido hasta que nuevas
+    escrituras sobrescriban esa zona: copiarlo (bytes(frame)) si debe sobrevivir.
+    """
+
+    def __init__(self, frame_bytes: int, capacity_frames: int = 64):
+        self.frame_bytes = frame_bytes
+        self.capacity = frame_bytes * capacity_frames
+        self._buf = bytearray(self.capacity)
+        self._view = memoryview(self._buf)
+        self._write_pos = 0  # Contadores monótonos (bytes totales escritos/leídos)
+        self._read_pos = 0
+
+    def __len__(self):
+        """Bytes pendientes de leer"""
+        return self._write_pos - self._read_pos
+
+    def free(self) -> int:
+        return self.capacity - len(self)
+
+    def write(self, data) -> int:
+        """Copia todo lo que quepa de `data`; devuelve los bytes escritos"""
+        src = memoryview(data).cast("B")
+        n = min(len(src), self.free())
+        if n <= 0:
+            return 0
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._view[start:start + first] = src[:first]
+        if n > first:
+            self._view[:n - first] = src[first:n]
+        self._write_pos += n
+        return n
+
+    def read_frame(self):
+        """Devuelve la siguiente trama completa (memoryview) o None"""
+        if len(self) < self.frame_bytes:
+            return None
+        start = self._read_pos % self.capacity
+        self._read_pos += self.frame_bytes
+        return self._view[start:start + self.frame_bytes]
+
+    def peek_regions(self, max_frames: int):
+        """
+        Devuelve hasta `max_frames` tramas pendientes SIN consumirlas, como una
+        lista de 0-2 memoryviews contiguos (múltiplos de frame_bytes; dos si la
+        zona cruza el final del buffer). Llamar a consume() tras procesarlas.
+
+        Con un solo productor (write) y un solo consumidor (peek/consume) no se
+        necesitan locks: cada lado solo modifica su propio contador.
+        """
+        frames = min(len(self) // self.frame_bytes, max_frames)
+        if frames <= 0:
+            return []
+        start = self._read_pos % self.capacity
+        n = frames * self.frame_bytes
+        first = min(n, self.capacity - start)
+        regions = [self._view[start:start + first]]
+        if n > first:
+            regions.append(self._view[:n - first])
+        return regions
+
+    def consume(self, frames: int):
+        """Libera `frames` tramas leídas con peek_regions()"""
+        self._read_pos += frames * self.frame_bytes
+
+    def clear(self):
+        self._read_pos = self._write_pos
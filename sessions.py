@@ -0,0 +1,200 @@
+# sessions.py - Motor multisesión: muchas cabinas de interpretación en una sola máquina
+#
+# Uso:
+#   python sessions.py sessions.json [--workers 4] [--report 10]
+#
+# sessions.json:
+#   {"sessions": [
+#       {"name": "cabina-1", "mic": "Micrófono 1", "speakers": "Auriculares 1",
+#        "vb_input": "CABLE-A Input", "vb_output": "CABLE-A Output"},
+#       ...
+#   ]}
+#
+# Los dispositivos que falten se toman de config.py. Las sesiones se reparten
+# entre procesos (un event loop por núcleo); dentro de cada proceso comparten el
+# traductor de DeepL con su pool de conexiones, los pools de traducción y las
+# cachés de traducción y TTS. Con TRANSLATION_CACHE_FILE cada proceso escribe en
+# su propio archivo (<nombre>.<proceso>.jsonl), que se funde en el principal al terminar.
+# Las métricas de latencia también son por proceso: LATENCY_EXPORT_FILE con sufijo
+# <proceso> y LATENCY_HTTP_PORT + <proceso>.
+import os
+import sys
+import json
+import time
+import queue
+import asyncio
+import argparse
+import multiprocessing as mp
+import main
+
+
+class Session:
+    """Una cabina (micrófono ↔ reunión) y sus contadores de rendimiento"""
+
+    def __init__(self, spec: dict):
+        self.name = spec["name"]
+        self.devices = {
+            "mic": spec.get("mic", main.MIC_NAME),
+            "speakers": spec.get("speakers", main.SPEAKERS_NAME),
+            "vb_input": spec.get("vb_input", main.VB_CABLE_INPUT),
+            "vb_output": spec.get("vb_output", main.VB_CABLE_OUTPUT),
+        }
+        self.captures = ()
+        self.pipelines = ()
+        self.started = None
+        self.error = None
+
+    def attach(self, captures, pipelines):
+        """Llamado por run_pipeline con las piezas que se miden"""
+        self.captures = captures
+        self.pipelines = pipelines
+        self.started = time.monotonic()
+
+    def snapshot(self) -> dict:
+        block_s = main.BLOCK_MS / 1000
+        return {
+            "name": self.name,
+            "uptime_s": time.monotonic() - self.started if self.started else 0.0,
+            "audio_in_s": sum(c.stats.callbacks for c in self.captures) * block_s,
+            "speech_s": sum(c.stats.sent_frames for c in self.captures) * block_s,
+            "translations": {p.name.split("·")[-1]: p.completed for p in self.pipelines},
+            "error": self.error,
+        }
+
+
+async def _run_session(session: Session):
+    try:
+        d = session.devices
+        await main.run_pipeline(
+            main.find_device(d["mic"], "input"),
+            main.find_device(d["speakers"], "output"),
+            main.find_device(d["vb_input"], "output"),
+            main.find_device(d["vb_output"], "input"),
+            session=session,
+        )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        session.error = str(e)
+        print(f"❌ [{session.name}] Sesión detenida: {e}")
+
+
+async def _run_shard(shard: int, specs: list, reports, report_s: float):
+    sessions = [Session(spec) for spec in specs]
+    print(f"🧩 Proceso {shard} (pid {os.getpid()}): {', '.join(s.name for s in sessions)}")
+    tasks = [asyncio.create_task(_run_session(s)) for s in sessions]
+    tasks.extend(main.latency_export_tasks(shard))
+
+    async def reporter():
+        while True:
+            await asyncio.sleep(report_s)
+            reports.put(("report", shard, [s.snapshot() for s in sessions]))
+
+    tasks.append(asyncio.create_task(reporter()))
+    try:
+        await asyncio.gather(*tasks[:len(sessions)])
+    finally:
+        for task in tasks:
+            task.cancel()
+        main.shutdown_shared()
+        reports.put(("done", shard, [s.snapshot() for s in sessions]))
+
+
+def _worker(shard: int, specs: list, reports, report_s: float):
+    # Caché de traducción en disco: un archivo por proceso (el padre los funde al final)
+    main.translation_cache.use_shard(shard)
+    try:
+        asyncio.run(_run_shard(shard, specs, reports, report_s))
+    except KeyboardInterrupt:
+        pass
+
+
+def print_throughput(snapshots: dict):
+    """Tabla por sesión + agregado (enunciados traducidos y audio procesado por minuto)"""
+    print("\n" + "=" * 60)
+    print(f"📈 RENDIMIENTO ({len(snapshots)} sesiones)")
+    print("=" * 60)
+    total_utt = total_audio = total_speech = 0.0
+    for name in sorted(snapshots):
+        snap = snapshots[name]
+        minutes = max(snap["uptime_s"], 1e-9) / 60
+        utterances = sum(snap["translations"].values())
+        total_utt += utterances / minutes
+        total_audio += snap["audio_in_s"] / minutes
+        total_speech += snap["speech_s"] / minutes
+        detail = ", ".join(f"{k} {v}" for k, v in snap["translations"].items())
+        status = f"  ❌ {snap['error']}" if snap["error"] else ""
+        print(f"   {name:<16} {utterances / minutes:6.1f} enunciados/min ({detail}), "
+              f"voz {snap['speech_s']:.0f}s de {snap['audio_in_s']:.0f}s{status}")
+    print(f"   {'TOTAL':<16} {total_utt:6.1f} enunciados/min, "
+          f"{total_audio / 60:.1f} min de audio/min ({total_speech / 60:.1f} de voz)")
+
+
+def load_sessions(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        specs = json.load(f)["sessions"]
+    names = [spec["name"] for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("Los nombres de sesión deben ser únicos")
+    return specs
+
+
+def run_sessions(specs: list, workers: int, report_s: float):
+    """Reparte las sesiones entre `workers` procesos y muestra el rendimiento periódicamente"""
+    workers = max(1, min(workers, len(specs)))
+    reports = mp.Queue()
+    procs = []
+    for shard in range(workers):
+        p = mp.Process(target=_worker, args=(shard, specs[shard::workers], reports, report_s),
+                       name=f"sessions-{shard}", daemon=False)
+        p.start()
+        procs.append(p)
+    print(f"🚀 {len(specs)} sesiones en {workers} procesos")
+
+    snapshots = {}
+    done = set()
+    stopping = False
+    while len(done) < workers:
+        try:
+            kind, shard, snaps = reports.get(timeout=1.0)
+        except queue.Empty:
+            if any(not p.is_alive() and i not in done for i, p in enumerate(procs)):
+                done.update(i for i, p in enumerate(procs) if not p.is_alive())  # Proceso caído
+            continue
+        except KeyboardInterrupt:
+            if stopping:
+                break
+            stopping = True  # Los procesos también reciben Ctrl+C: esperar su informe final
+            print("\n⏹️ Deteniendo sesiones...")
+            continue
+        snapshots.update((s["name"], s) for s in snaps)
+        if kind == "done":
+            done.add(shard)
+        elif shard == 0:
+            print_throughput(snapshots)  # Una tabla por ronda de informes
+    for p in procs:
+        p.join(timeout=5.0)
+    if not any(p.is_alive() for p in procs):
+        main.translation_cache.merge_shards(workers)
+    if snapshots:
+        print_throughput(snapshots)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Ejecuta varias sesiones de traducción en paralelo")
+    p.add_argument("sessions", nargs="?", default=getattr(main.config, "SESSIONS_FILE", "sessions.json"),
+                   help="Archivo JSON con la lista de sesiones")
+    p.add_argument("--workers", type=int, default=getattr(main.config, "SESSION_WORKERS", os.cpu_count() or 1),
+                   help="Procesos (por defecto uno por núcleo)")
+    p.add_argument("--report", type=float, default=10.0, help="Intervalo de informe de rendimiento (s)")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        specs = load_sessions(args.sessions)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ No se pudo leer {args.sessions}: {e}")
+        sys.exit(1)
+    run_sessions(specs, args.workers, args.report)
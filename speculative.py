@@ -0,0 +1,136 @@
+# speculative.py - Traducción especulativa de resultados intermedios de Deepgram
+import time
+import asyncio
+from translation_cache import TranslationCache
+
+
+class SpeculativeTranslator:
+    """
+    Traduce en segundo plano el prefijo estable de los resultados intermedios.
+
+    Un prefijo es "estable" cuando dos intermedios consecutivos coinciden en él
+    (palabra por palabra). Cuando llega el FINAL, si su texto coincide con el
+    prefijo especulado la traducción ya está hecha (o en curso) y se reutiliza;
+    si no coincide, la especulación se descarta.
+
+    Cada intermedio alarga el prefijo, pero no cada prefijo es una petición: una
+    petición cancelada ya en marcha se factura igual. Hay como mucho una en
+    vuelo y entre lanzamientos pasan al menos `min_interval_s`; mientras, solo
+    espera turno el prefijo más reciente (los intermedios entre medias se saltan).
+    """
+
+    def __init__(self, translate, target: str, min_words: int = 3, cache: TranslationCache = None,
+                 min_interval_s: float = 0.3):
+        self.translate = translate      # async (text, target) -> str
+        self.target = target
+        self.min_words = min_words
+        self.cache = cache              # Si existe, guarda las especulaciones confirmadas
+        self.min_interval_s = min_interval_s
+        self.prev_words = []            # Palabras del intermedio anterior
+        self.spec_text = ""             # Texto que se está traduciendo especulativamente
+        self.spec_task = None
+        self.queued_text = ""           # Prefijo más reciente esperando turno
+        self.committed = {}             # texto normalizado -> tarea confirmada por un FINAL
+        self.launched = 0
+        self.reused = 0
+        self.discarded = 0
+        self.skipped = 0                # Prefijos reemplazados por uno más largo sin llegar a enviarse
+        self._last_launch = float("-inf")
+        self._timer = None
+
+    def observe_interim(self, transcript: str):
+        """Procesa un intermedio; lanza traducción si el prefijo estable creció"""
+        words = transcript.split()
+        stable = []
+        for a, b in zip(self.prev_words, words):
+            if a != b:
+                break
+            stable.append(b)
+        self.prev_words = words
+        if len(stable) < self.min_words:
+            return
+        text = " ".join(stable)
+        if text in (self.spec_text, self.queued_text):
+            return
+        if self.queued_text:
+            self.skipped += 1
+        self.queued_text = text
+        self._pump()
+
+    def finalize(self, final_text: str):
+        """Llamar al recibir un FINAL emitido: confirma o descarta la especulación"""
+        key = TranslationCache.normalize(final_text)
+        if self.spec_task and TranslationCache.normalize(self.spec_text) == key:
+            self.committed[key] = self.spec_task
+            # Acotar confirmaciones nunca reclamadas (p. ej. FINAL descartado como eco)
+            while len(self.committed) > 8:
+                self.committed.pop(next(iter(self.committed))).cancel()
+            self.spec_task = None
+            self.spec_text = ""
+        else:
+            self._discard()
+        self._clear_queued()
+        self.prev_words = []
+
+    def reset(self):
+        """Olvida el intermedio en curso (p. ej. FINAL duplicado o reconexión)"""
+        self._discard()
+        self._clear_queued()
+        self.prev_words = []
+
+    async def take(self, final_text: str):
+        """Devuelve la traducción especulada para este FINAL, o None si no hay"""
+        task = self.committed.pop(TranslationCache.normalize(final_text), None)
+        if task is None:
+            return None
+        try:
+            result = await task
+        except Exception:
+            return None
+        if not result:
+            return None
+        self.reused += 1
+        if self.cache:
+            self.cache.put(final_text, self.target, result)
+        return result
+
+    def stats(self) -> dict:
+        return {"launched": self.launched, "reused": self.reused, "discarded": self.discarded,
+                "skipped": self.skipped}
+
+    def _pump(self):
+        """Lanza el prefijo en espera si no hay petición en vuelo y ya pasó min_interval_s"""
+        if not self.queued_text or self._timer:
+            return
+        if self.spec_task and not self.spec_task.done():
+            return  # Al terminar vuelve a llamar a _pump()
+        wait = self._last_launch + self.min_interval_s - time.monotonic()
+        if wait > 0:
+            self._timer = asyncio.get_running_loop().call_later(wait, self._timer_fired)
+            return
+        self._discard()     # La anterior ya terminó pero su prefijo se quedó corto
+        self.spec_text, self.queued_text = self.queued_text, ""
+        self.spec_task = asyncio.ensure_future(self.translate(self.spec_text, self.target))
+        self.spec_task.add_done_callback(lambda _: self._pump())
+        self._last_launch = time.monotonic()
+        self.launched += 1
+
+    def _timer_fired(self):
+        self._timer = None
+        self._pump()
+
+    def _clear_queued(self):
+        if self.queued_text:
+            self.skipped += 1
+        self.queued_text = ""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _discard(self):
+        if self.spec_task:
+            if not self.spec_task.done():
+                self.spec_task.cancel()
+            self.discarded += 1
+        self.spec_task = None
+        self.spec_text = ""
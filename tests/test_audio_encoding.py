@@ -0,0 +1,41 @@
+# test_audio_encoding.py - Flujos Ogg por conexión (renumeración de páginas ya codificadas)
+import struct
+from audio_encoding import OggStream, ogg_crc, ogg_page
+
+
+def parse_pages(data: bytes) -> list:
+    pages = []
+    pos = 0
+    while data.startswith(b"OggS", pos):
+        segments = data[pos + 26]
+        end = pos + 27 + segments + sum(data[pos + 27:pos + 27 + segments])
+        page = bytearray(data[pos:end])
+        header_type, granule, serial, seq, crc = struct.unpack_from("<BqIII", page, 5)
+        struct.pack_into("<I", page, 22, 0)
+        assert ogg_crc(page) == crc
+        pages.append((header_type, granule, serial, seq))
+        pos = end
+    assert pos == len(data)
+    return pages
+
+
+def make_stream() -> OggStream:
+    return OggStream([b"OpusHead" + bytes(11), b"OpusTags" + bytes(11)], 312, 960)
+
+
+def test_each_connection_gets_its_own_logical_stream():
+    encoded = [ogg_page(bytes([n]) * 40, 0, 0x00, 0, 0) for n in range(4)]
+    first, second = make_stream(), make_stream()
+    assert first.serial != second.serial
+    head = parse_pages(first.header())
+    assert [(t, s) for t, _, _, s in head] == [(0x02, 0), (0x00, 1)]
+
+    sent = b"".join(first.restamp(page) for page in encoded)
+    assert [(g, s) for _, g, _, s in parse_pages(sent)] == [(312 + 960 * (i + 1), i + 2) for i in range(4)]
+
+    # Reenvío tras conmutar: las mismas páginas empiezan de nuevo en la conexión nueva
+    replay = second.restamp(b"".join(encoded[2:]))
+    pages = parse_pages(second.header() + replay)
+    assert [p[3] for p in pages] == [0, 1, 2, 3]
+    assert [p[1] for p in pages[2:]] == [312 + 960, 312 + 1920]
+    assert {p[2] for p in pages} == {second.serial}
@@ -0,0 +1,33 @@
+# test_clause_segmenter.py - Finales largos divididos en cláusulas
+from clause_segmenter import ClauseSegmenter
+
+
+def test_short_finals_stay_whole():
+    segmenter = ClauseSegmenter(min_chars=30)
+    text = "Hola a todos, ¿me escuchan bien?"
+    assert segmenter.split(f"  {text} ") == [text]
+    assert segmenter.segmented == 0
+
+
+def test_long_final_splits_at_punctuation_into_min_sized_clauses():
+    segmenter = ClauseSegmenter(min_chars=30)
+    text = ("Los resultados del trimestre son buenos, las ventas crecieron un diez por ciento. "
+            "Los costes bajaron; el margen mejoró. Gracias.")
+    segments = segmenter.split(text)
+    assert " ".join(segments) == text
+    assert len(segments) > 1 and all(len(s) >= 30 for s in segments)
+    assert segments[-1].endswith("Gracias.")      # El resto corto se une a la anterior
+    assert segmenter.segmented == 1 and segmenter.segments == len(segments)
+
+
+def test_unpunctuated_run_splits_before_conjunction():
+    segmenter = ClauseSegmenter(min_chars=20, max_chars=50)
+    text = ("hemos revisado todas las cifras del informe anual con el equipo "
+            "pero todavía faltan los datos de la oficina de Madrid")
+    segments = segmenter.split(text)
+    assert segments[1].startswith("pero") and " ".join(segments) == text
+
+
+def test_zero_min_chars_disables_segmentation():
+    text = "una frase, otra frase, y otra más que sigue y sigue sin parar nunca jamás"
+    assert ClauseSegmenter(min_chars=0).split(text) == [text]
@@ -0,0 +1,56 @@
+# test_deadline_queue.py - Colas con descarte por antigüedad/capacidad y fusión de atrasos
+import asyncio
+import time
+from deadline_queue import DeadlineQueue, merge_utterances
+
+
+def test_full_queue_drops_oldest_but_keeps_markers():
+    dropped = []
+    q = DeadlineQueue(maxsize=3, on_drop=dropped.append)
+    for item in (None, "a", "b", "c"):
+        q.put_nowait(item)
+    assert dropped == ["a"] and q.dropped_full == 1
+    assert [q.get_nowait() for _ in range(3)] == [None, "b", "c"]
+
+
+def test_stale_items_are_skipped():
+    dropped = []
+    q = DeadlineQueue(max_age=0.01, on_drop=dropped.append)
+    q.put_nowait("viejo")
+    q.put_nowait(None)
+    time.sleep(0.02)
+    q.put_nowait("nuevo")
+    assert q.get_nowait() is None          # Los marcadores nunca caducan
+    assert q.get_nowait() == "nuevo"
+    assert dropped == ["viejo"] and q.dropped_stale == 1
+
+
+def test_backlog_of_finals_merges():
+    q = DeadlineQueue(merge=merge_utterances)
+    for item in ((1, "hola"), (2, "qué tal"), None, (3, "adiós")):
+        q.put_nowait(item)
+    assert q.get_nowait() == (1, "hola qué tal")
+    assert q.get_nowait() is None
+    assert q.get_nowait() == (3, "adiós")
+    assert q.merged == 1
+
+
+def test_clauses_only_merge_within_their_utterance():
+    q = DeadlineQueue(merge=merge_utterances)
+    for item in ((1, "primera,", False), (1, "segunda", True), (2, "otra", False), (3, "final")):
+        q.put_nowait(item)
+    assert q.get_nowait() == (1, "primera, segunda", True)
+    assert q.get_nowait() == (2, "otra", False)     # Otro uid: no se fusiona
+    assert q.get_nowait() == (3, "final")           # Otra forma: no se fusiona
+    assert q.qsize() == 0
+
+
+def test_get_waits_when_everything_pending_is_stale():
+    async def scenario():
+        q = DeadlineQueue(max_age=0.01)
+        q.put_nowait("viejo")
+        await asyncio.sleep(0.02)
+        asyncio.get_running_loop().call_later(0.01, q.put_nowait, "nuevo")
+        return await asyncio.wait_for(q.get(), 1.0)
+
+    assert asyncio.run(scenario()) == "nuevo"
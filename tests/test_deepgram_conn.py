@@ -0,0 +1,140 @@
+# test_deepgram_conn.py - Conmutación a la reserva con envíos concurrentes (sockets simulados)
+import asyncio
+from websockets.exceptions import ConnectionClosed
+from deepgram_conn import DeepgramConnectionManager
+
+
+class FakeSocket:
+    """WebSocket mínimo: guarda lo enviado; `delay` simula un envío lento (cede el event loop)"""
+
+    def __init__(self, delay: float = 0.0):
+        self.sent = []
+        self.delay = delay
+        self.close_code = None
+        self._closed = asyncio.Event()
+
+    async def send(self, data):
+        if self.close_code is not None:
+            raise ConnectionClosed(None, None)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(data)
+
+    def drop(self):
+        self.close_code = 1006
+        self._closed.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self._closed.wait()
+        raise ConnectionClosed(None, None)
+
+    async def close(self):
+        self.drop()
+
+
+def make_manager(active, standby):
+    conn = DeepgramConnectionManager("ws://test", {}, "test", replay_seconds=10.0,
+                                     bytes_per_second=1, standby=False)
+    conn.active = active
+    conn.standby = standby
+    return conn
+
+
+async def _consume(conn):
+    async for _ in conn.messages():
+        pass
+
+
+def test_send_during_failover_keeps_order():
+    async def scenario():
+        old, new = FakeSocket(), FakeSocket(delay=0.01)
+        conn = make_manager(old, new)
+        for chunk in (b"A", b"B", b"C"):
+            await conn.send(chunk)
+        receiver = asyncio.create_task(_consume(conn))
+        old.drop()                  # El receptor detecta la caída y conmuta
+        await asyncio.sleep(0.005)  # ... y está a mitad del reenvío (lento)
+        await conn.send(b"D")
+        receiver.cancel()
+        return new.sent, conn
+
+    sent, conn = asyncio.run(scenario())
+    assert sent == [b"A", b"B", b"C", b"D"]
+    assert conn.failovers == 1
+    # Desplazamientos del buffer de reenvío en orden en la conexión nueva
+    offsets = [off for off, _, _ in conn._replay]
+    assert offsets == sorted(offsets) and len(offsets) == 4
+
+
+def test_chunk_failing_on_dead_socket_is_not_lost():
+    async def scenario():
+        old, new = FakeSocket(), FakeSocket(delay=0.01)
+        conn = make_manager(old, new)
+        await conn.send(b"A")
+        old.drop()
+        # El envío y el receptor descubren la caída a la vez
+        await asyncio.gather(conn.send(b"B"), _consume_until_switched(conn, new))
+        await conn.send(b"C")
+        return new.sent
+
+    async def _consume_until_switched(conn, new):
+        messages = conn.messages()
+        task = asyncio.ensure_future(messages.__anext__())
+        while conn.active is not new:
+            await asyncio.sleep(0.001)
+        task.cancel()
+
+    assert asyncio.run(scenario()) == [b"A", b"B", b"C"]
+
+
+def test_replay_restarts_ogg_stream_on_new_socket():
+    from audio_encoding import OggStream, ogg_page
+
+    async def scenario():
+        old, new = FakeSocket(), FakeSocket()
+        conn = make_manager(old, new)
+        conn.framing = lambda: OggStream([b"OpusHead", b"OpusTags"], 312, 960)
+        conn._streams = {old: conn.framing(), new: conn.framing()}
+        for n in range(3):
+            await conn.send(ogg_page(bytes([n]) * 10, 0, 0x00, 0, 0), duration=0.02)
+        old.drop()
+        await conn.send(ogg_page(b"x" * 10, 0, 0x00, 0, 0), duration=0.02)
+        return old.sent, new.sent
+
+    old_sent, new_sent = asyncio.run(scenario())
+    seq = lambda page: int.from_bytes(page[18:22], "little")
+    assert [seq(p) for p in old_sent] == [2, 3, 4]
+    assert [seq(p) for p in new_sent] == [2, 3, 4, 5]  # Reenvío + chunk nuevo, desde el BOS de la nueva
+
+
+def test_finalize_after_drop_fails_over_to_standby():
+    async def scenario():
+        old, new = FakeSocket(), FakeSocket()
+        conn = make_manager(old, new)
+        await conn.send(b"A")
+        old.drop()
+        await conn.send_control({"type": "Finalize"})
+        return new.sent, conn
+
+    sent, conn = asyncio.run(scenario())
+    assert conn.failovers == 1
+    assert sent == [b"A", '{"type": "Finalize"}']   # Reenvío y después el control
+
+
+def test_start_promotes_live_standby_instead_of_cold_connect():
+    async def scenario():
+        old, new = FakeSocket(), FakeSocket()
+        conn = make_manager(old, new)
+        await conn.send(b"A")
+        old.drop()
+        await conn.start()
+        active = conn.active
+        await conn.close()
+        return active is new, new.sent, conn.failovers
+
+    promoted, sent, failovers = asyncio.run(scenario())
+    assert promoted and failovers == 1
+    assert sent == [b"A"]
@@ -0,0 +1,30 @@
+# test_echo_gate.py - Puerta de eco por lotes (correlación con lo reproducido)
+import numpy as np
+from echo_gate import EchoGate, EchoReference
+
+RATE = 16000
+FRAME = 320
+
+
+def make_gate(played: np.ndarray) -> EchoGate:
+    reference = EchoReference(RATE, seconds=1.0)
+    reference.write(played.tobytes())
+    return EchoGate(reference, RATE, FRAME)
+
+
+def test_region_flags_echo_frames_only():
+    rng = np.random.default_rng(0)
+    played = (rng.standard_normal(RATE) * 3000).astype(np.int16)
+    echo = (played[8000:8000 + 5 * FRAME] * 0.4).astype(np.int16)      # Retardo 0.5 s, atenuado
+    voice = (rng.standard_normal(5 * FRAME) * 2000).astype(np.int16)   # Otra señal
+    gate = make_gate(played)
+    flags = gate.check_region(np.concatenate([echo, voice]).tobytes())
+    assert flags.tolist() == [True] * 5 + [False] * 5
+    assert gate.echo_frames == 5 and gate.checked == 10
+
+
+def test_silent_reference_skips_work():
+    gate = make_gate(np.zeros(RATE, dtype=np.int16))
+    region = (np.random.default_rng(1).standard_normal(3 * FRAME) * 2000).astype(np.int16)
+    assert not gate.check_region(region.tobytes()).any()
+    assert gate.checked == 0
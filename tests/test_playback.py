@@ -0,0 +1,54 @@
+# test_playback.py - Jitter buffer entre el event loop y el callback de audio
+import time
+from playback import JitterBuffer
+
+BPS = 32000     # 16 kHz int16 mono: 32 bytes por ms
+
+
+def read(buffer: JitterBuffer, n: int) -> tuple:
+    out = bytearray(n)
+    return buffer.read_into(out), bytes(out)
+
+
+def test_waits_for_prebuffer_then_plays_in_order():
+    buffer = JitterBuffer(BPS, prebuffer_ms=60)
+    buffer.push(b"\x01" * 640)                   # 20 ms < 60 ms de prebuffer
+    assert read(buffer, 640) == (0, bytes(640))  # Silencio mientras se acumula
+    buffer.push(b"\x02" * 640)
+    buffer.push(b"\x03" * 640)
+    written, out = read(buffer, 1000)
+    assert written == 1000 and out == b"\x01" * 640 + b"\x02" * 360
+    assert buffer.played_bytes == 1000
+
+
+def test_short_tail_plays_without_reaching_prebuffer():
+    buffer = JitterBuffer(BPS, prebuffer_ms=60)
+    buffer.push(b"\x01" * 320)
+    time.sleep(0.07)                             # No llega nada más: final de frase
+    assert read(buffer, 640) == (320, b"\x01" * 320 + bytes(320))
+
+
+def test_data_right_after_running_dry_counts_as_underrun():
+    buffer = JitterBuffer(BPS, prebuffer_ms=20)
+    buffer.push(b"\x01" * 640)
+    read(buffer, 1280)                           # Se vacía a mitad de bloque
+    buffer.push(b"\x02" * 640)                   # ... y llegan datos enseguida
+    assert buffer.underruns == 1
+
+
+def test_overflow_drops_oldest_and_positions_keep_advancing():
+    buffer = JitterBuffer(BPS, prebuffer_ms=20, max_seconds=0.05)   # 1600 bytes
+    positions = [buffer.push(bytes([n]) * 640) for n in range(4)]
+    assert positions == [0, 640, 1280, 1920]
+    assert buffer.dropped_bytes == 1280          # Los dos primeros chunks
+    written, out = read(buffer, 1280)
+    assert out == b"\x02" * 640 + b"\x03" * 640
+    assert buffer.played_bytes == 2560
+
+
+def test_clear_discards_pending_audio():
+    buffer = JitterBuffer(BPS, prebuffer_ms=20)
+    buffer.push(b"\x01" * 1280)
+    buffer.clear()
+    assert read(buffer, 640) == (0, bytes(640))
+    assert buffer.played_bytes == 1280 and buffer.depth_ms == 0
@@ -0,0 +1,38 @@
+# test_speculative.py - Traducción especulativa: límite de peticiones por prefijos crecientes
+import asyncio
+from speculative import SpeculativeTranslator
+from translation_cache import TranslationCache
+
+
+def test_growing_prefix_is_throttled_and_latest_reused():
+    calls = []
+
+    async def translate(text, target):
+        calls.append(text)
+        await asyncio.sleep(0.03)
+        return text.upper()
+
+    async def scenario():
+        spec = SpeculativeTranslator(translate, "EN-US", min_words=3, min_interval_s=0.05)
+        words = "uno dos tres cuatro cinco seis siete ocho nueve diez".split()
+        for n in range(1, len(words) + 1):
+            spec.observe_interim(" ".join(words[:n]))
+            spec.observe_interim(" ".join(words[:n]))   # Mismo intermedio dos veces: prefijo estable
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.2)                        # Se envía el último prefijo en espera
+        spec.finalize(" ".join(words))
+        return spec, await spec.take(" ".join(words))
+
+    spec, result = asyncio.run(scenario())
+    assert result == "UNO DOS TRES CUATRO CINCO SEIS SIETE OCHO NUEVE DIEZ"
+    assert calls[-1].endswith("diez") and len(calls) < 8 - 1   # 8 prefijos de ≥3 palabras
+    assert spec.launched == len(calls) and spec.skipped > 0 and spec.reused == 1
+
+
+def test_uncounted_lookups_leave_hit_rate_alone():
+    cache = TranslationCache()
+    cache.put("hola", "EN-US", "hello")
+    assert cache.get("hola", "EN-US", count=False) == "hello"
+    assert cache.get("adiós", "EN-US", count=False) is None
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 0
+    assert cache.get("hola", "EN-US") == "hello" and cache.stats()["hits"] == 1
@@ -0,0 +1,40 @@
+# test_translation_backends.py - Cobertura de traducciones con backends locales (CallableBackend)
+import asyncio
+import threading
+import time
+from translation_backends import CallableBackend, CircuitBreaker, HedgedTranslator
+
+
+def test_hedge_wins_and_second_backend_used():
+    slow = CallableBackend("lento", lambda text, target: time.sleep(0.2) or f"lento:{text}")
+    fast = CallableBackend("rapido", lambda text, target: f"rapido:{text}")
+    hedged = HedgedTranslator([slow, fast], default_delay_s=0.01)
+    try:
+        assert asyncio.run(hedged.translate("hola", "EN-US")) == "rapido:hola"
+        assert hedged.hedges == 1 and hedged.hedge_wins == 1 and fast.wins == 1
+    finally:
+        hedged.shutdown()
+
+
+def test_cancelled_half_open_probe_is_released():
+    release = threading.Event()
+    primary = CallableBackend("principal", lambda text, target: release.wait(5) and text, concurrency=1,
+                              breaker=CircuitBreaker(failures=1, reset_s=0))
+    alt = CallableBackend("alternativo", lambda text, target: f"alt:{text}")
+    primary.breaker.failure()   # Circuito abierto; con reset_s=0 pasa a semiabierto enseguida
+    hedged = HedgedTranslator([primary, alt], default_delay_s=0.01)
+
+    async def scenario():
+        blocker = primary.submit("ocupa el pool", "EN-US", record=False)
+        # La prueba se queda en cola tras `blocker`; gana la cobertura y la prueba se cancela
+        result = await hedged.translate("hola", "EN-US")
+        release.set()
+        await blocker
+        return result
+
+    try:
+        assert asyncio.run(scenario()) == "alt:hola"
+        assert primary.breaker.allow()   # La siguiente petición puede volver a probar
+    finally:
+        release.set()
+        hedged.shutdown()
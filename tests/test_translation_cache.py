@@ -0,0 +1,32 @@
+# test_translation_cache.py - Almacén en disco con varios procesos (un archivo por shard)
+import os
+from translation_cache import TranslationCache
+
+
+def test_shards_write_own_files_and_merge(tmp_path):
+    path = str(tmp_path / "cache.jsonl")
+    parent = TranslationCache(max_entries=4, path=path)
+    parent.put("hola", "EN-US", "hello")
+    shards = [TranslationCache(max_entries=4, path=path) for _ in range(2)]
+    for i, cache in enumerate(shards):
+        cache.use_shard(i)
+        assert cache.get("hola", "EN-US") == "hello"   # Sembrada desde el archivo principal
+        for n in range(12):                             # Fuerza compactaciones del shard
+            cache.put(f"frase {i} {n}", "ES", f"frase {n}")
+        cache.close()
+    assert os.path.exists(parent.shard_path(0)) and os.path.exists(parent.shard_path(1))
+
+    parent.merge_shards(2)
+    parent.close()
+    assert not os.path.exists(parent.shard_path(0)) and not os.path.exists(parent.shard_path(1))
+    merged = TranslationCache(max_entries=4, path=path)
+    assert merged.get("frase 1 11", "ES") == "frase 11"
+    assert len(merged.entries) == 4
+    merged.close()
+
+
+def test_shard_without_disk_store_is_noop():
+    cache = TranslationCache(max_entries=4)
+    cache.use_shard(3)
+    cache.merge_shards(4)
+    assert cache.path is None
@@ -0,0 +1,55 @@
+# test_translation_pipeline.py - Traducciones concurrentes entregadas en orden de llegada
+import asyncio
+from translation_pipeline import OrderedPipeline
+
+
+def run_pipeline(pipeline: OrderedPipeline, items: list) -> list:
+    async def scenario():
+        in_q, out_q = asyncio.Queue(), asyncio.Queue()
+        for item in items + [None]:
+            in_q.put_nowait(item)
+        await asyncio.wait_for(pipeline.run(in_q, out_q), 2.0)
+        out = []
+        while (result := out_q.get_nowait()) is not None:
+            out.append(result)
+        return out
+
+    return asyncio.run(scenario())
+
+
+def test_results_keep_arrival_order():
+    running = []
+
+    async def fn(item):
+        running.append(item)
+        await asyncio.sleep(0.05 - item * 0.01)    # Los últimos terminan antes
+        return f"t{item}"
+
+    pipeline = OrderedPipeline(fn, max_in_flight=3)
+    assert run_pipeline(pipeline, [0, 1, 2, 3, 4]) == ["t0", "t1", "t2", "t3", "t4"]
+    assert pipeline.peak_in_flight == 3 and pipeline.reordered > 0
+    assert pipeline.completed == 5
+
+
+def test_failed_or_empty_item_releases_the_gap():
+    async def fn(item):
+        if item == 0:
+            await asyncio.sleep(0.03)
+            raise RuntimeError("DeepL caído")
+        if item == 1:
+            return None                             # Nada que emitir
+        return f"t{item}"
+
+    pipeline = OrderedPipeline(fn, max_in_flight=4)
+    assert run_pipeline(pipeline, [0, 1, 2, 3]) == ["t2", "t3"]
+    assert pipeline.completed == 3                  # El error no cuenta
+
+
+def test_streaming_results_of_one_item_come_before_the_next():
+    async def fn(item):
+        for part in range(3):
+            await asyncio.sleep(0.02 if item == 0 else 0.001)
+            yield (item, part)
+
+    pipeline = OrderedPipeline(fn, max_in_flight=2)
+    assert run_pipeline(pipeline, [0, 1]) == [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)]
@@ -0,0 +1,18 @@
+# test_tts_cache.py - Directorio de caché compartido entre procesos (temporales de escritura)
+import os
+from tts_cache import TtsAudioCache
+
+
+def test_load_keeps_tmp_files_of_live_processes(tmp_path):
+    key = "a" * 40
+    live = tmp_path / f"{key}.pcm.{os.getppid()}.tmp"       # Otro proceso escribiendo
+    dead = tmp_path / f"{key}.pcm.999999999.tmp"            # Escritura interrumpida
+    own = tmp_path / f"{key}.pcm.{os.getpid()}.tmp"         # PID reutilizado: restos propios
+    for path in (live, dead, own):
+        path.write_bytes(b"\0" * 10)
+    (tmp_path / f"{key}.pcm").write_bytes(b"\0" * 32)
+
+    cache = TtsAudioCache(str(tmp_path))
+    assert live.exists()
+    assert not dead.exists() and not own.exists()
+    assert list(cache.entries) == [key]
@@ -0,0 +1,257 @@
+# translation_backends.py - Backends de traducción intercambiables con peticiones cubiertas (hedging)
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import deepl
+
+
+class TranslationError(Exception):
+    """Ningún backend pudo traducir el texto"""
+
+
+class CircuitBreaker:
+    """
+    Tras `failures` errores seguidos el backend queda abierto (no recibe
+    peticiones) durante `reset_s`; después deja pasar una petición de prueba
+    (semiabierto): si va bien se cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self, failures: int = 3, reset_s: float = 15.0):
+        self.failures = failures
+        self.reset_s = reset_s
+        self.trips = 0              # Veces que se ha abierto
+        self._errors = 0
+        self._opened = None         # time.monotonic() de la apertura
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened is None:
+            return "cerrado"
+        return "semiabierto" if self._probing else "abierto"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened is None:
+                return True
+            if self._probing or time.monotonic() - self._opened < self.reset_s:
+                return False
+            self._probing = True    # Una sola petición de prueba
+            return True
+
+    def success(self):
+        with self._lock:
+            self._errors = 0
+            self._opened = None
+            self._probing = False
+
+    def release_probe(self):
+        """La petición de prueba se canceló antes de ejecutarse: la siguiente puede probar"""
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._errors += 1
+            if self._probing or (self._opened is None and self._errors >= self.failures):
+                self.trips += self._opened is None
+                self._opened = time.monotonic()
+                self._probing = False
+
+
+class LatencyStats:
+    """Latencias recientes (ventana deslizante) y contadores de un backend"""
+
+    def __init__(self, max_samples: int = 200):
+        self.samples = deque(maxlen=max_samples)
+        self.ok = 0
+        self.errors = 0
+
+    def record(self, seconds: float, ok: bool):
+        if ok:
+            self.ok += 1
+            self.samples.append(seconds)
+        else:
+            self.errors += 1
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class TranslationBackend:
+    """
+    Un servicio o endpoint de traducción. Las subclases implementan translate()
+    (bloqueante): se ejecuta en un pool acotado por dirección de este backend,
+    con su propio circuito y sus estadísticas de latencia.
+    """
+
+    def __init__(self, name: str, concurrency: int = 4, breaker: CircuitBreaker = None):
+        self.name = name
+        self.concurrency = concurrency
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = LatencyStats()
+        self.wins = 0               # Peticiones cubiertas que ganó este backend
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def translate(self, text: str, target: str) -> str:
+        raise NotImplementedError
+
+    def submit(self, text: str, target: str, record: bool = True) -> asyncio.Future:
+        """
+        Lanza translate() en el pool del backend. La latencia y el resultado se
+        anotan al terminar el hilo, también si quien esperaba ya lo canceló (la
+        cola lenta cuenta para el percentil). record=False: pre-calentamiento.
+        """
+        pool = self._pools.get(target)
+        if pool is None:
+            pool = self._pools[target] = ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix=f"{self.name}-{target}"
+            )
+        t0 = time.perf_counter()
+        future = pool.submit(self.translate, text, target)
+        if record:
+            future.add_done_callback(lambda f: self._finished(f, t0))
+        return asyncio.wrap_future(future)
+
+    def summary(self) -> str:
+        st = self.stats
+        return (f"{self.name}: {st.ok} ok / {st.errors} errores, p50 {st.percentile(0.5) * 1000:.0f}ms "
+                f"p95 {st.percentile(0.95) * 1000:.0f}ms, {self.wins} coberturas ganadas, "
+                f"circuito {self.breaker.state} ({self.breaker.trips} aperturas)")
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools.clear()
+
+    def _finished(self, future, t0: float):
+        if future.cancelled():
+            # No llegó a ejecutarse (la cobertura ganó mientras esperaba en cola):
+            # si era la prueba del semiabierto, liberarla o el circuito no se cierra nunca
+            self.breaker.release_probe()
+            return
+        ok = future.exception() is None
+        with self._lock:
+            self.stats.record(time.perf_counter() - t0, ok)
+        if ok:
+            self.breaker.success()
+        else:
+            self.breaker.failure()
+
+
+class DeepLBackend(TranslationBackend):
+    """
+    DeepL a través de un deepl.Translator (get_translator: función que lo
+    devuelve, así el principal se crea perezosamente y se puede sustituir).
+    Cada Translator reutiliza conexiones keep-alive de su sesión HTTP; con
+    concurrency <= 5 por dirección no se supera el pool de urllib3 (10).
+    """
+
+    def __init__(self, name: str, get_translator, concurrency: int = 4, breaker: CircuitBreaker = None):
+        super().__init__(name, concurrency, breaker)
+        self.get_translator = get_translator
+
+    @classmethod
+    def from_config(cls, spec: dict, concurrency: int = 4) -> "DeepLBackend":
+        """{"name": ..., "auth_key": ..., "server_url": ...}: otra cuenta u otro endpoint de DeepL"""
+        translator = deepl.Translator(spec["auth_key"], server_url=spec.get("server_url"))
+        return cls(spec.get("name", "deepl-alt"), lambda: translator, concurrency)
+
+    def translate(self, text: str, target: str) -> str:
+        return self.get_translator().translate_text(text, target_lang=target).text
+
+
+class CallableBackend(TranslationBackend):
+    """fn(texto, destino) -> traducción: sustitutos locales para pruebas y benchmarks"""
+
+    def __init__(self, name: str, fn, concurrency: int = 4, breaker: CircuitBreaker = None):
+        super().__init__(name, concurrency, breaker)
+        self.fn = fn
+
+    def translate(self, text: str, target: str) -> str:
+        return self.fn(text, target)
+
+
+class HedgedTranslator:
+    """
+    Envía cada texto al primer backend con el circuito cerrado. Si no responde
+    dentro del percentil `percentile` de su latencia reciente (acotado entre
+    min_delay_s y max_delay_s; default_delay_s mientras haya menos de
+    `min_samples` muestras), lanza la misma petición al siguiente backend.
+    Gana la primera respuesta válida y la otra se cancela. Un error pasa al
+    siguiente backend sin esperar. Con un solo backend no hay cobertura.
+    """
+
+    def __init__(self, backends: list, percentile: float = 0.9, min_delay_s: float = 0.05,
+                 max_delay_s: float = 1.0, default_delay_s: float = 0.4, min_samples: int = 20):
+        self.backends = backends
+        self.percentile = percentile
+        self.min_delay_s = min_delay_s
+        self.max_delay_s = max_delay_s
+        self.default_delay_s = default_delay_s
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0             # Peticiones cubiertas (segunda petición lanzada)
+        self.hedge_wins = 0         # ... en las que ganó la segunda
+
+    def hedge_delay(self, backend: TranslationBackend) -> float:
+        if len(backend.stats.samples) < self.min_samples:
+            return self.default_delay_s
+        return min(self.max_delay_s, max(self.min_delay_s, backend.stats.percentile(self.percentile)))
+
+    async def translate(self, text: str, target: str) -> str:
+        self.requests += 1
+        candidates = iter(self.backends)
+        pending = {}                # tarea -> backend
+        errors = []
+
+        def launch() -> bool:
+            for backend in candidates:
+                if backend.breaker.allow():
+                    pending[backend.submit(text, target)] = backend
+                    return True
+                errors.append(f"{backend.name}: circuito abierto")
+            return False
+
+        launch()
+        hedged = False
+        try:
+            while pending:
+                first = next(iter(pending.values()))
+                timeout = None if hedged else self.hedge_delay(first)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Cola lenta: cubrir con el siguiente backend (una sola vez)
+                    hedged = True
+                    if launch():
+                        self.hedges += 1
+                    continue
+                for task in done:
+                    backend = pending.pop(task)
+                    if task.exception() is None:
+                        if hedged and backend is not first:
+                            self.hedge_wins += 1
+                            backend.wins += 1
+                        return task.result()
+                    errors.append(f"{backend.name}: {task.exception() or type(task.exception()).__name__}")
+                if not pending:
+                    launch()        # Error: siguiente backend sin esperar
+            raise TranslationError("; ".join(errors) or "sin backends")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def summary(self) -> str:
+        return (f"{self.requests} peticiones, {self.hedges} cubiertas ({self.hedge_wins} ganadas por la "
+                f"segunda), percentil {self.percentile:.0%}")
+
+    def shutdown(self):
+        for backend in self.backends:
+            backend.shutdown()
@@ -0,0 +1,152 @@
+# translation_cache.py - Caché de traducciones (LRU en memoria + almacén opcional en disco)
+import os
+import json
+from collections import OrderedDict
+
+
+class TranslationCache:
+    """
+    Caché LRU de traducciones indexada por (texto normalizado, idioma destino).
+    Si se indica `path`, las entradas se guardan en un archivo JSONL que se
+    recarga al iniciar, de modo que las frases frecuentes sobreviven reinicios.
+
+    Varios procesos (sessions.py) no comparten el archivo: cada uno escribe en
+    el suyo con use_shard() y el padre los funde en el principal al terminar
+    (merge_shards), así nadie añade líneas a un archivo que otro compacta.
+    """
+
+    def __init__(self, max_entries: int = 512, path: str = None):
+        self.max_entries = max(1, int(max_entries))
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._disk_lines = 0
+        self._disk = None
+        if self.path:
+            self._load()
+            self._disk = open(self.path, "a", encoding="utf-8")
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normaliza espacios y mayúsculas para que 'Yes' y ' yes ' compartan entrada"""
+        return " ".join(text.split()).casefold()
+
+    def get(self, text: str, target: str, count: bool = True):
+        """
+        Devuelve la traducción cacheada o None (y actualiza contadores).
+        count=False: consulta que no cuenta en la tasa de aciertos (p. ej. especulativa).
+        """
+        key = (self.normalize(text), target)
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += count
+            return None
+        self.entries.move_to_end(key)
+        self.hits += count
+        return value
+
+    def put(self, text: str, target: str, translation: str):
+        """Guarda una traducción; descarta la menos usada si se supera el límite"""
+        if not translation:
+            return
+        key = (self.normalize(text), target)
+        if self.entries.get(key) == translation:
+            self.entries.move_to_end(key)
+            return
+        self._store(key, translation)
+        if self._disk:
+            self._append(key, translation)
+
+    def shard_path(self, shard: int) -> str:
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{shard}{ext}"
+
+    def use_shard(self, shard: int):
+        """
+        Proceso hijo: conserva lo cargado del archivo principal (solo lectura a
+        partir de aquí) y pasa a leer y escribir el archivo propio del shard.
+        """
+        if not self.path:
+            return
+        if self._disk:
+            self._disk.close()
+        self.path = self.shard_path(shard)
+        self._disk_lines = 0
+        self._load()
+        self._disk = open(self.path, "a", encoding="utf-8")
+
+    def merge_shards(self, shards: int):
+        """Padre, con los hijos ya terminados: vuelca sus archivos en el principal y los borra"""
+        if not self.path:
+            return
+        paths = [p for p in map(self.shard_path, range(shards)) if os.path.exists(p)]
+        if not paths:
+            return
+        if self._disk:
+            self._disk.close()
+        for path in paths:
+            self._read(path)
+        self._rewrite()
+        for path in paths:
+            os.remove(path)
+        self._disk = open(self.path, "a", encoding="utf-8")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        if self._disk:
+            self._disk.close()
+            self._disk = None
+
+    # --- Internos ---
+    def _store(self, key, translation):
+        self.entries[key] = translation
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _load(self):
+        """Carga el archivo JSONL (las líneas posteriores reemplazan a las anteriores)"""
+        if not os.path.exists(self.path):
+            return
+        self._disk_lines += self._read(self.path)
+        # Compactar si el archivo acumula demasiadas entradas obsoletas
+        if self._disk_lines > 2 * self.max_entries:
+            self._rewrite()
+
+    def _read(self, path: str) -> int:
+        lines = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    rec = json.loads(line)
+                    self._store((rec["k"], rec["t"]), rec["v"])
+                except (ValueError, KeyError, TypeError):
+                    continue  # Línea corrupta (p. ej. cierre abrupto): ignorar
+        return lines
+
+    def _append(self, key, translation):
+        self._disk.write(json.dumps({"k": key[0], "t": key[1], "v": translation}, ensure_ascii=False) + "\n")
+        self._disk.flush()
+        self._disk_lines += 1
+        if self._disk_lines > 2 * self.max_entries:
+            self._disk.close()
+            self._rewrite()
+            self._disk = open(self.path, "a", encoding="utf-8")
+
+    def _rewrite(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for (norm, target), value in self.entries.items():
+                f.write(json.dumps({"k": norm, "t": target, "v": value}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._disk_lines = len(self.entries)
@@ -0,0 +1,97 @@
+# translation_pipeline.py - Traducción concurrente que conserva el orden de las frases
+import asyncio
+import inspect
+import app_log
+
+log = app_log.get("translate")
+
+_END = object()  # Fin de los resultados de un elemento (fn generador)
+
+
+class OrderedPipeline:
+    """
+    Aplica `fn(item)` (corrutina) a cada elemento de una cola con hasta
+    `max_in_flight` llamadas en vuelo, y entrega los resultados en el orden de
+    llegada (número de secuencia implícito: la cola de tareas pendientes).
+
+    fn devuelve el elemento de salida o None para no emitir nada. Si fn es un
+    generador asíncrono, cada resultado sale en cuanto está listo (los de un
+    elemento, antes que los del siguiente). Un None en la cola de entrada espera
+    a las tareas en vuelo y se propaga a la de salida.
+    """
+
+    def __init__(self, fn, max_in_flight: int = 4, name: str = ""):
+        self.fn = fn
+        self.max_in_flight = max(1, max_in_flight)
+        self.name = name
+        self.streaming = inspect.isasyncgenfunction(fn)
+        self.completed = 0
+        self.peak_in_flight = 0
+        self.reordered = 0          # Resultados que terminaron antes que uno anterior
+        self._in_flight = 0
+        self._seq = 0               # Siguiente número de secuencia a asignar
+        self._next = 0              # Siguiente secuencia a emitir (las demás esperan)
+
+    async def run(self, in_q: asyncio.Queue, out_q: asyncio.Queue):
+        slots = asyncio.Semaphore(self.max_in_flight)
+        order_q = asyncio.Queue()
+        emitter = asyncio.create_task(self._emit(order_q, out_q))
+        try:
+            while True:
+                item = await in_q.get()
+                if item is None:
+                    break
+                await slots.acquire()
+                self._in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+                seq = self._seq
+                self._seq += 1
+                results = asyncio.Queue() if self.streaming else None
+                task = asyncio.create_task(self._collect(item, results) if self.streaming else self.fn(item))
+                task.add_done_callback(lambda _t, seq=seq: self._finished(seq, slots))
+                await order_q.put((seq, task, results))
+            await order_q.put(None)
+            await emitter
+            await out_q.put(None)
+        finally:
+            emitter.cancel()
+
+    def summary(self) -> str:
+        return (f"{self.name}: {self.completed} completadas, hasta {self.peak_in_flight} en vuelo, "
+                f"{self.reordered} reordenadas")
+
+    def _finished(self, seq: int, slots):
+        if seq > self._next:
+            self.reordered += 1  # Terminó antes que una anterior: se retiene hasta entonces
+        self._in_flight -= 1
+        slots.release()
+
+    async def _collect(self, item, results: asyncio.Queue):
+        try:
+            async for result in self.fn(item):
+                results.put_nowait(result)
+        finally:
+            results.put_nowait(_END)
+
+    async def _emit(self, order_q: asyncio.Queue, out_q: asyncio.Queue):
+        while True:
+            entry = await order_q.get()
+            if entry is None:
+                return
+            seq, task, results = entry
+            try:
+                if results is None:
+                    result = await task
+                    if result is not None:
+                        await out_q.put(result)
+                else:
+                    while (result := await results.get()) is not _END:
+                        if result is not None:
+                            await out_q.put(result)
+                    await task  # Propaga el error del generador, si lo hubo
+            except Exception as e:
+                log.error(f"❌ [{self.name}] Error en traducción: {e}")
+                continue
+            finally:
+                self._next = seq + 1
+            self.completed += 1
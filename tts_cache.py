@@ -0,0 +1,158 @@
+# tts_cache.py - Caché persistente de audio sintetizado (PCM en archivos mapeados en memoria)
+import os
+import json
+import mmap
+import hashlib
+from collections import OrderedDict
+
+
+class TtsAudioCache:
+    """
+    Caché de PCM de ElevenLabs indexada por (voz, modelo, ajustes de voz, texto).
+
+    Cada entrada es un archivo `<sha1>.pcm` en `directory`; al acertar se devuelve
+    un mmap de solo lectura (el audio se reproduce sin copiarlo a memoria). El
+    tamaño total se limita a `max_bytes` descartando lo menos usado (LRU, que
+    sobrevive reinicios gracias a la fecha de modificación de los archivos).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max(0, int(max_bytes))
+        self.entries = OrderedDict()  # clave → tamaño en bytes (de menos a más reciente)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self.bytes_saved = 0        # PCM servido desde disco en vez de sintetizado
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def key(voice_id: str, model: str, voice_settings: dict, text: str) -> str:
+        """Clave estable: cambia si cambia la voz, el modelo, los ajustes o el texto"""
+        raw = json.dumps([voice_id, model, voice_settings, " ".join(text.split())],
+                         sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """mmap con el PCM cacheado o None (y actualiza contadores)"""
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                pcm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)  # Marca de uso para el LRU entre sesiones
+        except (OSError, ValueError):
+            self._forget(key)  # Borrado desde fuera o vacío
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self.bytes_saved += len(pcm)
+        return pcm
+
+    def put(self, key: str, pcm: bytes):
+        """Guarda el PCM de una síntesis completa y aplica el límite de tamaño"""
+        if not pcm or len(pcm) > self.max_bytes or key in self.entries:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"  # Varios procesos pueden compartir el directorio
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Caché TTS: no se pudo guardar ({e})")
+            return
+        self.entries[key] = len(pcm)
+        self.total_bytes += len(pcm)
+        self.stored += 1
+        self._evict()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "stored": self.stored,
+            "evicted": self.evicted,
+        }
+
+    # --- Internos ---
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pcm")
+
+    def _load(self):
+        """Indexa los archivos existentes, del uso más antiguo al más reciente"""
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                if _stale_tmp(name):
+                    try:
+                        os.remove(path)  # Escritura interrumpida
+                    except OSError:
+                        pass
+                continue  # Si no, otro proceso la está escribiendo
+            if not name.endswith(".pcm"):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+        self._evict()
+
+    def _evict(self):
+        for key in list(self.entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # En Windows un archivo mapeado (sonando) no se puede borrar aún
+            self._forget(key)
+            self.evicted += 1
+
+    def _forget(self, key: str):
+        self.total_bytes -= self.entries.pop(key, 0)
+
+
+def _stale_tmp(name: str) -> bool:
+    """Temporal `<clave>.pcm.<pid>.tmp` abandonado: de este PID o de un proceso que ya no existe"""
+    try:
+        pid = int(name.rsplit(".", 2)[-2])
+    except (ValueError, IndexError):
+        return True
+    return pid == os.getpid() or not _pid_alive(pid)
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) terminaría el proceso en Windows: consultar con OpenProcess
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True                 # Existe, aunque sea de otro usuario
+    return True
@@ -0,0 +1,103 @@
+# tts_decode.py - Decodificación de mensajes de audio de ElevenLabs con pocas asignaciones
+import time
+import json
+import base64
+import binascii
+import tracemalloc
+
+try:
+    import orjson  # Opcional: parser JSON más rápido
+    _loads = orjson.loads
+    JSON_PARSER = "orjson"
+except ImportError:
+    _loads = json.loads
+    JSON_PARSER = "json"
+
+_AUDIO_KEY = b'"audio":'
+
+
+class AudioFrameDecoder:
+    """
+    Separa el campo `audio` (base64) de un mensaje stream-input sin construir el
+    dict completo: se localiza en los bytes crudos del frame, se decodifica con
+    binascii directamente desde un memoryview (el PCM resultante es el único
+    objeto grande y va tal cual al jitter buffer) y solo el resto del mensaje
+    (isFinal, alignment, error: unos cientos de bytes) pasa por el parser JSON.
+    Si el mensaje no tiene la forma esperada se usa el camino completo.
+    """
+
+    def __init__(self):
+        self.chunks = 0
+        self.decode_s = 0.0
+        self.fast = 0
+        self.fallback = 0
+
+    def decode(self, raw):
+        """(pcm o None, resto del mensaje como dict). raw: bytes del frame (o str)"""
+        t0 = time.perf_counter()
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+        pcm, meta = self._split(raw)
+        if pcm is None:
+            meta = _loads(raw)
+            audio = meta.get("audio") if isinstance(meta, dict) else None
+            if audio:
+                pcm = binascii.a2b_base64(audio)
+            self.fallback += 1
+        else:
+            self.fast += 1
+        if pcm:
+            self.chunks += 1
+            self.decode_s += time.perf_counter() - t0
+        return pcm, meta
+
+    def summary(self) -> str:
+        avg_us = self.decode_s / self.chunks * 1e6 if self.chunks else 0.0
+        return (f"decodificación {avg_us:.0f}µs/chunk ({self.fast} rápidos, {self.fallback} completos, "
+                f"JSON {JSON_PARSER})")
+
+    @staticmethod
+    def _split(raw: bytes):
+        key = raw.find(_AUDIO_KEY)
+        if key < 0:
+            return None, None
+        start = key + len(_AUDIO_KEY)
+        while raw[start:start + 1] == b" ":
+            start += 1
+        if raw[start:start + 1] != b'"':
+            return None, None  # "audio": null
+        start += 1
+        end = raw.find(b'"', start)
+        if end < 0 or raw.find(b"\\", start, end) >= 0:
+            return None, None  # Escapes (p. ej. "\/"): que lo resuelva el parser
+        pcm = binascii.a2b_base64(memoryview(raw)[start:end])
+        meta = _loads(raw[:key] + b'"audio":null' + raw[end + 1:])
+        return pcm, meta
+
+
+def legacy_decode(raw):
+    """Camino anterior (referencia): texto → dict completo → base64 → bytes"""
+    data = json.loads(raw)
+    audio = data.get("audio")
+    return (base64.b64decode(audio) if audio else None), data
+
+
+def measure(decode, messages: list, repeat: int = 200) -> dict:
+    """Tiempo y bytes asignados por chunk de un decodificador sobre mensajes reales/sintéticos"""
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for msg in messages:
+            decode(msg)
+    elapsed = time.perf_counter() - t0
+    peaks = 0
+    tracemalloc.start()
+    for msg in messages:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        decode(msg)
+        peaks += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return {
+        "us_per_chunk": elapsed / (repeat * len(messages)) * 1e6,
+        "alloc_bytes_per_chunk": peaks / len(messages),  # Pico de memoria transitoria por mensaje
+    }